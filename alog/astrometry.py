@@ -0,0 +1,30 @@
+"""Local astrometry.net index files."""
+import os
+from pathlib import Path
+
+
+def index_files(directory: Path) -> list[Path]:
+    """The index files in a directory, e.g. index-4107.fits."""
+    return sorted(path for path in directory.iterdir() if path.suffix.lower() == '.fits' and path.is_file())
+
+
+def warm_index_files(directory: Path) -> int:
+    """Start reading the index files into the OS page cache.  Returns their total size in bytes.
+
+    solve-field runs as a new process for every frame and opens the index
+    files itself, so they cannot stay loaded in a worker between solves; once
+    they are in the page cache they are read from memory instead of disk.
+    The reading is left to the OS in the background, where it is supported
+    (POSIX_FADV_WILLNEED); elsewhere nothing is done and 0 is returned."""
+    if not hasattr(os, 'posix_fadvise'):
+        return 0
+
+    total = 0
+    for path in index_files(directory):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            total += os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    return total
@@ -0,0 +1,188 @@
+"""Offline object lookups in the catalogs bundled with the UI."""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from alog.names import parse_names
+from alog.resolver_cache import normalize_designation
+
+CATALOG_DIR = Path(__file__).resolve().parent.parent / 'ui' / 'public' / 'catalogs'
+
+# Catalogs in order of precedence: an object in several is named after the first
+CATALOGS = ('Messier', 'OpenNGC', 'OpenIC', 'Sharpless', 'LBN', 'LDN', 'Barnard')
+
+# Bump when the index layout changes, so prebuilt indexes are rebuilt
+INDEX_VERSION = 1
+
+
+def _text(value) -> str:
+    # Missing values are 0 or "" depending on the catalog
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _number(value) -> float | None:
+    return float(value) if isinstance(value, (int, float)) and value else None
+
+
+def _merge_rows(catalog_dir: Path) -> list[dict]:
+    """Objects of all catalogs, with rows naming another catalog's designation merged.
+
+    OpenNGC lists M31 as NGC 224 with the name "Andromeda Galaxy, M31", so it
+    becomes one object, named M 31, with both designations and the common name."""
+    objects = []
+    designations = {}
+    for catalog in CATALOGS:
+        rows = json.loads((catalog_dir / f'{catalog}.json').read_text())['data']
+        for row in rows:
+            designation, ra, dec, type, constellation, magnitude, _, names, info = row[:9]
+            size = row[9] if len(row) > 9 else 0
+            names = [designation] + [name.strip() for name in _text(names).split(',') if name.strip()]
+
+            index = next((designations[key] for key in map(normalize_designation, names) if key in designations),
+                         None)
+            if index is None:
+                index = len(objects)
+                objects.append({'name': designation, 'ra': ra * 15, 'dec': dec, 'names': [], 'catalogs': []})
+            obj = objects[index]
+            designations.setdefault(normalize_designation(designation), index)
+
+            known = set(map(normalize_designation, obj['names']))
+            for name in names:
+                key = normalize_designation(name)
+                if key not in known:
+                    known.add(key)
+                    obj['names'].append(name)
+            obj['catalogs'].append(catalog)
+            for field, value in (('type', _text(type)), ('constellation', _text(constellation)),
+                                 ('info', _text(info)), ('magnitude', _number(magnitude)),
+                                 ('size', _number(size))):
+                if value and not obj.get(field):
+                    obj[field] = value
+    return objects
+
+
+def _describe(obj: dict) -> dict:
+    """Data of a catalog object, in the form of a Simbad lookup."""
+    data = {
+        'name': obj['name'],
+        'type': obj.get('type') or 'unknown',
+        'coordinates': {
+            'ra': obj['ra'],
+            'dec': obj['dec'],
+            'ra_str': str(obj['ra']),
+            'dec_str': str(obj['dec']),
+        },
+        'size': {'major_axis': obj['size'], 'formatted': f"{obj['size']:.1f}′"} if obj.get('size')
+        else {'type': 'unknown'},
+        'source': ', '.join(obj['catalogs']),
+    }
+    if obj.get('constellation'):
+        data['constellation'] = obj['constellation']
+    if obj.get('magnitude'):
+        data['blue_magnitude'] = obj['magnitude']
+    if obj.get('info'):
+        data['info'] = obj['info']
+    data['alternative_names'] = obj['names']
+
+    catalogs, common_name = parse_names(obj['names'])
+    if catalogs:
+        data['catalogs'] = catalogs
+    if common_name:
+        data['common_name'] = common_name
+    return data
+
+
+def build_index(catalog_dir: Path = CATALOG_DIR) -> dict[str, np.ndarray]:
+    """Arrays of the catalog index.
+
+    Every object has a position, a size in arcmin (0 if unknown) and its
+    data as JSON, all concatenated in `records` at `offsets`.  `keys` are
+    the sorted normalised names, with the object each names in `key_objects`.
+    Names shared by several objects are left out."""
+    objects = _merge_rows(catalog_dir)
+
+    owners = {}
+    for index, obj in enumerate(objects):
+        for key in {normalize_designation(name) for name in obj['names']}:
+            owners.setdefault(key, []).append(index)
+    keys = sorted(key for key, indexes in owners.items() if len(indexes) == 1)
+
+    records = [json.dumps(_describe(obj)).encode() for obj in objects]
+    return {
+        'keys': np.array(keys),
+        'key_objects': np.array([owners[key][0] for key in keys], dtype=np.int32),
+        'designations': np.array([obj['name'] for obj in objects]),
+        'ra': np.array([obj['ra'] for obj in objects]),
+        'dec': np.array([obj['dec'] for obj in objects]),
+        'size': np.array([obj.get('size') or 0.0 for obj in objects]),
+        'records': np.frombuffer(b''.join(records), dtype=np.uint8),
+        'offsets': np.cumsum([0] + [len(record) for record in records]),
+    }
+
+
+def _signature(catalog_dir: Path) -> str:
+    """Identifies the catalog files an index was built from."""
+    parts = [str(INDEX_VERSION)]
+    for catalog in CATALOGS:
+        st = (catalog_dir / f'{catalog}.json').stat()
+        parts.append(f'{catalog}:{st.st_size}:{st.st_mtime_ns}')
+    return ';'.join(parts)
+
+
+class CatalogIndex:
+    """Names and positions of the objects in the bundled catalogs.
+
+    The index is built from the catalog JSON files once and saved as a
+    `.npz` file, which is rebuilt when the catalogs change.  A name lookup
+    is a binary search over the sorted normalised names."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.keys = arrays['keys']
+        self.key_objects = arrays['key_objects']
+        self.designations = arrays['designations']
+        self.ra = arrays['ra']
+        self.dec = arrays['dec']
+        self.size = arrays['size']
+        self.records = arrays['records']
+        self.offsets = arrays['offsets']
+
+    @classmethod
+    def load(cls, path: Path, catalog_dir: Path = CATALOG_DIR) -> 'CatalogIndex':
+        """Load the prebuilt index at `path`, building it first if it is missing or out of date."""
+        signature = _signature(catalog_dir)
+        try:
+            with np.load(path) as f:
+                if str(f['signature']) == signature:
+                    return cls({name: f[name] for name in f.files})
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+        arrays = build_index(catalog_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + '.tmp')
+        with open(temp, 'wb') as f:
+            np.savez(f, signature=np.array(signature), **arrays)
+        os.replace(temp, path)
+        return cls(arrays)
+
+    def __len__(self) -> int:
+        return len(self.designations)
+
+    def find(self, name: str) -> int | None:
+        """Index of the object with a name, or None if the catalogs do not list it."""
+        key = normalize_designation(name)
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.key_objects[i])
+        return None
+
+    def object_data(self, index: int) -> dict:
+        """Data of an object, in the form of a Simbad lookup."""
+        return json.loads(self.records[self.offsets[index]:self.offsets[index + 1]].tobytes())
+
+    def lookup(self, name: str) -> dict | None:
+        """Data of the object with a name, or None if the catalogs do not list it."""
+        index = self.find(name)
+        return None if index is None else self.object_data(index)
@@ -0,0 +1,70 @@
+"""Persistent cache of rendered chart backgrounds."""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+def chart_key(**params) -> str:
+    """Key for a background from the parameters it was rendered with (JSON serializable)."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class ChartCache:
+    """On-disk cache of chart backgrounds, each an RGBA image with some geometry.
+
+    Each entry is a `.npy` image, memory-mapped when read, and a `.json` file
+    describing how sky positions map onto it.  The modification time of the
+    image records when it was last used, and when the images grow past
+    `max_bytes` the least recently used ones are evicted."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f'{key}.npy', self.directory / f'{key}.json'
+
+    def get(self, key: str) -> tuple[np.ndarray, dict] | None:
+        """Look up a background, marking it as recently used."""
+        image_path, geometry_path = self._paths(key)
+        try:
+            geometry = json.loads(geometry_path.read_text())
+            image = np.load(image_path, mmap_mode='r')
+            os.utime(image_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return image, geometry
+
+    def put(self, key: str, image: np.ndarray, geometry: dict):
+        """Store a background.  The image is written last, so a partial entry is never found."""
+        image_path, geometry_path = self._paths(key)
+        for path, write in ((geometry_path, lambda f: f.write(json.dumps(geometry).encode())),
+                            (image_path, lambda f: np.save(f, image))):
+            temp = path.with_name(path.name + '.tmp')
+            with open(temp, 'wb') as f:
+                write(f)
+            os.replace(temp, path)
+        self.evict()
+
+    def evict(self):
+        """Drop the least recently used backgrounds until the cache fits in `max_bytes`."""
+        entries = []
+        for image_path in self.directory.glob('*.npy'):
+            try:
+                st = image_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, image_path))
+        total = sum(size for _, size, _ in entries)
+
+        # The most recently used entry is kept even if it alone is too big
+        for _, size, image_path in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            image_path.unlink(missing_ok=True)
+            image_path.with_suffix('.json').unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,79 @@
+"""Columnar cache of the manifest, for vectorized aggregation."""
+import os
+
+import numpy as np
+
+from alog.journal import ManifestStore
+
+SIDECAR = 'manifest.npz'
+
+
+def _source_signature(store: ManifestStore) -> np.ndarray:
+    """Size and modification time of the snapshot and journal the columns were built from."""
+    signature = []
+    for path in (store.snapshot, store.journal):
+        try:
+            st = path.stat()
+            signature += [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            signature += [-1, -1]
+    return np.array(signature, dtype=np.int64)
+
+
+def build_columns(store: ManifestStore) -> dict[str, np.ndarray]:
+    """Read the manifest into one array per field.
+
+    Instruments are stored as codes into the `instruments` array.  Sky
+    positions are in degrees and are NaN for files that are not solved."""
+    from alog.models import FileColumns
+
+    instruments = {}
+    rows = []
+    for desc in store.iter_files(FileColumns):
+        calibration = desc.solution.calibration if desc.solution is not None else None
+        code = instruments.setdefault(desc.instrument, len(instruments))
+        if calibration is None:
+            rows.append((code, desc.total_exposure_time, desc.axis1, desc.axis2, desc.stackcnt,
+                         np.nan, np.nan, np.nan, np.nan, np.nan))
+        else:
+            rows.append((code, desc.total_exposure_time, desc.axis1, desc.axis2, desc.stackcnt,
+                         calibration.ra, calibration.dec,
+                         calibration.width_arcsec / 3600.0, calibration.height_arcsec / 3600.0,
+                         calibration.orientation))
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 10)
+    return {
+        'instruments': np.array(list(instruments), dtype=str),
+        'instrument': table[:, 0].astype(np.int32),
+        'total_exposure_time': table[:, 1],
+        'axis1': table[:, 2],
+        'axis2': table[:, 3],
+        'stackcnt': table[:, 4].astype(np.int32),
+        'ra': table[:, 5],
+        'dec': table[:, 6],
+        'width': table[:, 7],
+        'height': table[:, 8],
+        'orientation': table[:, 9],
+    }
+
+
+def load_columns(store: ManifestStore) -> dict[str, np.ndarray]:
+    """Load the columns from `manifest.npz`, rebuilding it if the manifest has changed since."""
+    sidecar = store.dir / SIDECAR
+    source = _source_signature(store)
+
+    if sidecar.exists():
+        with np.load(sidecar) as data:
+            if np.array_equal(data['source'], source):
+                return {name: data[name] for name in data.files if name != 'source'}
+
+    columns = build_columns(store)
+    temp = sidecar.with_name(sidecar.name + '.tmp')
+    try:
+        with open(temp, 'wb') as f:
+            np.savez(f, source=source, **columns)
+        os.replace(temp, sidecar)
+    except OSError as e:
+        # Still usable, just not cached
+        print(f"Unable to write {sidecar}: {e}")
+    return columns
@@ -0,0 +1,238 @@
+"""Exposure depth maps of image footprints."""
+import math
+from pathlib import Path
+
+import numpy as np
+
+from alog.footprint import unwrap_ra
+
+# Upper bound on the number of footprint rows held at once while rasterising,
+# each with the RAs where it crosses the four edges of its footprint
+CHUNK_CELLS = 400_000
+
+# Longest side of the map when no cell size is given
+DEFAULT_MAP_SIZE = 2048
+
+
+class CoverageMap:
+    """Exposure time in seconds per cell of an equirectangular RA/Dec grid.
+
+    Row `j`, column `i` of `exposure` is the cell whose lower left corner is
+    at RA `ra_min + i * cell`, Dec `dec_min + j * cell`, all in degrees.
+    `ra_min` may lie outside [0, 360) when the map crosses RA 0."""
+
+    def __init__(self, exposure: np.ndarray, ra_min: float, dec_min: float, cell: float, frames: int):
+        self.exposure = exposure
+        self.ra_min = ra_min
+        self.dec_min = dec_min
+        self.cell = cell
+        self.frames = frames
+
+    @property
+    def extent(self) -> tuple[float, float, float, float]:
+        rows, cols = self.exposure.shape
+        return (self.ra_min, self.ra_min + cols * self.cell,
+                self.dec_min, self.dec_min + rows * self.cell)
+
+
+def _extents(dec, width, height):
+    """Half-size in degrees of RA and Dec of a box around each footprint.
+
+    The box holds every point within the angular radius of the corners.
+    Footprints that reach a pole span all RAs."""
+    radius = np.degrees(np.arctan(np.radians(np.hypot(width, height) / 2)))
+    polar = np.abs(dec) + radius >= 90
+    with np.errstate(invalid='ignore'):
+        half_ra = np.degrees(np.arcsin(np.sin(np.radians(radius)) / np.cos(np.radians(dec))))
+    return np.where(polar, 180.0, half_ra), radius
+
+
+def _edge_crossings(a, b, c, tan_row):
+    """RA offsets in [-pi, pi) where rows cross the great circle `(a cos t + b sin t) cos_row + c sin_row = 0`.
+
+    `a`, `b`, `c` are given per footprint and `tan_row` per row of each
+    footprint.  The row is outside the edge, where the sum is positive,
+    between the two crossings.  Where it does not cross both are NaN."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        half = np.arccos(-c / np.hypot(a, b) * tan_row)
+    phi = np.arctan2(b, a)
+    leave, enter = phi - half, phi + half
+    return np.where(leave < -np.pi, leave + 2 * np.pi, leave), np.where(enter >= np.pi, enter - 2 * np.pi, enter)
+
+
+def coverage_map(ra: np.ndarray, dec: np.ndarray, width: np.ndarray, height: np.ndarray,
+                 orientation: np.ndarray, exposure: np.ndarray, cell: float | None = None) -> CoverageMap:
+    """Add up the exposure time of every footprint into the grid cells it covers.
+
+    Footprints are centered at `ra`, `dec`, are `width` by `height` and rotated
+    by `orientation`, all in degrees, in the gnomonic projection at their
+    center, as in `alog.footprint.corners`.  A cell is covered if its center
+    falls inside the footprint; footprints smaller than a cell count towards
+    the cell at their center.  Frames are processed in chunks of similar
+    size so that at most `CHUNK_CELLS` rows of footprints are held at once,
+    whatever the number of frames.
+
+    `cell` is the cell size in degrees; by default the longest side of the map
+    is `DEFAULT_MAP_SIZE` cells.  The map spans at most 360 degrees of RA."""
+    ra = unwrap_ra(np.asarray(ra, dtype=np.float64))
+    dec, width, height, orientation, exposure = (
+        np.asarray(value, dtype=np.float64) for value in (dec, width, height, orientation, exposure))
+
+    half_ra, half_dec = _extents(dec, width, height)
+    if len(ra):
+        ra_min, ra_max = (ra - half_ra).min(), (ra + half_ra).max()
+        dec_min, dec_max = max((dec - half_dec).min(), -90.0), min((dec + half_dec).max(), 90.0)
+    else:
+        ra_min, ra_max, dec_min, dec_max = 0.0, 1.0, 0.0, 1.0
+    # Around the whole sky, footprints are also drawn 360 degrees either side
+    # of their center, so those near one end of the map wrap to the other
+    shifts = [0.0]
+    if ra_max - ra_min >= 360:
+        ra_min = (ra.min() + ra.max()) / 2 - 180
+        ra_max = ra_min + 360
+        shifts = [-360.0, 0.0, 360.0]
+    if cell is None:
+        cell = max(ra_max - ra_min, dec_max - dec_min) / DEFAULT_MAP_SIZE
+    cols = max(1, math.ceil((ra_max - ra_min) / cell))
+    rows = max(1, math.ceil((dec_max - dec_min) / cell))
+
+    # First row and number of rows of the box around each footprint
+    row0 = np.floor((dec - half_dec - dec_min) / cell).astype(np.int64)
+    nrows = np.ceil(2 * half_dec / cell).astype(np.int64) + 2
+
+    # Each footprint covers runs of cells in each row.  Runs are added to a
+    # difference array, one column wider than the map, and summed along rows.
+    runs = np.zeros((rows, cols + 1), dtype=np.float64)
+
+    # Group footprints of similar height so little of each chunk is padding
+    order = np.argsort(nrows, kind='stable')
+    start = 0
+    while start < len(order):
+        end = min(len(order), start + max(1, CHUNK_CELLS // int(nrows[order[start]])))
+        # Shrink the chunk until it fits, the tallest footprint is last
+        while end - start > 1 and (end - start) * int(nrows[order[end - 1]]) > CHUNK_CELLS:
+            end = start + (end - start) // 2
+        chunk = order[start:end]
+        start = end
+
+        r = np.arange(nrows[chunk].max())[np.newaxis, :] + row0[chunk, np.newaxis]
+        row_dec = np.radians(np.clip(dec_min + (r + 0.5) * cell, -90, 90))
+        cos_row, sin_row = np.cos(row_dec), np.sin(row_dec)
+        with np.errstate(divide='ignore'):
+            tan_row = sin_row / cos_row
+        center = np.radians(dec[chunk])[:, np.newaxis]
+        cos_dec0, sin_dec0 = np.cos(center), np.sin(center)
+        angle = np.radians(orientation[chunk])[:, np.newaxis]
+        cos, sin = np.cos(angle), np.sin(angle)
+        half_width = np.radians(width[chunk, np.newaxis] / 2)
+        half_height = np.radians(height[chunk, np.newaxis] / 2)
+
+        # A point at RA offset `t` along the row projects to tangent plane
+        # offsets `x / z`, `y / z`, with x = cos_row sin t,
+        # y = cos_dec0 sin_row - sin_dec0 cos_row cos t and
+        # z = sin_dec0 sin_row + cos_dec0 cos_row cos t.  The footprint is
+        # where both of its axes, u = x cos + y sin and v = y cos - x sin,
+        # are within ±half its size times z, so each edge is a constraint
+        # `(a cos t + b sin t) cos_row + c sin_row <= 0`.  These are (a, b, c) of z, u and v.
+        z = (cos_dec0, 0.0, sin_dec0)
+        u = (-sin * sin_dec0, cos, sin * cos_dec0)
+        v = (-cos * sin_dec0, -sin, cos * cos_dec0)
+        edges = [[sign * axis_term - half * z_term for axis_term, z_term in zip(axis, z)]
+                 for axis, half in ((u, half_width), (v, half_height)) for sign in (1, -1)]
+
+        # Split each row where it crosses an edge, and keep the pieces inside
+        # every edge.  Sweeping from -180 degrees, a row leaves the inside of
+        # an edge at the first of its two crossings and enters it at the second.
+        crossings = np.empty(r.shape + (2 * len(edges),))
+        count = np.zeros(r.shape, dtype=np.int64)
+        for edge, (a, b, c) in enumerate(edges):
+            count += c * sin_row - a * cos_row <= 0  # Inside at -180 degrees
+            crossings[..., 2 * edge], crossings[..., 2 * edge + 1] = _edge_crossings(a, b, c, tan_row)
+        # NaNs, for edges a row does not cross, sort last
+        sweep = np.argsort(crossings, axis=-1)
+        crossings = np.fmin(np.take_along_axis(crossings, sweep, axis=-1), np.pi)
+        steps = 2 * (sweep & 1) - 1
+        counts = np.concatenate([count[..., np.newaxis], count[..., np.newaxis] + np.cumsum(steps, axis=-1)], axis=-1)
+
+        valid = (r >= 0) & (r < rows)
+        frame, row, piece = np.nonzero((counts == len(edges)) & valid[..., np.newaxis])
+        bounds = np.pad(crossings, [(0, 0), (0, 0), (1, 1)], constant_values=(-np.pi, np.pi))
+        lo = np.degrees(bounds[frame, row, piece]) / cell
+        hi = np.degrees(bounds[frame, row, piece + 1]) / cell
+        weights = exposure[chunk][frame]
+        flat = r[frame, row] * (cols + 1)
+
+        covered = np.zeros(len(frame), dtype=bool)
+        for shift in shifts:
+            # Back to RA, and to the columns whose centers are in each piece
+            offset = (ra[chunk][frame] + shift - ra_min) / cell - 0.5
+            first = np.clip(np.ceil(lo + offset), 0, cols).astype(np.int64)
+            last = np.clip(np.ceil(hi + offset) - 1, -1, cols - 1).astype(np.int64)
+            run = first <= last
+            covered |= run
+            runs += np.bincount(flat[run] + first[run], weights=weights[run],
+                                minlength=runs.size).reshape(runs.shape)
+            runs -= np.bincount(flat[run] + last[run] + 1, weights=weights[run],
+                                minlength=runs.size).reshape(runs.shape)
+        missed = np.bincount(frame[covered], minlength=len(chunk)) == 0
+
+        missed = chunk[missed]
+        if len(missed):
+            c = np.clip(((ra[missed] - ra_min) / cell).astype(np.int64), 0, cols - 1)
+            r = np.clip(((dec[missed] - dec_min) / cell).astype(np.int64), 0, rows - 1)
+            np.add.at(runs, (r, c), exposure[missed])
+            np.add.at(runs, (r, c + 1), -exposure[missed])
+
+    total = np.cumsum(runs, axis=1)[:, :cols]
+    return CoverageMap(total, float(ra_min), float(dec_min), float(cell), len(ra))
+
+
+def save_map(coverage: CoverageMap, path: Path):
+    """Save the map as FITS with a plate carree WCS, or as NPY if `path` ends in .npy."""
+    if path.suffix.lower() == '.npy':
+        np.save(path, coverage.exposure)
+        return
+
+    from astropy.io import fits
+
+    header = fits.Header()
+    header['CTYPE1'] = 'RA---CAR'
+    header['CTYPE2'] = 'DEC--CAR'
+    header['CUNIT1'] = 'deg'
+    header['CUNIT2'] = 'deg'
+    # Reference the equator, so the grid is a plain RA/Dec grid
+    header['CRVAL1'] = coverage.ra_min % 360
+    header['CRPIX1'] = 0.5
+    header['CDELT1'] = coverage.cell
+    header['CRVAL2'] = 0.0
+    header['CRPIX2'] = 0.5 - coverage.dec_min / coverage.cell
+    header['CDELT2'] = coverage.cell
+    header['BUNIT'] = 's'
+    header['NFRAMES'] = (coverage.frames, 'Number of footprints in the map')
+    fits.PrimaryHDU(coverage.exposure.astype(np.float32), header=header).writeto(path, overwrite=True)
+
+
+def render_map(coverage: CoverageMap, path: Path):
+    """Render the map as an image, with a logarithmic colour scale."""
+    from matplotlib.colors import LogNorm
+    from matplotlib.figure import Figure
+
+    ra_min, ra_max, dec_min, dec_max = coverage.extent
+    exposure = np.ma.masked_less_equal(coverage.exposure, 0)
+
+    fig = Figure(figsize=(12, 10))
+    ax = fig.subplots()
+    ax.set_facecolor('black')
+    norm = LogNorm() if exposure.count() else None
+    image = ax.imshow(exposure, origin='lower', extent=(ra_min, ra_max, dec_min, dec_max),
+                      norm=norm, cmap='inferno', interpolation='nearest')
+    ax.set_xlim(ra_max, ra_min)  # Flip RA
+    mid_dec = (dec_min + dec_max) / 2
+    ax.set_aspect(1.0 / max(0.05, abs(math.cos(math.radians(mid_dec)))))
+    ax.grid(True, linestyle='--', alpha=0.3, color='gray')
+    ax.set_xlabel('Right Ascension (degrees)')
+    ax.set_ylabel('Declination (degrees)')
+    ax.set_title(f'Exposure depth of {coverage.frames} frames')
+    fig.colorbar(image, ax=ax, label='Exposure (seconds)')
+    fig.tight_layout()
+    fig.savefig(path, dpi=150)
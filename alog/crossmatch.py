@@ -0,0 +1,80 @@
+"""Cross-matching image footprints against catalog objects."""
+import numpy as np
+
+from alog.skyindex import SkyIndex
+
+
+def _tangent_offsets(ra0, dec0, ra, dec) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gnomonic projection of positions onto the tangent planes at `ra0`, `dec0`, elementwise.
+
+    Returns the offsets east and north in degrees, and whether each position
+    is on the near side of the sky, where the projection is defined."""
+    ra0, dec0, ra, dec = (np.radians(value) for value in (ra0, dec0, ra, dec))
+    cos_dec, sin_dec = np.cos(dec), np.sin(dec)
+    cos_dec0, sin_dec0 = np.cos(dec0), np.sin(dec0)
+    cos_dra = np.cos(ra - ra0)
+
+    cos_c = sin_dec0 * sin_dec + cos_dec0 * cos_dec * cos_dra
+    near = cos_c > 0
+    cos_c = np.where(near, cos_c, 1.0)
+    x = cos_dec * np.sin(ra - ra0) / cos_c
+    y = (cos_dec0 * sin_dec - sin_dec0 * cos_dec * cos_dra) / cos_c
+    return np.degrees(x), np.degrees(y), near
+
+
+def footprint_matches(ra: np.ndarray, dec: np.ndarray, width: np.ndarray, height: np.ndarray,
+                      orientation: np.ndarray, object_ra: np.ndarray, object_dec: np.ndarray,
+                      object_radius: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Find the objects that overlap each footprint.
+
+    Footprints are centered at `ra`, `dec`, are `width` by `height` and rotated
+    by `orientation`, and objects are discs of `object_radius`, all in
+    degrees.  Candidates come from cone queries on an index of the footprint
+    centers, one per object that could reach a footprint, and are then tested
+    against the rotated footprints all at once, in the tangent plane of each
+    footprint.  Returns the footprint and object index of every overlap,
+    sorted by footprint and then object."""
+    ra, dec, width, height, orientation, object_ra, object_dec, object_radius = (
+        np.asarray(value, dtype=np.float64)
+        for value in (ra, dec, width, height, orientation, object_ra, object_dec, object_radius))
+    if len(ra) == 0 or len(object_ra) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # No footprint reaches further than this from its center
+    reach = np.hypot(width, height).max() / 2
+    radius = reach + object_radius
+
+    # Objects too far north or south of every footprint need no query
+    decs = np.sort(dec)
+    near = (np.searchsorted(decs, object_dec + radius, side='right')
+            > np.searchsorted(decs, object_dec - radius, side='left'))
+
+    index = SkyIndex(ra, dec)
+    frames = []
+    objects = []
+    for obj in np.flatnonzero(near):
+        found = index.query_cone(object_ra[obj], object_dec[obj], radius[obj])
+        if len(found):
+            frames.append(found)
+            objects.append(np.full(len(found), obj))
+    if not frames:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    frames = np.concatenate(frames)
+    objects = np.concatenate(objects)
+
+    # Object centers in footprint axes, as in `coverage_map`: the footprint
+    # covers |x cos + y sin| <= width / 2 and |y cos - x sin| <= height / 2
+    x, y, visible = _tangent_offsets(ra[frames], dec[frames], object_ra[objects], object_dec[objects])
+    angle = np.radians(orientation[frames])
+    cos, sin = np.cos(angle), np.sin(angle)
+    u = x * cos + y * sin
+    v = y * cos - x * sin
+
+    # Distance from the object center to the footprint, 0 inside it
+    du = np.maximum(np.abs(u) - width[frames] / 2, 0)
+    dv = np.maximum(np.abs(v) - height[frames] / 2, 0)
+    hit = visible & (du ** 2 + dv ** 2 <= object_radius[objects] ** 2)
+
+    frames, objects = frames[hit], objects[hit]
+    order = np.lexsort((objects, frames))
+    return frames[order], objects[order]
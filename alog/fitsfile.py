@@ -0,0 +1,134 @@
+"""FITS file reading."""
+import hashlib
+import re
+from pathlib import Path
+
+# FITS files are made of 2880 byte blocks, headers of 80 byte cards.
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+# Read in whole blocks so header blocks never straddle two chunks.
+CHUNK_SIZE = BLOCK_SIZE * 364
+
+# Give up looking for the end of a header after this many bytes.
+MAX_HEADER_SIZE = BLOCK_SIZE * 1000
+
+# Keywords read from the primary header when describing a file.
+HEADER_KEYWORDS = ('EXPTIME', 'INSTRUME', 'STACKCNT', 'RA', 'DEC', 'TOTALEXP', 'NAXIS1', 'NAXIS2')
+
+_INTEGER = re.compile(rb'[+-]?\d+')
+_FLOAT = re.compile(rb'[+-]?(?:\d+\.?\d*|\.\d+)(?:[EeDd][+-]?\d+)?')
+
+
+def _find_end(header: bytearray, start: int) -> int | None:
+    """Return the length of the header if an END card is found after `start`."""
+    for block in range(start - start % BLOCK_SIZE, len(header) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        for card in range(block, block + BLOCK_SIZE, CARD_SIZE):
+            if header[card:card + 8] == b'END     ':
+                return block + BLOCK_SIZE
+    return None
+
+
+def _card_value(field: bytes):
+    """Value of a card, from the bytes after its `= `.
+
+    Raises ValueError for anything but a plain string, logical, integer or
+    real value, e.g. a long string continued on CONTINUE cards."""
+    field = field.lstrip(b' ')
+    if field.startswith(b"'"):
+        # A quote inside a string is written as two
+        end = 1
+        while (end := field.find(b"'", end)) >= 0 and field[end + 1:end + 2] == b"'":
+            end += 2
+        if end < 0:
+            raise ValueError('unterminated string')
+        value = field[1:end].replace(b"''", b"'").decode('ascii').rstrip(' ')
+        if value.endswith('&'):
+            raise ValueError('long string')
+        return value
+
+    value = field.split(b'/', 1)[0].strip(b' ')
+    if value == b'T':
+        return True
+    if value == b'F':
+        return False
+    if _INTEGER.fullmatch(value):
+        return int(value)
+    if _FLOAT.fullmatch(value):
+        return float(value.replace(b'D', b'E').replace(b'd', b'e'))
+    raise ValueError(f'unsupported value {value!r}')
+
+
+def parse_header(header: bytes, keywords=HEADER_KEYWORDS) -> dict | None:
+    """Decode the values of some keywords from the raw cards of a header.
+
+    Only the cards of the requested keywords are decoded, the first of each
+    if it is repeated.  Returns None if one of them holds anything unusual,
+    so the caller can fall back to astropy."""
+    header = bytes(header)
+    wanted = {keyword.encode('ascii').ljust(8): keyword for keyword in keywords}
+    values = {}
+    for card in range(0, len(header) - CARD_SIZE + 1, CARD_SIZE):
+        name = header[card:card + 8]
+        if name == b'END     ':
+            break
+        keyword = wanted.get(name)
+        if keyword is None or keyword in values:
+            continue
+        if header[card + 8:card + 10] != b'= ':
+            return None
+        try:
+            values[keyword] = _card_value(header[card + 10:card + CARD_SIZE])
+        except ValueError:
+            return None
+    return values
+
+
+def _astropy_header(header, keywords) -> dict:
+    return {keyword: header[keyword] for keyword in keywords if keyword in header}
+
+
+def hash_and_read_header(pathname: Path, keywords=HEADER_KEYWORDS) -> tuple[str, dict, int]:
+    """Hash a FITS file and read keywords from its primary header in a single pass.
+
+    The file is streamed through a fixed size buffer, so memory use does not
+    depend on the file size.  The header is taken from the same bytes as the
+    hash and only the requested cards are decoded; files that do not look
+    like FITS, or whose cards `parse_header` does not handle, fall back to
+    astropy.
+
+    Returns the SHA256 hex digest, the values of the keywords found in the
+    header and the number of bytes read."""
+    sha256 = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    header = bytearray()
+    header_size = None
+    collecting = True
+    size = 0
+
+    with open(pathname, 'rb', buffering=0) as f:
+        while n := f.readinto(buffer):
+            chunk = view[:n]
+            sha256.update(chunk)
+            size += n
+
+            if collecting:
+                start = len(header)
+                header += chunk
+                if not header.startswith(b'SIMPLE  ='[:len(header)]):
+                    collecting = False
+                elif (header_size := _find_end(header, start)) is not None:
+                    del header[header_size:]
+                    collecting = False
+                elif len(header) > MAX_HEADER_SIZE:
+                    collecting = False
+
+    if header_size is not None and (values := parse_header(header, keywords)) is not None:
+        return sha256.hexdigest(), values, size
+
+    from astropy.io import fits
+
+    if header_size is None:
+        return sha256.hexdigest(), _astropy_header(fits.getheader(pathname), keywords), size
+    return sha256.hexdigest(), _astropy_header(fits.Header.fromstring(header.decode('ascii')), keywords), size
@@ -0,0 +1,76 @@
+"""Footprints of image rectangles on the sky."""
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from alog.models import ImageRectangle
+
+# Corners of a unit square centered at the origin, counterclockwise
+_UNIT_CORNERS = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]])
+
+
+def rectangle_arrays(rectangles: 'list[ImageRectangle]') -> dict[str, np.ndarray]:
+    """Turn rectangles into one array per field."""
+    fields = ('x', 'y', 'width', 'height', 'rotation', 'total_exposure_time')
+    values = np.array([[getattr(rect, field) for field in fields] for rect in rectangles],
+                      dtype=np.float64).reshape(-1, len(fields))
+    return dict(zip(fields, values.T))
+
+
+def unwrap_ra(ra: np.ndarray) -> np.ndarray:
+    """Shift RAs by multiples of 360 to lie within 180 degrees of their circular mean.
+
+    Footprints on both sides of RA 0/360 then have continuous coordinates."""
+    if len(ra) == 0:
+        return ra
+    radians = np.radians(ra)
+    mean = np.mod(np.degrees(np.arctan2(np.sin(radians).mean(), np.cos(radians).mean())), 360)
+    return mean + np.mod(ra - mean + 180, 360) - 180
+
+
+def _sky_positions(ra0, dec0, x, y) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse gnomonic projection of offsets in the tangent planes at `ra0`, `dec0`, elementwise.
+
+    `x` and `y` are offsets east and north in degrees, as from
+    `alog.crossmatch._tangent_offsets`.  Returns RA and Dec in degrees, with
+    RA within 180 degrees of `ra0`."""
+    ra0, dec0, x, y = (np.radians(value) for value in (ra0, dec0, x, y))
+    cos_dec0, sin_dec0 = np.cos(dec0), np.sin(dec0)
+    denominator = cos_dec0 - y * sin_dec0
+    ra = ra0 + np.arctan2(x, denominator)
+    dec = np.arctan2(sin_dec0 + y * cos_dec0, np.hypot(x, denominator))
+    return np.degrees(ra), np.degrees(dec)
+
+
+def corners(x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray,
+            rotation: np.ndarray) -> np.ndarray:
+    """Compute the corners of every rectangle at once, as an (N, 4, 2) array of (RA, Dec) in degrees.
+
+    `x`, `y` are the RA and Dec of the center, and `width`, `height` are in
+    degrees.  Each rectangle is rotated by `rotation` degrees about its
+    center in its tangent plane, as in `coverage_map`, so footprints keep
+    their shape at any declination.  RAs are unwrapped, see `unwrap_ra`."""
+    ra = unwrap_ra(x)
+    angle = np.radians(rotation)
+    cos, sin = np.cos(angle), np.sin(angle)
+
+    # Scale the unit square to each rectangle, rotate it in the tangent plane, then project it
+    local_x = _UNIT_CORNERS[:, 0] * width[:, np.newaxis]
+    local_y = _UNIT_CORNERS[:, 1] * height[:, np.newaxis]
+    east = local_x * cos[:, np.newaxis] - local_y * sin[:, np.newaxis]
+    north = local_x * sin[:, np.newaxis] + local_y * cos[:, np.newaxis]
+    return np.stack(_sky_positions(ra[:, np.newaxis], y[:, np.newaxis], east, north), axis=-1)
+
+
+def rectangle_corners(rectangles: 'list[ImageRectangle]') -> np.ndarray:
+    """Corners of rectangles, see `corners`."""
+    arrays = rectangle_arrays(rectangles)
+    return corners(arrays['x'], arrays['y'], arrays['width'], arrays['height'], arrays['rotation'])
+
+
+def bounds(corners: np.ndarray) -> tuple[float, float, float, float]:
+    """Return the minimum and maximum RA and Dec over all corners."""
+    min_ra, min_dec = corners.min(axis=(0, 1))
+    max_ra, max_dec = corners.max(axis=(0, 1))
+    return float(min_ra), float(max_ra), float(min_dec), float(max_dec)
@@ -1,90 +1,52 @@
+from pathlib import Path
+
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import numpy as np
 import math
-from skyfield.api import load
-from skyfield.data import hipparcos
-from skyfield.named_stars import named_star_dict
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
 
+from alog.footprint import bounds, rectangle_arrays, rectangle_corners
 from alog.models import ImageRectangle
+from alog.stars import bright_stars, spectral_colors, star_index, star_names
+
+# Faintest stars drawn by default
+MAGNITUDE_LIMIT = 10.0
+
 
+def preload(magnitude_limit=MAGNITUDE_LIMIT):
+    """Load the star data used by `display_rectangles_and_stars`, so later charts reuse it."""
+    star_index(magnitude_limit)
+    star_names()
+    spectral_colors(np.empty(0, dtype='S1'))
 
-def display_rectangles_and_stars(rectangles: list[ImageRectangle], facecolor='blue', magnitude_limit=10.0):
+
+def display_rectangles_and_stars(rectangles: list[ImageRectangle], facecolor='blue', magnitude_limit=MAGNITUDE_LIMIT,
+                                 output: Path | None = None):
     """
     Display rectangles and visible stars on a celestial chart.
     
     Args:
-        rectangles: List of dictionaries, each containing:
-            - x, y: coordinates (x = right ascension in hours, y = declination in degrees)
+        rectangles: Image rectangles, with:
+            - x, y: coordinates (x = right ascension, y = declination, in degrees)
             - width, height: dimensions of the rectangle
             - rotation: rotation angle in degrees
         magnitude_limit: Stars brighter than this magnitude will be displayed (default: 5.0)
+        output: Save the chart to this file instead of showing it
     """
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(12, 10))
 
-    # Track min/max coordinates to set proper axis limits
-    min_ra, max_ra = float('inf'), float('-inf')
-    min_dec, max_dec = float('inf'), float('-inf')
-
-    grand_total_exposure = sum([rect.total_exposure_time for rect in rectangles])
-
-    # Plot each rectangle
-    for rect in rectangles:
-        # Convert RA to degrees for consistency (RA is usually in hours, 1 hour = 15 degrees)
-        ra_deg = rect.x * 15 if rect.x < 24 else rect.x
-        dec_deg = rect.y
-
-        width_deg = rect.width
-        height_deg = rect.height
-        angle_deg = rect.rotation
-        angle_rad = math.radians(angle_deg)
-
-        # Create a rectangle centered at origin
-        rect_points = np.array([
-            [-width_deg / 2, -height_deg / 2],
-            [width_deg / 2, -height_deg / 2],
-            [width_deg / 2, height_deg / 2],
-            [-width_deg / 2, height_deg / 2]
-        ])
-
-        # Rotation matrix
-        rotation_matrix = np.array([
-            [math.cos(angle_rad), -math.sin(angle_rad)],
-            [math.sin(angle_rad), math.cos(angle_rad)]
-        ])
-
-        # Rotate rectangle points
-        rotated_points = np.dot(rect_points, rotation_matrix.T)
-
-        # Translate rectangle to center position
-        final_points = rotated_points + np.array([ra_deg, dec_deg])
-
-        # Draw the rectangle.  Make the alpha value of a subframe low,
-        # unless exposure time is over a minute.
-        # alpha = min(0.5, 50 * rect['total_exposure_time'] / grand_total_exposure)
-
-        if rect.total_exposure_time < 60:
-            alpha = min(1.0, 20 / len(rectangles))
-        else:
-            alpha = 0.5
-        polygon = patches.Polygon(final_points, closed=True,
-                                  edgecolor='blue', facecolor='blue', alpha=alpha, zorder=3)
-        ax.add_patch(polygon)
-
-        # Mark the center point
-        # ax.plot(ra_deg, dec_deg, 'ro', markersize=4)
-
-        # Update min/max coordinates
-        rect_min_ra = final_points[:, 0].min()
-        rect_max_ra = final_points[:, 0].max()
-        rect_min_dec = final_points[:, 1].min()
-        rect_max_dec = final_points[:, 1].max()
-
-        min_ra = min(min_ra, rect_min_ra)
-        max_ra = max(max_ra, rect_max_ra)
-        min_dec = min(min_dec, rect_min_dec)
-        max_dec = max(max_dec, rect_max_dec)
+    # All footprints in one array, drawn as a single collection.  Make the
+    # alpha value of a subframe low, unless exposure time is over a minute.
+    footprints = rectangle_corners(rectangles)
+    min_ra, max_ra, min_dec, max_dec = bounds(footprints)
+
+    exposure = rectangle_arrays(rectangles)['total_exposure_time']
+    alpha = np.where(exposure < 60, min(1.0, 20 / len(rectangles)), 0.5)
+    colors = np.tile(to_rgba(facecolor), (len(rectangles), 1))
+    colors[:, 3] = alpha
+    ax.add_collection(PolyCollection(footprints, closed=True, facecolors=colors, edgecolors=colors, zorder=3))
 
     # Add some padding to the plot
     padding = max(max_ra - min_ra, max_dec - min_dec) * 0.5 # Adjust this number to adjust padding
@@ -93,64 +55,31 @@ def display_rectangles_and_stars(rectangles: list[ImageRectangle], facecolor='bl
     plot_min_dec = min_dec - padding
     plot_max_dec = max_dec + padding
 
-    star_names = {v: k for k, v in named_star_dict.items()}
-    # Load Hipparcos catalog
-    with load.open(hipparcos.URL) as f:
-        df = hipparcos.load_dataframe(f)
-
-    # Filter stars by magnitude
-    bright_stars = df[df['magnitude'] <= magnitude_limit]
-    plotted_stars = 0
-
-    # Plot stars
-    for idx, star in bright_stars.iterrows():
-        ra_hours = star['ra_hours']
-        dec_degrees = star['dec_degrees']
-        magnitude = star['magnitude']
-
-        # Convert RA to degrees
-        ra_degrees = ra_hours * 15
-
-        # Check if star is within our viewing area
-        if (plot_min_ra <= ra_degrees <= plot_max_ra and
-                plot_min_dec <= dec_degrees <= plot_max_dec):
-
-            # Size of star marker based on magnitude (brighter stars = bigger)
-            # Magnitude scale is reversed (smaller = brighter)
-            # marker_size = max(1, ((magnitude_limit + 1) - magnitude) * 2)
-            # max_marker_size = 100
-            # marker_size = max_marker_size * 10 ** (magnitude / -2.5)
-            # marker_size = (0.5 + magnitude_limit - magnitude) ** 2.0
-            marker_size = min(7.5, 50 * 10 ** ((-1.44 - magnitude) / 4))
-
-            # Color based on spectral type (simplified)
-            spec_type = str(star['spectrum']).strip()[0] if 'spectrum' in star else ''
-            color = 'white'
-            if spec_type == 'O' or spec_type == 'B':
-                color = 'lightskyblue'  # Blue-white
-            elif spec_type == 'A':
-                color = 'white'  # White
-            elif spec_type == 'F':
-                color = 'ivory'  # Yellowish-white
-            elif spec_type == 'G':
-                color = 'yellow'  # Yellow
-            elif spec_type == 'K':
-                color = 'orange'  # Orange
-            elif spec_type == 'M':
-                color = 'red'  # Red
-
-            # Plot the star
-            ax.plot(ra_degrees, dec_degrees, 'o', markersize=marker_size,
-                    color=color, markeredgecolor='none', alpha=1.0, zorder=3)
-
-            # Add label for very bright stars (magnitude < 2)
-            if magnitude < 3.0 and star.name in star_names:
-                ax.text(ra_degrees, dec_degrees, f" {star_names[star.name]}",
-                        fontsize=8, color='white', alpha=0.7,
-                        bbox=dict(facecolor='black', alpha=0.3, edgecolor='none', pad=1))
-            plotted_stars += 1
-
-    print(f"Number of stars brighter than {magnitude_limit}: {len(bright_stars)}.  Plotted: {plotted_stars} stars.")
+    # Stars from the cached Hipparcos catalog, filtered by magnitude
+    all_stars = bright_stars(magnitude_limit)
+
+    # Find the stars within our viewing area, which may extend past RA 0/360
+    stars = all_stars[star_index(magnitude_limit).query_box(plot_min_ra, plot_max_ra, plot_min_dec, plot_max_dec)]
+    star_ra = plot_min_ra + np.mod(stars['ra'] - plot_min_ra, 360)
+
+    # Size of star marker based on magnitude (brighter stars = bigger)
+    # Magnitude scale is reversed (smaller = brighter)
+    marker_size = np.minimum(7.5, 50 * 10 ** ((-1.44 - stars['magnitude']) / 4))
+
+    # Plot the stars, coloured by spectral type.  Scatter sizes are areas.
+    ax.scatter(star_ra, stars['dec'], s=marker_size ** 2, c=spectral_colors(stars['spectrum']),
+               marker='o', edgecolors='none', alpha=1.0, zorder=3)
+
+    # Add label for very bright stars (magnitude < 3)
+    names = star_names()
+    bright = stars['magnitude'] < 3.0
+    for star, ra in zip(stars[bright], star_ra[bright]):
+        if star['hip'] in names:
+            ax.text(ra, star['dec'], f" {names[star['hip']]}",
+                    fontsize=8, color='white', alpha=0.7,
+                    bbox=dict(facecolor='black', alpha=0.3, edgecolor='none', pad=1))
+
+    print(f"Number of stars brighter than {magnitude_limit}: {len(all_stars)}.  Plotted: {len(stars)} stars.")
 
     # Load constellations
     # url = ('https://raw.githubusercontent.com/Stellarium/stellarium/master'
@@ -196,7 +125,11 @@ def display_rectangles_and_stars(rectangles: list[ImageRectangle], facecolor='bl
                 fontsize=8, color='white', bbox=dict(facecolor='black', alpha=0.7))
 
     plt.tight_layout()
-    plt.show()
+    if output is not None:
+        fig.savefig(output, dpi=150)
+        plt.close(fig)
+    else:
+        plt.show()
 
     return fig, ax
 
@@ -204,12 +137,12 @@ def display_rectangles_and_stars(rectangles: list[ImageRectangle], facecolor='bl
 # Example usage
 if __name__ == "__main__":
     # Example list of rectangles representing fields of view
-    # x = RA in hours (0-24), y = Dec in degrees (-90 to +90)
+    # x = RA in degrees (0-360), y = Dec in degrees (-90 to +90)
     rectangles = [
-        {'x': 5.5, 'y': 20, 'width': 5, 'height': 5, 'rotation': 0},  # Near Orion/Taurus
-        {'x': 12.5, 'y': 12, 'width': 4, 'height': 4, 'rotation': 15},  # Near Virgo
-        {'x': 20.7, 'y': -30, 'width': 6, 'height': 3, 'rotation': 30},  # Southern sky near Fomalhaut
-        {'x': 2.5, 'y': 42, 'width': 3.5, 'height': 3.5, 'rotation': 0}  # Near Andromeda
+        ImageRectangle(x=82.5, y=20, width=5, height=5, rotation=0, total_exposure_time=600),  # Near Orion/Taurus
+        ImageRectangle(x=187.5, y=12, width=4, height=4, rotation=15, total_exposure_time=600),  # Near Virgo
+        ImageRectangle(x=310.5, y=-30, width=6, height=3, rotation=30, total_exposure_time=600),  # Southern sky near Fomalhaut
+        ImageRectangle(x=37.5, y=42, width=3.5, height=3.5, rotation=0, total_exposure_time=600)  # Near Andromeda
     ]
 
     display_rectangles_and_stars(rectangles, magnitude_limit=4.5)
@@ -1,99 +1,90 @@
 """Starmap plotting"""
+import io
 import math
+from importlib import metadata
+from pathlib import Path
 
 import numpy as np
-from starplot import MapPlot, Projection, _, PolygonStyle, ColorStr
-from starplot.styles import PlotStyle, extensions
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox, IdentityTransform
 
+from alog.chart_cache import ChartCache, chart_key
+from alog.footprint import bounds, rectangle_corners
 from alog.models import ImageRectangle
+from alog.settings import Settings
 
+# Size of the chart, and the DPI starplot exports at
+RESOLUTION = 3600
+EXPORT_DPI = 144
+PADDING = 0.2
 
-def plot_graph(rectangles: list[ImageRectangle]):
-    style = PlotStyle().extend(
-        # extensions.BLUE_LIGHT,
-        extensions.BLUE_GOLD,
-        extensions.MAP,
-        {
-            "legend": {
-                "location": "lower right",  # show legend inside map
-                "num_columns": 3,
-                "background_alpha": 1,
-            },
-        },
-    )
+# Points along each edge of a footprint, so edges curve with the projection
+EDGE_POINTS = 8
 
-    # Track min/max coordinates to set proper axis limits
-    min_ra, max_ra = float('inf'), float('-inf')
-    min_dec, max_dec = float('inf'), float('-inf')
+# Bump when the background layers change, so cached backgrounds are redrawn
+BACKGROUND_VERSION = 2
 
-    grand_total_exposure = sum([rect.total_exposure_time for rect in rectangles])
-    print(f'{grand_total_exposure=}')
+# RA and Dec as starplot maps them onto its projections: longitudes on a
+# sphere, increasing to the west
+RA_DEC_PROJ4 = '+proj=latlong +axis=wnu +ellps=sphere +a=6378137 +f=0 +no_defs'
 
-    # Plot each rectangle
-    for rect in rectangles:
-        # Convert RA to degrees for consistency (RA is usually in hours, 1 hour = 15 degrees)
-        ra_deg = rect.x * 15 if rect.x < 24 else rect.x
-        dec_deg = rect.y
-
-        width_deg = rect.width
-        height_deg = rect.height
-        angle_deg = rect.rotation
-        angle_rad = math.radians(angle_deg)
-
-        # Create a rectangle centered at origin
-        rect_points = np.array([
-            [-width_deg / 2, -height_deg / 2],
-            [width_deg / 2, -height_deg / 2],
-            [width_deg / 2, height_deg / 2],
-            [-width_deg / 2, height_deg / 2]
-        ])
-
-        # Rotation matrix
-        rotation_matrix = np.array([
-            [math.cos(angle_rad), -math.sin(angle_rad)],
-            [math.sin(angle_rad), math.cos(angle_rad)]
-        ])
-
-        # Rotate rectangle points
-        rotated_points = np.dot(rect_points, rotation_matrix.T)
-
-        # Translate rectangle to center position
-        final_points = rotated_points + np.array([ra_deg, dec_deg])
-
-
-        # if rect.total_exposure_time < 60:
-        #     alpha = min(1.0, 20 / len(rectangles))
-        # else:
-        #     alpha = 0.5
-        # polygon = patches.Polygon(final_points, closed=True,
-        #                           edgecolor='blue', facecolor='blue', alpha=alpha, zorder=3)
-        # ax.add_patch(polygon)
-
-        # Mark the center point
-        # ax.plot(ra_deg, dec_deg, 'ro', markersize=4)
-
-        # Update min/max coordinates
-        rect_min_ra = final_points[:, 0].min()
-        rect_max_ra = final_points[:, 0].max()
-        rect_min_dec = final_points[:, 1].min()
-        rect_max_dec = final_points[:, 1].max()
-
-        min_ra = min(min_ra, rect_min_ra)
-        max_ra = max(max_ra, rect_max_ra)
-        min_dec = min(min_dec, rect_min_dec)
-        max_dec = max(max_dec, rect_max_dec)
 
+# Chart style, as names of starplot style extensions and overrides.  Kept
+# as plain data so the cache key is known without importing starplot.
+STYLE_EXTENSIONS = (
+    # 'BLUE_LIGHT',
+    'BLUE_GOLD',
+    'MAP',
+)
+STYLE_OVERRIDES = {
+    "legend": {
+        "location": "lower right",  # show legend inside map
+        "num_columns": 3,
+        "background_alpha": 1,
+    },
+}
 
-    print(min_ra, max_ra, min_dec, max_dec)
+
+def _style():
+    from starplot.styles import PlotStyle, extensions
+
+    return PlotStyle().extend(*(getattr(extensions, name) for name in STYLE_EXTENSIONS), STYLE_OVERRIDES)
+
+
+def _map_bounds(min_ra, max_ra, min_dec, max_dec) -> tuple[float, float, float, float]:
+    """Area of the chart around the footprints.
+
+    The edges are rounded outwards, so sessions on the same target usually
+    share a chart background."""
     padding = max(max_ra - min_ra, max_dec - min_dec) * 1.5 # Adjust this number to adjust padding
+    ra_min, ra_max = min_ra - padding, max_ra + padding
+    dec_min, dec_max = min_dec - padding, max_dec + padding
+
+    step = 10 ** math.floor(math.log10(max(ra_max - ra_min, dec_max - dec_min, 1e-3))) / 2
+    return (math.floor(ra_min / step) * step, math.ceil(ra_max / step) * step,
+            max(math.floor(dec_min / step) * step, -90.0), min(math.ceil(dec_max / step) * step, 90.0))
+
+
+def _render_background(map_bounds) -> tuple[np.ndarray, dict]:
+    """Draw everything but the footprints with starplot.
+
+    Returns the exported image, and the geometry needed to draw on it: the
+    map projection, the affine transform from projected coordinates to image
+    pixels, and the pixel box of the map."""
+    from PIL import Image
+    from starplot import MapPlot, Projection, _
+
+    ra_min, ra_max, dec_min, dec_max = map_bounds
     p = MapPlot(
         projection=Projection.MERCATOR,  # specify a non-perspective projection
-        ra_min=min_ra - padding,  # limit the map to a specific area
-        ra_max=max_ra + padding,
-        dec_min=min_dec - padding,
-        dec_max=max_dec + padding,
-        style=style,
-        resolution=3600,
+        ra_min=ra_min,  # limit the map to a specific area
+        ra_max=ra_max,
+        dec_min=dec_min,
+        dec_max=dec_max,
+        style=_style(),
+        resolution=RESOLUTION,
         autoscale=True,  # automatically adjust the scale based on the resolution
     )
 
@@ -101,25 +92,6 @@ def plot_graph(rectangles: list[ImageRectangle]):
     p.constellations()
     p.constellation_borders()
 
-    for rect in rectangles:
-        # alpha = 0.1
-        # Draw the rectangle.  Make the alpha value of a subframe low,
-        # unless exposure time is over a minute.
-        if rect.height > 2.0:
-            alpha = rect.total_exposure_time / grand_total_exposure
-            color = ColorStr('#0f0')
-        else:
-            alpha = 0.1
-            color = ColorStr('#00f')
-
-        p.rectangle(
-            center=(rect.x,rect.y),
-            height_degrees=rect.height,
-            width_degrees=rect.width,
-            angle=rect.rotation,
-            style=PolygonStyle(color=color, alpha=alpha),
-        )
-
     p.stars(
         where=[_.magnitude < 8], bayer_labels=True, flamsteed_labels=True
     )  # include Bayer and Flamsteed labels with the stars
@@ -137,7 +109,112 @@ def plot_graph(rectangles: list[ImageRectangle]):
 
     p.constellation_labels()  # Plot the constellation labels last for best placement
 
-    p.export("tutorial_04.png", padding=0.2)
+    # Export like `MapPlot.export`, but with the tight box fixed up front so
+    # it is known where the map lands in the image
+    fig = p.fig
+    fig.canvas.draw()
+    box = fig.get_tightbbox(fig.canvas.get_renderer()).padded(PADDING)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches=box, dpi=EXPORT_DPI)
+    image = np.asarray(Image.open(buffer).convert('RGBA'))
+
+    # Display coordinates are at the figure DPI, from the figure's lower left
+    to_pixels = np.array([
+        [EXPORT_DPI / fig.dpi, 0, -box.x0 * EXPORT_DPI],
+        [0, EXPORT_DPI / fig.dpi, -box.y0 * EXPORT_DPI],
+        [0, 0, 1],
+    ])
+    clip = Bbox(p.ax.bbox.get_points() * EXPORT_DPI / fig.dpi - [box.x0 * EXPORT_DPI, box.y0 * EXPORT_DPI])
+    geometry = {
+        # The axes' cartopy projection, which is a pyproj CRS
+        'projection': p.ax.projection.to_wkt(),
+        'transform': (to_pixels @ p.ax.transData.get_matrix()).tolist(),
+        'clip': clip.get_points().tolist(),
+        'scale': p.scale,
+    }
+    return image, geometry
+
+
+def _densify(footprints: np.ndarray) -> np.ndarray:
+    """Add points along the edges of (N, 4, 2) footprints."""
+    t = np.linspace(0, 1, EDGE_POINTS, endpoint=False)[:, np.newaxis]
+    following = np.roll(footprints, -1, axis=1)
+    edges = footprints[:, :, np.newaxis, :] + t * (following - footprints)[:, :, np.newaxis, :]
+    return edges.reshape(len(footprints), -1, 2)
+
+
+def _composite(image: np.ndarray, geometry: dict, footprints: np.ndarray, colors: np.ndarray, output: Path):
+    """Draw footprints on a background and save the result.
+
+    Only the part of the image under the footprints is drawn by matplotlib
+    and blended onto the background."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.image import imsave
+    from pyproj import CRS, Transformer
+
+    transformer = Transformer.from_crs(CRS.from_proj4(RA_DEC_PROJ4), CRS.from_wkt(geometry['projection']),
+                                       always_xy=True)
+    points = _densify(footprints)
+    x, y = transformer.transform(points[..., 0], points[..., 1])
+    projected = np.stack([x, y, np.ones_like(x)], axis=-1)
+    pixels = (projected @ np.array(geometry['transform']).T)[..., :2]
+
+    # Pixel box of the footprints (from the lower left), within the map
+    height, width = image.shape[:2]
+    clip = np.array(geometry['clip'])
+    lo = np.maximum(np.floor(pixels.reshape(-1, 2).min(axis=0)) - 2, np.maximum(clip[0], 0)).astype(int)
+    hi = np.minimum(np.ceil(pixels.reshape(-1, 2).max(axis=0)) + 2, np.minimum(clip[1], [width, height])).astype(int)
+
+    composite = image[..., :3].copy()
+    if np.all(hi > lo):
+        fig = Figure(figsize=((hi - lo) / EXPORT_DPI), dpi=EXPORT_DPI)
+        fig.patch.set_alpha(0)
+        polygons = PolyCollection(pixels - lo, closed=True, facecolors=colors, edgecolors=colors,
+                                  linewidths=geometry['scale'], transform=IdentityTransform())
+        polygons.set_clip_box(Bbox(clip - lo))
+        fig.add_artist(polygons)
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        overlay = np.asarray(canvas.buffer_rgba())
+
+        # The overlay is drawn top down, so its top row is at `hi`
+        rows, cols = overlay.shape[:2]
+        top = height - lo[1] - rows
+        region = composite[top:top + rows, lo[0]:lo[0] + cols]
+        alpha = overlay[:region.shape[0], :region.shape[1], 3:] / 255.0
+        blended = overlay[:region.shape[0], :region.shape[1], :3] * alpha + region * (1 - alpha)
+        region[:] = np.round(blended).astype(np.uint8)
+
+    # Charts are mostly flat areas, which the fastest compression handles about as well
+    imsave(output, composite, pil_kwargs={'compress_level': 1} if output.suffix.lower() == '.png' else None)
+
+
+def plot_graph(rectangles: list[ImageRectangle], output: Path):
+    grand_total_exposure = sum([rect.total_exposure_time for rect in rectangles])
+    print(f'{grand_total_exposure=}')
+
+    footprints = rectangle_corners(rectangles)
+    min_ra, max_ra, min_dec, max_dec = bounds(footprints)
+    print(min_ra, max_ra, min_dec, max_dec)
 
-if __name__ == "__main__":
-    plot_graph()
\ No newline at end of file
+    # Draw the rectangle.  Make the alpha value of a subframe low,
+    # unless exposure time is over a minute.
+    colors = np.array([
+        to_rgba('#0f0', rect.total_exposure_time / grand_total_exposure) if rect.height > 2.0
+        else to_rgba('#00f', 0.1)
+        for rect in rectangles])
+
+    # Only the footprints differ between sessions on the same target, so the
+    # rest of the chart is rendered once and cached
+    map_bounds = _map_bounds(min_ra, max_ra, min_dec, max_dec)
+    settings = Settings()
+    cache = ChartCache(settings.cache_path / 'charts', settings.chart_cache_max_mb * 1_000_000)
+    key = chart_key(version=BACKGROUND_VERSION, starplot=metadata.version('starplot'), projection='mercator',
+                    bounds=map_bounds, style=[STYLE_EXTENSIONS, STYLE_OVERRIDES], resolution=RESOLUTION)
+    background = cache.get(key)
+    if background is None:
+        print("Rendering the chart background.")
+        background = _render_background(map_bounds)
+        cache.put(key, *background)
+
+    _composite(*background, footprints, colors, output)
@@ -0,0 +1,269 @@
+"""Manifest storage: a JSON snapshot plus an append-only journal."""
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from pydantic import BaseModel
+
+# The models import the plate solver, so are only imported when entries are read
+if TYPE_CHECKING:
+    from alog.models import Manifest
+
+SNAPSHOT = 'manifest.json'
+JOURNAL = 'manifest.journal'
+
+# Characters read at a time when streaming the snapshot
+READ_SIZE = 1024 * 1024
+
+# Compact once the journal has this many records, or as many as the manifest has files
+MIN_COMPACT_RECORDS = 1000
+
+
+def _fsync_dir(dir: Path):
+    try:
+        fd = os.open(dir, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: Path, text: str):
+    """Replace a file so that readers see either the old or the new content, never a partial write."""
+    temp = path.with_name(path.name + '.tmp')
+    with open(temp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    _fsync_dir(path.parent)
+
+
+class ManifestStore:
+    """Reads and writes the manifest of a directory.
+
+    `manifest.json` is a snapshot and `manifest.journal` holds one JSON
+    record per line for every change made since.  Checkpoints only append
+    the new records, and once the journal grows large it is compacted into
+    a new snapshot."""
+
+    def __init__(self, dir: Path):
+        self.dir = dir
+        self.snapshot = dir / SNAPSHOT
+        self.journal = dir / JOURNAL
+        self.journal_records = 0
+        # Length of the complete lines in the journal, when it was loaded
+        self.journal_size = 0
+
+    def exists(self) -> bool:
+        return self.snapshot.exists() or self.journal.exists()
+
+    def load(self) -> 'Manifest':
+        """Load the snapshot and replay the journal over it."""
+        from alog.models import Manifest
+
+        if self.snapshot.exists():
+            manifest = Manifest.model_validate_json(self.snapshot.read_text())
+        else:
+            manifest = Manifest(files=[])
+
+        self.journal_records = 0
+        for record in self.read_journal():
+            apply_record(manifest, record)
+            self.journal_records += 1
+
+        # Replayed changes are already saved
+        manifest.take_changes()
+        return manifest
+
+    def iter_files(self, model: type[BaseModel] | None = None) -> Iterator[BaseModel]:
+        """Yield the manifest entries one at a time, as instances of `model`.
+
+        Unlike `load` the snapshot is streamed, so only one entry is in
+        memory at a time.  `model` can declare just the fields a command
+        needs (e.g. `FileSummary`, which must include `pathname`), and the
+        rest of each entry is not validated.  By default entries are
+        `FileDescription`s."""
+        if model is None:
+            from alog.models import FileDescription as model
+
+        # Journal changes by entry: the snapshot pathname of an entry that
+        # was in the snapshot, or a number for an entry added since
+        changes = {}
+        # Key in `changes` of the entry at each pathname, for changed entries
+        current = {}
+        for record in self.read_journal():
+            if 'remove' in record:
+                pathname = record['remove']
+                changes[current.pop(pathname, pathname)] = None
+                continue
+
+            put = record['put']
+            pathname, replaces = put['pathname'], record.get('replaces')
+            if replaces is not None:
+                # Re-pointed from the entry for `replaces`, which `Manifest.add`
+                # only records when nothing was at `pathname`
+                key = current.pop(replaces, replaces)
+            elif pathname in current:
+                key = current[pathname]
+            elif pathname in changes:
+                # The snapshot entry at this pathname moved away or was removed
+                key = len(changes)
+            else:
+                # The snapshot entry at this pathname, or a new entry if there is none
+                key = pathname
+            current[pathname] = key
+            changes[key] = put
+
+        if self.snapshot.exists():
+            with open(self.snapshot) as f:
+                for item in _iter_json_items(f, 'files'):
+                    entry = model.model_validate_json(item)
+                    if entry.pathname in changes:
+                        entry = changes.pop(entry.pathname)
+                        if entry is None:
+                            continue
+                        entry = model.model_validate(entry)
+                    elif entry.pathname in current:
+                        # Another entry was moved onto this pathname.  `checkpoint`
+                        # never writes such a journal, but one entry per pathname
+                        # is still all that is yielded.
+                        continue
+                    yield entry
+
+        # Entries added since the snapshot
+        for entry in changes.values():
+            if entry is not None:
+                yield model.model_validate(entry)
+
+    def read_journal(self):
+        """Yield the journal records, skipping a final line left incomplete by a crash."""
+        self.journal_size = 0
+        if not self.journal.exists():
+            return
+        with open(self.journal, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self.journal_size += len(line)
+                yield json.loads(line)
+
+    def checkpoint(self, manifest: 'Manifest'):
+        """Append the manifest's changes to the journal, compacting it when it gets large."""
+        changes = manifest.take_changes()
+        if not changes:
+            return
+
+        if self.journal_records + len(changes) >= max(MIN_COMPACT_RECORDS, len(manifest.files)):
+            self.compact(manifest)
+            return
+
+        lines = []
+        for change in changes:
+            if 'remove' in change:
+                lines.append(json.dumps(change))
+            else:
+                lines.append(json.dumps({'put': change['put'].model_dump(mode='json'),
+                                         'replaces': change['replaces']}))
+        with open(self.journal, 'ab') as f:
+            if f.tell() != self.journal_size:
+                # Cut off an incomplete line, so the new records start on a fresh line
+                f.truncate(self.journal_size)
+            data = ''.join(line + '\n' for line in lines).encode()
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_records += len(lines)
+        self.journal_size += len(data)
+
+    def compact(self, manifest: 'Manifest'):
+        """Write a new snapshot and start an empty journal."""
+        manifest.take_changes()
+        write_atomic(self.snapshot, manifest.model_dump_json(indent=2))
+        # A crash before this is harmless: replaying the journal again gives the same result
+        self.journal.unlink(missing_ok=True)
+        self.journal_records = 0
+        self.journal_size = 0
+
+
+def apply_record(manifest: 'Manifest', record: dict):
+    from alog.models import FileDescription
+
+    if 'remove' in record:
+        if manifest.find(record['remove']) is not None:
+            manifest.remove(record['remove'])
+    else:
+        manifest.add(FileDescription.model_validate(record['put']), replaces=record.get('replaces'))
+
+
+def _iter_json_items(f, key: str) -> Iterator[str]:
+    """Yield the JSON text of each item of the array `key` in a JSON object, reading the file incrementally.
+
+    In indented JSON (as written by `compact`) an item ends at the first
+    closing brace with the same indentation as its opening brace, so items
+    are split without parsing them.  Anything else is split by decoding it."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    # Whether the buffer starts part way through a line
+    mid_line = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof, mid_line
+        chunk = f.read(READ_SIZE)
+        eof = not chunk
+        # Keep the line `pos` is on, as the indentation before it is needed
+        keep = buffer.rfind('\n', 0, pos)
+        if keep < 0:
+            keep = pos
+            mid_line = mid_line or keep > 0
+        else:
+            mid_line = False
+        buffer = buffer[keep:] + chunk
+        pos -= keep
+        return not eof
+
+    # Find the start of the array
+    marker = f'"{key}"'
+    while (start := buffer.find(marker)) < 0 or buffer.find('[', start) < 0:
+        if not fill():
+            return
+    pos = buffer.find('[', start) + 1
+
+    while True:
+        # Skip to the next item, or the end of the array
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buffer):
+            if not fill():
+                raise ValueError(f'Unexpected end of file in "{key}"')
+            continue
+        if buffer[pos] == ']':
+            return
+
+        line_start = buffer.rfind('\n', 0, pos) + 1
+        indent = buffer[line_start:pos]
+        if buffer[pos] == '{' and indent and not indent.strip() and (line_start or not mid_line):
+            close = '\n' + indent + '}'
+            end = buffer.find(close, pos)
+            if end < 0:
+                if eof or not fill():
+                    raise ValueError(f'Unexpected end of file in "{key}"')
+                continue
+            end += len(close)
+        else:
+            try:
+                _, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely the item continues past the buffer
+                if eof or not fill():
+                    raise
+                continue
+
+        item = buffer[pos:end]
+        pos = end
+        yield item
@@ -1,5 +1,7 @@
-from erewhon_astro import Solution
-from pydantic import BaseModel
+import os
+
+from erewhon_astro import Solution, Calibration
+from pydantic import BaseModel, PrivateAttr
 
 
 class ImageRectangle(BaseModel):
@@ -24,12 +26,128 @@ class FileDescription(BaseModel):
     exposure_time: float = 0.0
     axis1: float = 0.0
     axis2: float = 0.0
+    # Stat signature of the file when it was described
+    size: int | None = None
+    mtime: float | None = None
+    inode: int | None = None
     solution: Solution | None = None
+    # The plate solver found no solution, so it is not tried again unless asked
+    solve_failed: bool = False
+    # Catalog objects in the plate solved footprint, see `manifest targets`
+    targets: list[str] = []
+
+    def matches_stat(self, st: os.stat_result) -> bool:
+        """Check if the file is unchanged since it was described."""
+        return (self.size is not None
+                and self.size == st.st_size
+                and self.mtime == st.st_mtime
+                and self.inode == st.st_ino)
+
+
+class FileSummary(BaseModel):
+    """The fields of a FileDescription needed for exposure totals."""
+    pathname: str
+    instrument: str = ''
+    total_exposure_time: float = 0.0
+    axis1: float = 0.0
+    axis2: float = 0.0
+
+
+class SolvedCalibration(BaseModel):
+    """The calibration of a Solution, without its annotations."""
+    calibration: Calibration | None = None
+
+
+class FileColumns(FileSummary):
+    """The fields of a FileDescription kept in the columnar cache."""
+    stackcnt: int = 0
+    solution: SolvedCalibration | None = None
 
 
 class Manifest(BaseModel):
     files: list[FileDescription] = []
 
+    # Positions in `files`, by pathname and by content hash
+    _by_pathname: dict[str, int] = PrivateAttr(default_factory=dict)
+    _by_hash: dict[str, list[int]] = PrivateAttr(default_factory=dict)
+    # Changes since the manifest was last saved, for the journal
+    _changes: list[dict] = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, context) -> None:
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the lookup indexes from `files`."""
+        self._by_pathname = {}
+        self._by_hash = {}
+        for index, desc in enumerate(self.files):
+            self._index(index, desc)
+
+    def _index(self, index: int, desc: FileDescription):
+        self._by_pathname[desc.pathname] = index
+        self._by_hash.setdefault(desc.hash, []).append(index)
+
+    def _unindex(self, index: int, desc: FileDescription):
+        del self._by_pathname[desc.pathname]
+        indexes = self._by_hash[desc.hash]
+        indexes.remove(index)
+        if not indexes:
+            del self._by_hash[desc.hash]
+
+    def find(self, pathname: str) -> FileDescription | None:
+        """Find the entry for a pathname."""
+        index = self._by_pathname.get(pathname)
+        return None if index is None else self.files[index]
+
+    def find_by_hash(self, hash: str) -> list[FileDescription]:
+        """Find all entries with the given content hash."""
+        return [self.files[index] for index in self._by_hash.get(hash, [])]
+
+    def add(self, desc: FileDescription, replaces: str | None = None):
+        """Add an entry, or replace the entry with the same pathname.
+
+        If `replaces` is given, that entry is re-pointed to the new
+        description instead (e.g. for a file that has been moved).  A
+        replaced entry keeps its position and id.
+
+        The change is recorded as it was applied, so a journal record only
+        has `replaces` when that entry existed and the new pathname did not."""
+        if replaces == desc.pathname or replaces not in self._by_pathname:
+            replaces = None
+        elif desc.pathname in self._by_pathname:
+            # The new pathname already has an entry, which wins
+            self.remove(replaces)
+            replaces = None
+        self._changes.append({'put': desc, 'replaces': replaces})
+        if replaces is not None:
+            self._replace(self._by_pathname[replaces], desc)
+            return
+
+        index = self._by_pathname.get(desc.pathname)
+        if index is None:
+            self.files.append(desc)
+            self._index(len(self.files) - 1, desc)
+        else:
+            self._replace(index, desc)
+
+    def _replace(self, index: int, desc: FileDescription):
+        old = self.files[index]
+        self._unindex(index, old)
+        desc.id = desc.id or old.id
+        self.files[index] = desc
+        self._index(index, desc)
+
+    def remove(self, pathname: str):
+        """Remove the entry for a pathname."""
+        self._changes.append({'remove': pathname})
+        del self.files[self._by_pathname[pathname]]
+        self.reindex()
+
+    def take_changes(self) -> list[dict]:
+        """Return the changes since the last call, as `put` and `remove` records."""
+        changes, self._changes = self._changes, []
+        return changes
+
 
 class Session(BaseModel):
     start_date: str
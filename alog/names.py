@@ -0,0 +1,203 @@
+"""Names and catalog designations of astronomical objects."""
+import re
+
+from rich import print
+
+# Common name patterns, in order of priority
+COMMON_NAME_PATTERNS = [
+    # Direct named objects like "Orion Nebula", "Andromeda Galaxy", etc.
+    r'((?:[A-Z][a-z]+\s?)+(?:Nebula|Galaxy|Cluster|Cloud|Star|Pulsar|Quasar|Supernova|Remnant|Void|Group))',
+
+    # "NAME [Object Name]" pattern used in SIMBAD
+    r'NAME\s+(.*)',
+
+    # Popular asterisms and unofficial names
+    r'ASTERISM\s+(.*)',
+
+    # Common names like "Sirius", "Betelgeuse", "Polaris", etc.
+    r'((?:[A-Z][a-z]+){1,2})\s*$',
+
+    # Colloquial names like "Horsehead Nebula", etc.
+    r'((?:[A-Z][a-z]+\s?)+)',
+]
+
+# Catalog designations.  No two catalogs share a prefix, so a name matches
+# at most one of them.
+CATALOG_PATTERNS = {
+    'Messier': r'M\s*(\d+)',  # Matches: M1, M 1, M31, etc.
+    'NGC': r'NGC\s*(\d+)',  # Matches: NGC1976, NGC 1976, etc.
+    'IC': r'IC\s*(\d+)',  # Matches: IC434, IC 434, etc.
+    'HD': r'HD\s*(\d+)',  # Matches: HD1234, HD 1234, etc.
+    'HIP': r'HIP\s*(\d+)',  # Matches: HIP1234, HIP 1234, etc.
+    'Sh2': r'Sh\s*2-(\d+)',  # Matches: Sh2-155, Sh 2-155, etc.
+    'Barnard': r'B\s*(\d+)',  # Matches: B33, B 33, etc. TODO: tighten this up!
+    # 'Caldwell': r'C\s*(\d+)', # Matches: C14, C 14, etc.
+    'HCG': r'HCG\s*(\d+)',  # Matches: HCG92, HCG 92, etc.
+    'UGC': r'UGC\s*(\d+)',  # Matches: UGC12158, UGC 12158, etc.
+    'Abell': r'Abell\s*(\d+)',  # Matches: Abell2151, Abell 2151, etc.
+    'PGC': r'PGC\s*(\d+)',  # Matches: PGC3589, PGC 3589, etc.
+    'ESO': r'ESO\s*(\d+)-(\d+)',  # Matches: ESO123-16, ESO 123-16, etc.
+    'LBN': r'LBN\s*(\d+)',  # Matches: LBN123, LBN 123, etc.
+    'SAO': r'SAO\s*(\d+)',  # Matches: SAO123456, SAO 123456, etc.
+    'HR': r'HR\s*(\d+)',  # Matches: HR1234, HR 1234, etc.
+    '2MASS': r'2MASS\s*J(\d+)',  # Matches: 2MASS J12345678+1234567
+}
+
+# Catalog IDs that look like common names
+_NOT_COMMON_NAME = re.compile(r'^(M|NGC|IC|HD|HIP|Sh2|B|C|HCG|UGC|Abell|PGC|ESO|LBN|SAO|HR|2MASS)\s*\d+', re.IGNORECASE)
+
+_COMMON_NAMES = [re.compile(pattern) for pattern in COMMON_NAME_PATTERNS]
+
+
+def _compile_catalogs() -> tuple[re.Pattern, dict[int, tuple[str, list[int]]]]:
+    """One pattern matching every catalog, with the catalog and ID groups of each alternative.
+
+    Each catalog's pattern is wrapped in a group, so the group that matched
+    last (the outermost) tells which catalog matched."""
+    branches = []
+    groups = {}
+    group = 1
+    for catalog, pattern in CATALOG_PATTERNS.items():
+        branches.append(f'({pattern})')
+        count = re.compile(pattern).groups
+        groups[group] = catalog, list(range(group + 1, group + 1 + count))
+        group += 1 + count
+    return re.compile('(?:' + '|'.join(branches) + ')', re.IGNORECASE), groups
+
+
+_CATALOG, _CATALOG_GROUPS = _compile_catalogs()
+
+
+def parse_names(name_list) -> tuple[list[dict], str | None]:
+    """Catalog references and the common name of an object, from its identifiers, in one pass.
+
+    Each name is matched against all catalogs at once, and only against the
+    common name patterns that could still beat the best common name so far."""
+    catalogs = {}
+    common_name = None
+    best = len(_COMMON_NAMES)
+
+    for name in name_list:
+        if name is None:
+            continue
+
+        name = name.strip()
+
+        match = _CATALOG.match(name)
+        if match:
+            catalog, groups = _CATALOG_GROUPS[match.lastindex]
+            # ESO has two capture groups
+            catalog_id = '-'.join(match.group(group) for group in groups)
+            ids = catalogs.setdefault(catalog, [])
+            if catalog_id not in ids:
+                ids.append(catalog_id)
+
+        # Earlier names win ties, so only a higher priority pattern counts
+        for priority, pattern in enumerate(_COMMON_NAMES[:best]):
+            match = pattern.search(name)
+            if match:
+                candidate = match.group(1).strip()
+
+                # Skip catalog designations, very short names (likely
+                # abbreviations) and names that are just numbers
+                if _NOT_COMMON_NAME.match(candidate) or len(candidate) < 3 or candidate.isdecimal():
+                    continue
+
+                common_name, best = candidate, priority
+                break
+
+    # Convert to expected JSON structure
+    references = [{"catalog": catalog, "id": id_value, "designation": f"{catalog} {id_value}"}
+                  for catalog, ids in catalogs.items() for id_value in ids]
+    return references, common_name
+
+
+def extract_common_name(name_list):
+    """Extract the common name of an astronomical object from its identifiers."""
+    return parse_names(name_list)[1]
+
+
+def extract_catalog_references(name_list):
+    """Extract catalog references from a list of object names."""
+    return parse_names(name_list)[0]
+
+
+def display_object_info(obj):
+    """Helper function to display object information in a formatted way."""
+    # For debugging
+    # pprint(obj)
+
+    print(f"\nObject: {obj['name']}")
+
+    # Display common name if available
+    if "common_name" in obj:
+        print(f"Common Name: {obj['common_name']}")
+
+    print(f"Type: {obj['type']}")
+
+    # Coordinates
+    ra_deg = obj['coordinates']['ra']
+    dec_deg = obj['coordinates']['dec']
+    print(f"RA: {ra_deg:.6f}° ({obj['coordinates']['ra_str']})")
+    print(f"DEC: {dec_deg:.6f}° ({obj['coordinates']['dec_str']})")
+
+    # Size information
+    if "size" in obj:
+        size = obj["size"]
+        if "dimensions" in size:
+            print(f"Size: {size['dimensions']}")
+        elif "formatted" in size:
+            print(f"Size: {size['formatted']}")
+        elif "type" in size:
+            if size["type"] == "point_source":
+                print("Size: Point source")
+            else:
+                print("Size: No size information available")
+
+    # Catalog information
+    if "catalogs" in obj and obj["catalogs"]:
+        print("\nCatalog Designations:")
+        catalogs_by_name = {}
+
+        # Group by catalog name
+        for cat_entry in obj["catalogs"]:
+            catalog = cat_entry["catalog"]
+            if catalog not in catalogs_by_name:
+                catalogs_by_name[catalog] = []
+            catalogs_by_name[catalog].append(cat_entry["id"])
+
+        # Display in a nice format
+        for catalog, ids in sorted(catalogs_by_name.items()):
+            id_str = ", ".join(ids)
+            print(f"  • {catalog}: {id_str}")
+
+    # Distance
+    if "distance" in obj:
+        print(
+            f"Distance: {obj['distance']['parsecs']:.2f} parsecs ({obj['distance']['light_years']:.2f} light years)")
+
+    # Spectral type
+    if "spectral_type" in obj:
+        print(f"Spectral Type: {obj['spectral_type']}")
+
+    # Visual magnitude
+    if "visual_magnitude" in obj:
+        print(f"Visual Magnitude: {obj['visual_magnitude']:.2f}")
+
+    # Proper motion
+    if "proper_motion" in obj:
+        print(
+            f"Proper Motion: RA {obj['proper_motion']['ra']:.2f} mas/yr, DEC {obj['proper_motion']['dec']:.2f} mas/yr")
+
+    # Radial velocity
+    if "radial_velocity" in obj:
+        print(f"Radial Velocity: {obj['radial_velocity']:.2f} km/s")
+
+    # Alternative names
+    if "alternative_names" in obj and len(obj["alternative_names"]) > 1:
+        print("\nAlternative designations:")
+        # Show up to 5 alternative names
+        for i, name in enumerate(obj["alternative_names"][:5]):
+            print(f"  • {name}")
+        if len(obj["alternative_names"]) > 5:
+            print(f"  ... and {len(obj['alternative_names']) - 5} more identifiers")
@@ -0,0 +1,102 @@
+"""Persistent cache of resolved object names."""
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+# Catalog names that Simbad spells differently from common usage
+_CATALOG_ALIASES = {
+    'MESSIER': 'M',
+    'SHARPLESS2-': 'SH2-',
+    'SHARPLESS': 'SH2-',
+}
+
+
+def normalize_designation(name: str) -> str:
+    """Reduce an object name to a key, so different spellings of a designation match.
+
+    Case, whitespace and leading zeros are ignored, Simbad's `NAME ` prefix is
+    dropped and long catalog names are shortened, so "M31", "M 31",
+    "Messier 31" and Simbad's "M  31" are all "M31"."""
+    key = ' '.join(name.upper().split())
+    if key.startswith('NAME '):
+        key = key[5:]
+    key = key.replace(' ', '')
+    for alias, catalog in _CATALOG_ALIASES.items():
+        if key.startswith(alias) and key[len(alias):len(alias) + 1].isdigit():
+            key = catalog + key[len(alias):]
+            break
+    # Leading zeros of the number after the catalog, e.g. NGC0224
+    return re.sub(r'^([A-Z]+)0+(?=\d)', r'\1', key)
+
+
+class ResolverCache:
+    """On-disk cache of resolved objects, keyed by every name they are known by.
+
+    Each object is stored once, with its main name, every alternative name
+    and the names it was looked up by as keys, all normalised with
+    `normalize_designation`.  Entries older than `ttl` seconds are stale:
+    they are still returned, but should be refreshed."""
+
+    def __init__(self, path: Path, ttl: float):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+                          CREATE TABLE IF NOT EXISTS objects
+                          (
+                              id      INTEGER PRIMARY KEY,
+                              name    TEXT UNIQUE NOT NULL,
+                              data    TEXT        NOT NULL,
+                              fetched REAL        NOT NULL
+                          )
+                          ''')
+        self.conn.execute('''
+                          CREATE TABLE IF NOT EXISTS aliases
+                          (
+                              key       TEXT PRIMARY KEY,
+                              object_id INTEGER NOT NULL REFERENCES objects (id) ON DELETE CASCADE
+                          )
+                          ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS aliases_object ON aliases (object_id)')
+        self.conn.commit()
+
+    def get(self, name: str) -> tuple[dict, bool] | None:
+        """Look up an object by any of its names.  Returns its data and whether it is stale."""
+        row = self.conn.execute('''
+                                SELECT data, fetched
+                                FROM aliases
+                                         JOIN objects ON objects.id = aliases.object_id
+                                WHERE key = ?
+                                ''', (normalize_designation(name),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1] > self.ttl
+
+    def put(self, data: dict, names: list[str] = ()):
+        """Store an object, keyed by its names in `data` and any other `names` it was looked up by."""
+        keys = {normalize_designation(name)
+                for name in [data['name'], *data.get('alternative_names', []), *names] if name}
+        with self.conn:
+            object_id = self.conn.execute('''
+                                          INSERT INTO objects (name, data, fetched)
+                                          VALUES (?, ?, ?)
+                                          ON CONFLICT (name) DO UPDATE SET data    = excluded.data,
+                                                                           fetched = excluded.fetched
+                                          RETURNING id
+                                          ''', (data['name'], json.dumps(data), time.time())).fetchone()[0]
+            self.conn.executemany('INSERT OR REPLACE INTO aliases (key, object_id) VALUES (?, ?)',
+                                  [(key, object_id) for key in keys])
+
+    def stats(self) -> dict:
+        """Return the number of objects and names, and how many objects are stale."""
+        objects, stale = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(fetched < ?), 0) FROM objects',
+                                           (time.time() - self.ttl,)).fetchone()
+        names = self.conn.execute('SELECT COUNT(*) FROM aliases').fetchone()[0]
+        return {'objects': objects, 'names': names, 'stale': stale}
+
+    def close(self):
+        self.conn.close()
@@ -1,4 +1,6 @@
 """Settings."""
+from pathlib import Path
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,4 +10,19 @@ class Settings(BaseSettings):
 
     local_solve: bool = False
     astrometry_index_dir: str | None = None
+    # Read the index files into the page cache before solving locally
+    astrometry_warm_index: bool = True
+
+    # Local caches shared between manifests
+    cache_dir: str = '~/.cache/alog'
+    solve_cache_max_mb: int = 256
+    chart_cache_max_mb: int = 1024
+    # Days before a cached object lookup is refreshed from Simbad
+    resolver_cache_ttl_days: float = 30
+
+    # Simbad TAP service for batched lookups
+    simbad_tap_url: str = 'https://simbad.cds.unistra.fr/simbad/sim-tap'
 
+    @property
+    def cache_path(self) -> Path:
+        return Path(self.cache_dir).expanduser()
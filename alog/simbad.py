@@ -0,0 +1,204 @@
+"""Object lookups in the Simbad database."""
+from collections.abc import Iterator
+
+from alog.names import parse_names
+
+# Columns of an object, from Simbad's basic and allfluxes tables.  The
+# ADQL query works around "allfluxes" not existing for certain objects.
+OBJECT_COLUMNS = '''basic."main_id", basic."ra", basic."dec", basic."coo_err_maj",
+                    basic."coo_err_min", basic."coo_err_angle", basic."coo_wavelength",
+                    basic."coo_bibcode",
+                    allfluxes."V",
+                    basic."galdim_minaxis", basic."otype", basic."oid", basic."pmdec",
+                    basic."galdim_angle", basic."pmra", basic."galdim_majaxis", basic."sp_type",
+                    basic."plx_value", basic."galdim_minaxis_prec", basic."galdim_wavelength",
+                    basic."galdim_bibcode", basic."galdim_majaxis_prec", basic."galdim_qual",
+                    ident."id" AS "matched_id"'''
+
+OBJECT_TABLES = '''basic
+              LEFT JOIN allfluxes ON basic."oid" = allfluxes."oidref"
+              JOIN ident ON basic."oid" = ident."oidref"'''
+
+# Names looked up per batched query, and the most rows a query may return
+BATCH_SIZE = 100
+MAX_ROWS = 1_000_000
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _adql_list(values) -> str:
+    """Values as an ADQL list of string literals."""
+    return ', '.join("'" + str(value).replace("'", "''") + "'" for value in values)
+
+
+def describe_object(obj, alt_names: list[str]) -> dict:
+    """Structured data of an object, from a row of `OBJECT_COLUMNS` and its identifiers."""
+    # Create a structured object with all the data
+    object_data = {"name": obj['main_id'].decode() if isinstance(obj['main_id'], bytes) else obj['main_id'],
+                   "type": obj['otype'].decode() if isinstance(obj['otype'], bytes) else obj['otype'],
+                   "coordinates": {
+                       "ra": float(obj['ra']),
+                       "dec": float(obj['dec']),
+                       "ra_str": str(obj['ra']),
+                       "dec_str": str(obj['dec'])
+                   }, "size": {}}
+
+    # Size information
+    has_size = False
+
+    # Check for dimensions string first
+    if 'dimensions' in obj.colnames and obj['dimensions'] is not None:
+        dim_str = obj['dimensions'].decode() if isinstance(obj['dimensions'], bytes) else obj['dimensions']
+        if dim_str and dim_str.strip():
+            object_data["size"]["dimensions"] = dim_str
+            has_size = True
+
+    # If no dimensions string, check for major/minor axis values
+    if not has_size and 'galdim_majaxis' in obj.colnames and obj['galdim_majaxis'] is not None:
+        major_axis = obj['galdim_majaxis']
+        if major_axis > 0:
+            minor_axis = obj['galdim_minaxis'] if 'galdim_minaxis' in obj.colnames and obj[
+                'galdim_minaxis'] is not None else major_axis
+            pa = obj['galdim_angle'] if 'galdim_angle' in obj.colnames and obj['galdim_angle'] is not None else 0
+
+            object_data["size"]["major_axis"] = float(major_axis)
+            object_data["size"]["minor_axis"] = float(minor_axis)
+            object_data["size"]["position_angle"] = float(pa)
+
+            # Also add formatted display values
+            if major_axis >= 60:
+                major_arcmin = major_axis / 60
+                minor_arcmin = minor_axis / 60
+                object_data["size"]["formatted"] = f"{major_arcmin:.1f}′ × {minor_arcmin:.1f}′ (PA: {pa}°)"
+            else:
+                object_data["size"]["formatted"] = f"{major_axis:.1f}″ × {minor_axis:.1f}″ (PA: {pa}°)"
+            has_size = True
+
+    # If no size information was found
+    if not has_size:
+        # For stars and point sources, we typically don't have size
+        if 'otype' in obj.colnames and obj['otype'] is not None:
+            otype = obj['otype'].decode() if isinstance(obj['otype'], bytes) else obj['otype']
+            if 'Star' in otype or '*' in otype:
+                object_data["size"]["type"] = "point_source"
+            else:
+                object_data["size"]["type"] = "unknown"
+        else:
+            object_data["size"]["type"] = "unknown"
+
+    # Optional information
+    if obj['plx_value'] is not None and obj['plx_value'] != 0:
+        dist_pc = 1000.0 / obj['plx_value']
+        dist_ly = dist_pc * 3.26156
+        object_data["distance"] = {
+            "parsecs": float(dist_pc),
+            "light_years": float(dist_ly)
+        }
+
+    if obj['sp_type'] is not None:
+        object_data["spectral_type"] = obj['sp_type'].decode() if isinstance(obj['sp_type'], bytes) else obj[
+            'sp_type']
+
+    if obj['V'] is not None:
+        object_data["visual_magnitude"] = float(obj['V'])
+
+    # Proper motion if available
+    if obj['pmra'] is not None and obj['pmdec'] is not None and obj['pmra'] != '--' and obj['pmdec'] != '--':
+        object_data["proper_motion"] = {
+            "ra": float(obj['pmra']),
+            "dec": float(obj['pmdec'])
+        }
+
+    if 'RV_VALUE' in obj.colnames and obj['RV_VALUE'] is not None:
+        object_data["radial_velocity"] = float(obj['RV_VALUE'])
+
+    if alt_names:
+        object_data["alternative_names"] = alt_names
+
+    # Extract catalog information and common name from main ID and alternative names
+    catalogs, common_name = parse_names([object_data["name"]] + alt_names)
+    if catalogs:
+        object_data["catalogs"] = catalogs
+
+    if common_name:
+        object_data["common_name"] = common_name
+
+    return object_data
+
+
+def query_object(object_name: str) -> dict | None:
+    """Look up an object in Simbad by any of its identifiers.
+
+    Returns the object's data, or None if Simbad does not know the name."""
+    from astroquery.simbad import Simbad
+
+    # Customize Simbad query to include more fields
+    simbad = Simbad()
+
+    result_table = simbad.query_tap(
+        f"""SELECT {OBJECT_COLUMNS}
+              FROM {OBJECT_TABLES}
+             WHERE id = {_adql_list([object_name])}
+          """)
+
+    if result_table is None or len(result_table) == 0:
+        return None
+
+    # Get alternative identifiers
+    other_names = simbad.query_objectids(object_name)
+    alt_names = []
+    if other_names is not None and len(other_names) > 0:
+        alt_names = [
+            name['id'].decode() if isinstance(name['id'], bytes) else name['id']
+            for name in other_names
+        ]
+
+    return describe_object(result_table[0], alt_names)
+
+
+def query_objects(names: list[str], tap_url: str,
+                  batch_size: int = BATCH_SIZE) -> Iterator[tuple[str, dict | None]]:
+    """Look up many objects in Simbad, with two queries per batch of names.
+
+    The first query finds the objects of a batch, the second all their
+    identifiers.  Yields every name with its object's data, or None if Simbad
+    does not know it, in order.  Names are matched to objects by their
+    normalised identifiers."""
+    from pyvo.dal import TAPService
+
+    from alog.resolver_cache import normalize_designation
+
+    tap = TAPService(tap_url)
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        rows = tap.run_sync(
+            f"""SELECT {OBJECT_COLUMNS}
+                  FROM {OBJECT_TABLES}
+                 WHERE id IN ({_adql_list(batch)})
+              """, maxrec=MAX_ROWS).to_table()
+
+        # A row per matched identifier, so an object can appear more than once
+        objects = {}
+        for row in rows:
+            objects.setdefault(int(row['oid']), row)
+
+        identifiers = {oid: [] for oid in objects}
+        if objects:
+            rows = tap.run_sync(
+                f"""SELECT "oidref", "id"
+                      FROM ident
+                     WHERE "oidref" IN ({', '.join(map(str, objects))})
+                  """, maxrec=MAX_ROWS).to_table()
+            for row in rows:
+                identifiers[int(row['oidref'])].append(_text(row['id']))
+
+        found = {}
+        for oid, row in objects.items():
+            data = describe_object(row, identifiers[oid])
+            for name in [data['name'], *identifiers[oid]]:
+                found.setdefault(normalize_designation(name), data)
+
+        for name in batch:
+            yield name, found.get(normalize_designation(name))
@@ -0,0 +1,97 @@
+"""Spatial index of positions on the sky."""
+import math
+
+import numpy as np
+
+
+def ra_ranges(ra_min: float, ra_max: float) -> list[tuple[float, float]]:
+    """Split an RA range into ranges within [0, 360).
+
+    The range runs east from `ra_min` to `ra_max`, both in degrees.  Either
+    may lie outside [0, 360) (e.g. -5 to 10), and `ra_max` below `ra_min`
+    means the range crosses RA 0 (e.g. 350 to 10)."""
+    width = ra_max - ra_min
+    if width < 0:
+        width += 360
+    if width >= 360:
+        return [(0.0, 360.0)]
+
+    lo = ra_min % 360
+    hi = lo + width
+    if hi <= 360:
+        return [(lo, hi)]
+    return [(lo, 360.0), (0.0, hi - 360)]
+
+
+def angular_distance(ra1, dec1, ra2, dec2):
+    """Angular distance in degrees between positions in degrees (haversine)."""
+    ra1, dec1, ra2, dec2 = (np.radians(value) for value in (ra1, dec1, ra2, dec2))
+    a = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))))
+
+
+class SkyIndex:
+    """Index of positions on the sky for box and cone queries.
+
+    Positions are grouped into declination bands, and sorted by RA within
+    each band.  A query only visits the bands it overlaps and binary searches
+    each one for its RA range, so its cost is proportional to the number of
+    positions returned rather than the size of the catalog.  Queries return
+    indexes into the arrays the index was built from."""
+
+    def __init__(self, ra: np.ndarray, dec: np.ndarray, band_height: float = 1.0):
+        ra = np.mod(np.asarray(ra, dtype=np.float64), 360)
+        dec = np.asarray(dec, dtype=np.float64)
+        self.band_height = band_height
+        self.bands = math.ceil(180 / band_height)
+
+        band = self._band(dec)
+        self.order = np.lexsort((ra, band))
+        self.ra = ra[self.order]
+        self.dec = dec[self.order]
+        # Start of each band in the sorted arrays
+        self.band_starts = np.searchsorted(band[self.order], np.arange(self.bands + 1))
+
+    def __len__(self):
+        return len(self.order)
+
+    def _band(self, dec):
+        return np.clip(((np.asarray(dec) + 90) // self.band_height).astype(np.int64), 0, self.bands - 1)
+
+    def _candidates(self, ranges: list[tuple[float, float]], dec_min: float, dec_max: float) -> np.ndarray:
+        """Positions in the sorted arrays within the RA ranges and declination limits."""
+        found = []
+        for band in range(int(self._band(dec_min)), int(self._band(dec_max)) + 1):
+            start, end = self.band_starts[band], self.band_starts[band + 1]
+            band_ra = self.ra[start:end]
+            for lo, hi in ranges:
+                first = start + np.searchsorted(band_ra, lo, side='left')
+                last = start + np.searchsorted(band_ra, hi, side='right')
+                if first < last:
+                    found.append(np.arange(first, last))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+
+        found = np.concatenate(found)
+        # The first and last bands extend past the declination limits
+        return found[(self.dec[found] >= dec_min) & (self.dec[found] <= dec_max)]
+
+    def query_box(self, ra_min: float, ra_max: float, dec_min: float, dec_max: float) -> np.ndarray:
+        """Find the positions in an RA/Dec box (degrees), see `ra_ranges` for the RA range."""
+        found = self._candidates(ra_ranges(ra_min, ra_max), max(dec_min, -90.0), min(dec_max, 90.0))
+        return self.order[found]
+
+    def query_cone(self, ra: float, dec: float, radius: float) -> np.ndarray:
+        """Find the positions within `radius` degrees of a position."""
+        dec_min, dec_max = dec - radius, dec + radius
+        if dec_min <= -90 or dec_max >= 90:
+            # The cone contains a pole, so covers every RA
+            ranges = [(0.0, 360.0)]
+        else:
+            # Half-width in RA of the smallest box around the cone
+            half_width = math.degrees(math.asin(min(1.0, math.sin(math.radians(radius)) / math.cos(math.radians(dec)))))
+            ranges = ra_ranges(ra - half_width, ra + half_width)
+
+        found = self._candidates(ranges, max(dec_min, -90.0), min(dec_max, 90.0))
+        found = found[angular_distance(ra, dec, self.ra[found], self.dec[found]) <= radius]
+        return self.order[found]
@@ -0,0 +1,94 @@
+"""Persistent cache of plate solve results."""
+import sqlite3
+import time
+from pathlib import Path
+
+from erewhon_astro import Solution
+
+# How many stores between checks of the cache size
+EVICT_INTERVAL = 100
+
+
+class SolveCache:
+    """On-disk cache of plate solve solutions, keyed by the SHA256 of the file.
+
+    The cache is a SQLite database shared by every manifest (and every worker
+    process), so a frame copied into another session is only solved once.
+    When the stored solutions grow past `max_bytes` the least recently used
+    ones are evicted, by connections that store solutions.  Hits and misses
+    are counted in the database as well, so statistics cover all processes."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stores = 0
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+                          CREATE TABLE IF NOT EXISTS solutions
+                          (
+                              hash     TEXT PRIMARY KEY,
+                              solution TEXT    NOT NULL,
+                              size     INTEGER NOT NULL,
+                              accessed REAL    NOT NULL
+                          )
+                          ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS solutions_accessed ON solutions (accessed)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.conn.execute("INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+        self.conn.commit()
+
+    def get(self, hash: str) -> Solution | None:
+        """Look up the solution for a file hash, counting the hit or miss."""
+        row = self.conn.execute('SELECT solution FROM solutions WHERE hash = ?', (hash,)).fetchone()
+        with self.conn:
+            self.conn.execute('UPDATE stats SET value = value + 1 WHERE name = ?', ('hits' if row else 'misses',))
+            if row:
+                self.conn.execute('UPDATE solutions SET accessed = ? WHERE hash = ?', (time.time(), hash))
+        return Solution.model_validate_json(row[0]) if row else None
+
+    def put(self, hash: str, solution: Solution):
+        """Store the solution for a file hash."""
+        data = solution.model_dump_json()
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO solutions (hash, solution, size, accessed) VALUES (?, ?, ?, ?)',
+                (hash, data, len(data), time.time()))
+        self.stores += 1
+        if self.stores % EVICT_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop the least recently used solutions until the cache fits in `max_bytes`."""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM solutions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for hash, size in self.conn.execute('SELECT hash, size FROM solutions ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((hash,))
+            total -= size
+        with self.conn:
+            self.conn.executemany('DELETE FROM solutions WHERE hash = ?', evicted)
+
+    def stats(self) -> dict:
+        """Return entry count, size and lifetime hit/miss counts."""
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions').fetchone()
+        counts = dict(self.conn.execute('SELECT name, value FROM stats'))
+        lookups = counts['hits'] + counts['misses']
+        return {
+            'entries': entries,
+            'size': size,
+            'hits': counts['hits'],
+            'misses': counts['misses'],
+            'hit_rate': counts['hits'] / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        # Only writers evict, so reading the statistics never drops solutions
+        if self.stores:
+            self.evict()
+        self.conn.close()
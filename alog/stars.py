@@ -0,0 +1,149 @@
+"""Hipparcos star catalog, cached as a compact binary file."""
+import functools
+import os
+
+import numpy as np
+from matplotlib.colors import to_rgba_array
+from skyfield.api import Loader
+from skyfield.data import hipparcos
+from skyfield.named_stars import named_star_dict
+
+from alog.settings import Settings
+from alog.skyindex import SkyIndex
+
+# Sorted by magnitude, so a magnitude limit is a slice.  RA and Dec in degrees.
+STAR_DTYPE = np.dtype([
+    ('hip', '<i4'),
+    ('ra', '<f8'),
+    ('dec', '<f8'),
+    ('magnitude', '<f4'),
+    ('spectrum', 'S1'),
+    ('parallax_mas', '<f4'),
+    ('ra_mas_per_year', '<f4'),
+    ('dec_mas_per_year', '<f4'),
+])
+
+# Columns of hip_main.dat
+_COLUMNS = {
+    1: 'hip',
+    5: 'magnitude',
+    8: 'ra',
+    9: 'dec',
+    11: 'parallax_mas',
+    12: 'ra_mas_per_year',
+    13: 'dec_mas_per_year',
+    76: 'spectrum',
+}
+
+# Epoch of the Hipparcos positions
+EPOCH_YEAR = 1991.25
+
+# Star colour by spectral class (simplified), white if unknown
+SPECTRAL_COLORS = {
+    b'O': 'lightskyblue',  # Blue-white
+    b'B': 'lightskyblue',  # Blue-white
+    b'A': 'white',  # White
+    b'F': 'ivory',  # Yellowish-white
+    b'G': 'yellow',  # Yellow
+    b'K': 'orange',  # Orange
+    b'M': 'red',  # Red
+}
+
+
+@functools.cache
+def loader() -> Loader:
+    """Skyfield loader that downloads into the cache directory instead of the working directory."""
+    directory = Settings().cache_path / 'skyfield'
+    directory.mkdir(parents=True, exist_ok=True)
+    return Loader(str(directory), verbose=False)
+
+
+@functools.cache
+def ephemeris(name: str = 'de421.bsp'):
+    return loader()(name)
+
+
+def convert_hipparcos(path: os.PathLike):
+    """Download the Hipparcos catalog and save the stars with a position as a binary array."""
+    import pandas as pd
+
+    with loader().open(hipparcos.URL) as f:
+        df = pd.read_csv(f, sep='|', header=None, usecols=list(_COLUMNS),
+                         na_values=['     ', '       ', '        ', '            '])
+    df = df.rename(columns=_COLUMNS).dropna(subset=['ra', 'dec'])
+
+    stars = np.zeros(len(df), dtype=STAR_DTYPE)
+    for name in STAR_DTYPE.names:
+        if name == 'spectrum':
+            stars[name] = df[name].fillna('').str.strip().str[:1].str.encode('ascii')
+        else:
+            stars[name] = df[name].fillna(0 if name != 'magnitude' else np.nan)
+
+    # Stars with no magnitude sort last
+    stars = stars[np.argsort(stars['magnitude'], kind='stable')]
+
+    temp = f'{path}.tmp'
+    with open(temp, 'wb') as f:
+        np.save(f, stars)
+    os.replace(temp, path)
+
+
+@functools.cache
+def load_stars() -> np.ndarray:
+    """Return the whole catalog, memory-mapped.
+
+    The catalog is downloaded and converted the first time."""
+    path = Settings().cache_path / 'hipparcos.npy'
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        convert_hipparcos(path)
+    return np.load(path, mmap_mode='r')
+
+
+def bright_stars(magnitude_limit: float) -> np.ndarray:
+    """Return the stars with magnitude up to `magnitude_limit`, brightest first."""
+    stars = load_stars()
+    return stars[:np.searchsorted(stars['magnitude'], magnitude_limit, side='right')]
+
+
+@functools.cache
+def star_index(magnitude_limit: float) -> SkyIndex:
+    """Sky index over `bright_stars(magnitude_limit)`."""
+    stars = bright_stars(magnitude_limit)
+    return SkyIndex(stars['ra'], stars['dec'])
+
+
+def stars_dataframe(magnitude_limit: float = np.inf):
+    """Return stars as a dataframe indexed by HIP, in the layout of `hipparcos.load_dataframe`."""
+    import pandas as pd
+
+    stars = bright_stars(magnitude_limit)
+    return pd.DataFrame({
+        'magnitude': stars['magnitude'],
+        'ra_degrees': stars['ra'],
+        'dec_degrees': stars['dec'],
+        'parallax_mas': stars['parallax_mas'],
+        'ra_mas_per_year': stars['ra_mas_per_year'],
+        'dec_mas_per_year': stars['dec_mas_per_year'],
+        'ra_hours': stars['ra'] / 15.0,
+        'epoch_year': EPOCH_YEAR,
+    }, index=pd.Index(stars['hip'], name='hip'))
+
+
+@functools.cache
+def _spectral_color_table() -> np.ndarray:
+    table = np.tile(to_rgba_array('white'), (256, 1))
+    for spectrum, color in SPECTRAL_COLORS.items():
+        table[spectrum[0]] = to_rgba_array(color)[0]
+    return table
+
+
+def spectral_colors(spectrum: np.ndarray) -> np.ndarray:
+    """Map an array of spectral classes (as in `STAR_DTYPE`) to RGBA colours."""
+    return _spectral_color_table()[np.ascontiguousarray(spectrum).view(np.uint8)]
+
+
+@functools.cache
+def star_names() -> dict[int, str]:
+    """Common star names by HIP id."""
+    return {hip: name for name, hip in named_star_dict.items()}
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from alog.catalogs import CATALOG_DIR, CATALOGS, CatalogIndex
+
+
+def write_catalogs(directory, **rows):
+    """Catalog files in the layout of ui/public/catalogs, with `rows` by catalog name and the others empty.
+
+    A row is [designation, RA in hours, Dec, type, constellation, magnitude, distance, names, info, size in arcmin]."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for catalog in CATALOGS:
+        (directory / f'{catalog}.json').write_text(json.dumps({'data': rows.get(catalog, [])}))
+    return directory
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    return CatalogIndex.load(tmp_path_factory.mktemp('cache') / 'catalogs.npz')
+
+
+@pytest.mark.parametrize('name', ['M31', 'M 31', 'm31', 'Messier 31', 'NGC0224', 'NGC 224', 'Andromeda Galaxy',
+                                  'andromeda galaxy'])
+def test_aliases_of_m31(index, name):
+    data = index.lookup(name)
+    assert data['name'] == 'M 31'
+    assert data['common_name'] == 'Andromeda Galaxy'
+    assert data['source'] == 'Messier, OpenNGC'
+
+
+def test_unknown_names(index):
+    assert index.find('Nonexistent Thing 123') is None
+    assert index.lookup('NGC 99999') is None
+
+
+def test_positions_in_degrees_and_sizes_in_arcmin(index):
+    rows = json.loads((CATALOG_DIR / 'Messier.json').read_text())['data']
+    for designation, ra_hours, dec, *_, size in rows:
+        obj = index.find(designation)
+        assert index.designations[obj] == designation
+        assert index.ra[obj] == pytest.approx(ra_hours * 15)
+        assert index.dec[obj] == dec
+        assert index.size[obj] == size
+
+        data = index.object_data(obj)
+        assert data['coordinates']['ra'] == pytest.approx(ra_hours * 15)
+        assert data['coordinates']['dec'] == dec
+        assert data['size'] == ({'major_axis': size, 'formatted': f'{size:.1f}′'} if size else {'type': 'unknown'})
+
+
+def test_rows_naming_another_designation_are_merged(tmp_path):
+    catalog_dir = write_catalogs(
+        tmp_path / 'catalogs',
+        Messier=[['M 1', 5.5, 22.0, 'Nebula', '', 0, 0, '', '', 6.0]],
+        OpenNGC=[['NGC 1952', 5.5, 22.0, 'Supernova remnant', 'Tau', 8.4, 2.0, 'Crab Nebula, M1', '', 0],
+                 ['NGC 7000', 20.98, 44.3, 'Nebula', 'Cyg', 4.0, 0, 'North America Nebula, Twin', '', 120.0]],
+        OpenIC=[['IC 1', 0.1, 27.7, 'Star', 'Peg', 0, 0, 'Twin', '', 0]])
+    index = CatalogIndex.load(tmp_path / 'catalogs.npz', catalog_dir)
+    assert len(index) == 3
+
+    data = index.lookup('crab nebula')
+    assert data['name'] == 'M 1'
+    assert data['alternative_names'] == ['M 1', 'NGC 1952', 'Crab Nebula']
+    assert data['source'] == 'Messier, OpenNGC'
+    assert data['constellation'] == 'Tau'
+    assert index.lookup('NGC1952') == data
+
+    # A common name of two objects names neither
+    assert index.lookup('Twin') is None
+    assert index.lookup('NGC 7000')['common_name'] == 'North America Nebula'
+
+
+def test_index_is_rebuilt_when_the_catalogs_change(tmp_path):
+    catalog_dir = write_catalogs(tmp_path / 'catalogs', Barnard=[['B 33', 5.68, -2.46, 'Dark nebula', '', 0, 0,
+                                                                   'Horsehead Nebula', '', 6.0]])
+    path = tmp_path / 'catalogs.npz'
+    assert CatalogIndex.load(path, catalog_dir).lookup('Horsehead Nebula')['name'] == 'B 33'
+    assert CatalogIndex.load(path, catalog_dir).lookup('B33')['name'] == 'B 33'
+
+    write_catalogs(catalog_dir, Barnard=[['B 72', 17.39, -23.63, 'Dark nebula', '', 0, 0, 'Snake Nebula', '', 4.0]])
+    stat = (catalog_dir / 'Barnard.json').stat()
+    os.utime(catalog_dir / 'Barnard.json', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    index = CatalogIndex.load(path, catalog_dir)
+    assert index.lookup('Horsehead Nebula') is None
+    assert index.lookup('Snake Nebula')['name'] == 'B 72'
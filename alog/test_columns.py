@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from erewhon_astro import Calibration, Solution
+
+from alog import columns
+from alog.columns import SIDECAR, load_columns
+from alog.journal import ManifestStore
+from alog.models import FileDescription, Manifest
+
+
+def solved(pathname: str, ra: float, instrument='Seestar S50') -> FileDescription:
+    calibration = Calibration(ra=ra, dec=41.0, width_arcsec=3600, height_arcsec=1800, orientation=30,
+                              parity=1, pixscale=2.4)
+    return FileDescription(pathname=pathname, hash=pathname.ljust(64, '0'), instrument=instrument,
+                           total_exposure_time=600.0, stackcnt=60,
+                           solution=Solution(calibration=calibration, annotations=[]))
+
+
+@pytest.fixture
+def store(tmp_path) -> ManifestStore:
+    store = ManifestStore(tmp_path)
+    store.compact(Manifest(files=[solved('a.fit', 10.0),
+                                  FileDescription(pathname='b.fit', hash='b' * 64, instrument='ZWO ASI2600MC')]))
+    return store
+
+
+def test_columns_of_solved_and_unsolved_files(store):
+    data = load_columns(store)
+    assert data['instruments'][data['instrument']].tolist() == ['Seestar S50', 'ZWO ASI2600MC']
+    assert data['ra'][0] == 10.0 and np.isnan(data['ra'][1])
+    assert (data['width'][0], data['height'][0], data['orientation'][0]) == (1.0, 0.5, 30.0)
+    assert data['stackcnt'].tolist() == [60, 0]
+
+
+def test_sidecar_is_reused_until_the_manifest_changes(store, monkeypatch):
+    load_columns(store)
+    assert (store.dir / SIDECAR).exists()
+
+    def fail(store):
+        raise AssertionError('rebuilt')
+
+    with monkeypatch.context() as m:
+        m.setattr(columns, 'build_columns', fail)
+        assert len(load_columns(store)['ra']) == 2
+
+    # Journal changes are picked up
+    manifest = store.load()
+    manifest.add(solved('c.fit', 20.0))
+    manifest.remove('b.fit')
+    store.checkpoint(manifest)
+    assert load_columns(store)['ra'].tolist() == [10.0, 20.0]
+
+
+def test_empty_manifest(tmp_path):
+    data = load_columns(ManifestStore(tmp_path))
+    assert len(data['ra']) == 0 and len(data['instruments']) == 0
+
+
+def test_file_moved_and_its_pathname_reused(store):
+    load_columns(store)
+    # a.fit renamed to c.fit, then a new a.fit, in separate checkpoints
+    manifest = store.load()
+    manifest.add(solved('c.fit', 10.0).model_copy(update={'hash': 'a.fit'.ljust(64, '0')}), replaces='a.fit')
+    store.checkpoint(manifest)
+    manifest = store.load()
+    manifest.add(solved('a.fit', 30.0).model_copy(update={'hash': 'n' * 64}))
+    store.checkpoint(manifest)
+
+    data = load_columns(store)
+    assert data['ra'][[0, 2]].tolist() == [10.0, 30.0] and np.isnan(data['ra'][1])
+    assert data['instruments'][data['instrument']].tolist() == ['Seestar S50', 'ZWO ASI2600MC', 'Seestar S50']
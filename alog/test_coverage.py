@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from alog.coverage import coverage_map, save_map
+from alog.crossmatch import _tangent_offsets
+
+
+def brute_force(coverage, ra, dec, width, height, orientation, exposure):
+    """Every cell center tested against every footprint, in the footprint's tangent plane."""
+    rows, cols = coverage.exposure.shape
+    cell_ra = coverage.ra_min + (np.arange(cols) + 0.5) * coverage.cell
+    cell_dec = coverage.dec_min + (np.arange(rows) + 0.5) * coverage.cell
+    cell_ra, cell_dec = np.meshgrid(cell_ra, cell_dec)
+    expected = np.zeros((rows, cols))
+    for frame in range(len(ra)):
+        x, y, near = _tangent_offsets(ra[frame], dec[frame], cell_ra, cell_dec)
+        angle = np.radians(orientation[frame])
+        inside = (near & (np.abs(x * np.cos(angle) + y * np.sin(angle)) <= width[frame] / 2)
+                  & (np.abs(y * np.cos(angle) - x * np.sin(angle)) <= height[frame] / 2))
+        expected += inside * exposure[frame]
+    return expected
+
+
+@pytest.mark.parametrize('center_ra, center_dec, spread, cell', [
+    (180.0, 20.0, 2.0, 0.05), (0.0, -10.0, 2.0, 0.05), (359.5, 40.0, 2.0, 0.05), (90.0, 80.0, 2.0, 0.05),
+    # Footprints around and over the pole, across every RA
+    (90.0, 88.0, 2.0, 0.2), (270.0, -87.0, 3.0, 0.2),
+])
+def test_matches_brute_force(monkeypatch, center_ra, center_dec, spread, cell):
+    rng = np.random.default_rng(2)
+    frames = 40
+    ra = np.mod(center_ra + rng.uniform(-spread, spread, frames), 360)
+    dec = np.clip(center_dec + rng.uniform(-spread, spread, frames), -89.9, 89.9)
+    width = rng.uniform(0.3, 3.0, frames)
+    height = rng.uniform(0.3, 1.5, frames)
+    orientation = rng.uniform(-180, 180, frames)
+    exposure = rng.choice([10.0, 20.0, 60.0], frames)
+    # Small chunks, so footprints of different heights are split across them
+    monkeypatch.setattr('alog.coverage.CHUNK_CELLS', 500)
+
+    coverage = coverage_map(ra, dec, width, height, orientation, exposure, cell=cell)
+    assert coverage.frames == frames
+    expected = brute_force(coverage, ra, dec, width, height, orientation, exposure)
+    np.testing.assert_allclose(coverage.exposure, expected, atol=1e-9)
+    # Footprints crossing RA 0 land in one map, not at both ends of the sky
+    ra_min, ra_max, _, _ = coverage.extent
+    assert ra_max - ra_min <= 360 + coverage.cell
+    if abs(center_dec) < 60:
+        assert ra_max - ra_min < 20
+
+
+def test_a_row_crossing_a_footprint_twice():
+    # A long footprint passing just below the pole crosses the rows above its center twice
+    coverage = coverage_map([0.0], [88.0], [0.4], [8.0], [90.0], [60.0], cell=0.05)
+    runs = [np.count_nonzero(np.diff(np.r_[0, row > 0, 0]) > 0) for row in coverage.exposure]
+    assert max(runs) == 2
+    expected = brute_force(coverage, [0.0], [88.0], [0.4], [8.0], [90.0], [60.0])
+    np.testing.assert_allclose(coverage.exposure, expected)
+
+
+def test_small_footprints_count_at_their_center():
+    coverage = coverage_map([10.0, 10.02], [5.0, 5.02], [0.001, 0.001], [0.001, 0.001], [0.0, 30.0],
+                            [30.0, 15.0], cell=0.1)
+    assert coverage.exposure.sum() == pytest.approx(45.0)
+
+
+def test_no_footprints():
+    empty = np.empty(0)
+    coverage = coverage_map(empty, empty, empty, empty, empty, empty)
+    assert coverage.frames == 0 and not coverage.exposure.any()
+
+
+def test_save_map(tmp_path):
+    from astropy.io import fits
+    from astropy.wcs import WCS
+
+    coverage = coverage_map([359.8], [0.0], [1.0], [1.0], [0.0], [30.0], cell=0.1)
+    save_map(coverage, tmp_path / 'coverage.fits')
+    with fits.open(tmp_path / 'coverage.fits') as hdul:
+        data, wcs = hdul[0].data, WCS(hdul[0].header)
+    assert data.sum() == pytest.approx(coverage.exposure.sum())
+    # The brightest cell is at the footprint center, just west of RA 0
+    row, col = np.unravel_index(np.argmax(data), data.shape)
+    ra, dec = wcs.pixel_to_world_values(col, row)
+    assert abs((ra - 359.8 + 180) % 360 - 180) < 0.6 and abs(dec) < 0.6
+
+    save_map(coverage, tmp_path / 'coverage.npy')
+    np.testing.assert_array_equal(np.load(tmp_path / 'coverage.npy'), coverage.exposure)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from alog.crossmatch import _tangent_offsets, footprint_matches
+from alog.footprint import _sky_positions
+
+
+def brute_force(ra, dec, width, height, orientation, object_ra, object_dec, object_radius):
+    """Every footprint and object pair tested directly, with the footprint's axes."""
+    pairs = []
+    for frame in range(len(ra)):
+        x, y, near = _tangent_offsets(ra[frame], dec[frame], object_ra, object_dec)
+        angle = np.radians(orientation[frame])
+        u = x * np.cos(angle) + y * np.sin(angle)
+        v = y * np.cos(angle) - x * np.sin(angle)
+        du = np.maximum(np.abs(u) - width[frame] / 2, 0)
+        dv = np.maximum(np.abs(v) - height[frame] / 2, 0)
+        for obj in np.flatnonzero(near & (du ** 2 + dv ** 2 <= object_radius ** 2)):
+            pairs.append((frame, obj))
+    return pairs
+
+
+@pytest.mark.parametrize('center_ra, center_dec', [(180.0, 20.0), (0.0, -10.0), (90.0, 88.5), (270.0, -89.0)])
+def test_matches_brute_force(center_ra, center_dec):
+    rng = np.random.default_rng(1)
+    frames, objects = 300, 500
+    # Footprints and objects scattered within a few degrees, in the tangent plane
+    ra, dec = _sky_positions(center_ra, center_dec, rng.uniform(-4, 4, frames), rng.uniform(-4, 4, frames))
+    ra = np.mod(ra, 360)
+    width = rng.uniform(0.2, 1.5, frames)
+    height = rng.uniform(0.2, 1.5, frames)
+    orientation = rng.uniform(-180, 180, frames)
+    object_ra, object_dec = _sky_positions(center_ra, center_dec,
+                                           rng.uniform(-5, 5, objects), rng.uniform(-5, 5, objects))
+    object_ra = np.mod(object_ra, 360)
+    object_radius = rng.choice([0.0, 0.05, 0.5], objects)
+
+    found, matched = footprint_matches(ra, dec, width, height, orientation, object_ra, object_dec, object_radius)
+    expected = brute_force(ra, dec, width, height, orientation, object_ra, object_dec, object_radius)
+    assert list(zip(found.tolist(), matched.tolist())) == expected
+    assert len(expected) > 0
+
+
+def test_rotation_and_edges():
+    # A 2 x 0.5 degree footprint, rotated so its long side runs north
+    args = np.array([100.0]), np.array([0.0]), np.array([2.0]), np.array([0.5]), np.array([90.0])
+    # 0.9 degrees north and east, and a disc reaching in from 0.3 degrees east
+    object_ra, object_dec = _sky_positions(100.0, 0.0, np.array([0.0, 0.9, 0.3]), np.array([0.9, 0.0, 0.0]))
+    frames, objects = footprint_matches(*args, object_ra, object_dec, np.array([0.0, 0.0, 0.06]))
+    assert objects.tolist() == [0, 2]
+
+
+def test_no_footprints_or_objects():
+    empty = np.empty(0)
+    one = np.array([1.0])
+    assert all(len(result) == 0 for result in footprint_matches(empty, empty, empty, empty, empty, one, one, one))
+    assert all(len(result) == 0 for result in footprint_matches(one, one, one, one, one, empty, empty, empty))
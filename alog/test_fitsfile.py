@@ -0,0 +1,109 @@
+import hashlib
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from alog import fitsfile
+from alog.fitsfile import BLOCK_SIZE, CARD_SIZE, HEADER_KEYWORDS, hash_and_read_header, parse_header
+
+
+def card(text: str) -> bytes:
+    return text.ljust(CARD_SIZE).encode('ascii')
+
+
+def header(*cards: str) -> bytes:
+    data = b''.join(map(card, ['SIMPLE  =                    T', *cards, 'END']))
+    return data.ljust(-(-len(data) // BLOCK_SIZE) * BLOCK_SIZE, b' ')
+
+
+def write_frame(path, cards: int = 10) -> fits.Header:
+    h = fits.Header()
+    h['EXPTIME'] = 10.0
+    h['INSTRUME'] = "Seestar S50 'v2'"
+    h['STACKCNT'] = 42
+    h['RA'] = 10.6847
+    h['DEC'] = -41.269
+    for n in range(cards):
+        h[f'KEY{n}'] = (n * 1.5, 'filler')
+    fits.PrimaryHDU(np.arange(64, dtype=np.uint16).reshape(8, 8), header=h).writeto(path)
+    return fits.getheader(path)
+
+
+@pytest.mark.parametrize('cards', [10, 200])
+def test_matches_astropy(tmp_path, monkeypatch, cards):
+    path = tmp_path / 'frame.fit'
+    expected = write_frame(path, cards)
+    # Headers of several blocks, read a block at a time
+    monkeypatch.setattr(fitsfile, 'CHUNK_SIZE', BLOCK_SIZE)
+
+    digest, values, size = hash_and_read_header(path)
+    data = path.read_bytes()
+    assert digest == hashlib.sha256(data).hexdigest() and size == len(data)
+    assert values == {keyword: expected[keyword] for keyword in HEADER_KEYWORDS if keyword in expected}
+    assert values['INSTRUME'] == "Seestar S50 'v2'"
+    assert 'TOTALEXP' not in values
+
+
+@pytest.mark.parametrize('text, value', [
+    ("OBJECT  = 'M 31    '           / target", 'M 31'),
+    ("OBJECT  = 'It''s / here'", "It's / here"),
+    ("OBJECT  = ''", ''),
+    ('OBJECT  =                    T / logical', True),
+    ('OBJECT  =                    F', False),
+    ('OBJECT  =                  -42', -42),
+    ('OBJECT  =               1.5D+2 / Fortran exponent', 150.0),
+    ('OBJECT  =                 .5e-1', 0.05),
+])
+def test_card_values(text, value):
+    assert parse_header(header(text), ['OBJECT']) == {'OBJECT': value}
+
+
+@pytest.mark.parametrize('text', [
+    "OBJECT  = 'A long string &'",       # Continued on CONTINUE cards
+    "OBJECT  = 'unterminated",
+    'OBJECT  = (1.0, 2.0)',              # Complex
+    'OBJECT  =',                         # No value
+    'OBJECT    HISTORY-like card',
+])
+def test_unusual_cards_fall_back(text):
+    assert parse_header(header(text), ['OBJECT']) is None
+
+
+def test_only_requested_cards():
+    cards = header('EXPTIME =                 10.0', "WEIRD   = 'ignored &'", 'EXPTIME =                 20.0')
+    # The first of a repeated keyword, and unusual cards that were not asked for do not matter
+    assert parse_header(cards, ['EXPTIME', 'MISSING']) == {'EXPTIME': 10.0}
+    # Cards after END are not part of the header
+    assert parse_header(header('END', 'EXPTIME =                 10.0'), ['EXPTIME']) == {}
+
+
+def test_end_inside_a_value(tmp_path):
+    # "END     " that is not at the start of a card does not end the header
+    path = tmp_path / 'frame.fit'
+    h = fits.Header()
+    h['OBJECT'] = 'END     END'
+    h['EXPTIME'] = 30.0
+    fits.PrimaryHDU(np.zeros((2, 2), dtype=np.uint8), header=h).writeto(path)
+    assert hash_and_read_header(path, ['OBJECT', 'EXPTIME'])[1] == {'OBJECT': 'END     END', 'EXPTIME': 30.0}
+
+
+@pytest.mark.filterwarnings('ignore')
+def test_truncated_header(tmp_path):
+    path = tmp_path / 'frame.fit'
+    write_frame(path)
+    data = path.read_bytes()
+    end = data.index(card('END'))
+
+    # The END card missing, or cut short
+    for truncated in (data[:end], data[:end + 3]):
+        path.write_bytes(truncated)
+        with pytest.raises(OSError):
+            hash_and_read_header(path)
+
+
+def test_not_fits(tmp_path):
+    path = tmp_path / 'notes.fit'
+    path.write_bytes(b'Not a FITS file\n' * 1000)
+    with pytest.raises(OSError):
+        hash_and_read_header(path)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from alog.crossmatch import _tangent_offsets
+from alog.footprint import bounds, corners, unwrap_ra
+
+
+def footprint(ra, dec, width=1.0, height=0.5, rotation=0.0) -> np.ndarray:
+    return corners(*(np.atleast_1d(np.asarray(value, dtype=np.float64))
+                     for value in (ra, dec, width, height, rotation)))
+
+
+def test_ra_is_degrees():
+    # M31, which is not in hours though below 24
+    ra = footprint(10.7, 41.3)[0, :, 0]
+    assert ra.mean() == pytest.approx(10.7, abs=0.01)
+
+
+@pytest.mark.parametrize('dec', [0.0, 45.0, 80.0, -89.0])
+@pytest.mark.parametrize('rotation', [0.0, 30.0, 90.0])
+def test_corners_are_the_rectangle_in_the_tangent_plane(dec, rotation):
+    width, height = 1.2, 0.7
+    points = footprint(123.0, dec, width, height, rotation)[0]
+    x, y, near = _tangent_offsets(123.0, dec, points[:, 0], points[:, 1])
+    assert near.all()
+
+    # Back in footprint axes, as in `footprint_matches`
+    angle = np.radians(rotation)
+    u = x * np.cos(angle) + y * np.sin(angle)
+    v = y * np.cos(angle) - x * np.sin(angle)
+    np.testing.assert_allclose(np.abs(u), width / 2, atol=1e-9)
+    np.testing.assert_allclose(np.abs(v), height / 2, atol=1e-9)
+
+
+def test_high_declination_is_wider_in_ra():
+    min_ra, max_ra, min_dec, max_dec = bounds(footprint(50.0, 80.0))
+    # Widest at the corners furthest from the equator
+    assert max_ra - min_ra == pytest.approx(1.0 / np.cos(np.radians(80.25)), rel=0.01)
+    assert max_dec - min_dec == pytest.approx(0.5, rel=0.02)
+
+
+def test_footprints_across_ra_zero_are_continuous():
+    points = footprint([359.5, 359.9, 0.1, 0.5], [0.0] * 4, [0.4] * 4, [0.4] * 4, [0.0] * 4)
+    min_ra, max_ra, _, _ = bounds(points)
+    assert max_ra - min_ra == pytest.approx(1.4, abs=1e-4)
+    assert np.mod(min_ra, 360) == pytest.approx(359.3, abs=1e-4)
+
+
+def test_unwrap_ra():
+    np.testing.assert_allclose(unwrap_ra(np.array([359.0, 1.0])), [359.0, 361.0])
+    np.testing.assert_allclose(unwrap_ra(np.array([10.0, 20.0])), [10.0, 20.0])
+    assert len(unwrap_ra(np.empty(0))) == 0
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+from matplotlib.image import imread
+from pyproj import CRS
+
+from alog import graphplot
+from alog.chart_cache import ChartCache, chart_key
+from alog.models import ImageRectangle
+
+# Spherical Mercator, as cartopy defines starplot's projection
+RADIUS = 6378137.0
+MERCATOR = CRS.from_proj4(f'+proj=merc +a={RADIUS} +b={RADIUS} +lon_0=0 +units=m +no_defs')
+
+# Pixels per projected meter, and the image size
+SCALE = 2e-5
+WIDTH, HEIGHT = 400, 300
+
+
+def mercator(ra, dec):
+    """RA increases to the west, so to the left of the chart."""
+    return -RADIUS * np.radians(ra), RADIUS * np.log(np.tan(np.pi / 4 + np.radians(dec) / 2))
+
+
+def background(center_ra=15.0, clip=((0, 0), (WIDTH, HEIGHT))) -> tuple[np.ndarray, dict]:
+    """A black chart with `center_ra`, Dec 0 in the middle."""
+    x0, _ = mercator(center_ra, 0)
+    transform = [[SCALE, 0, WIDTH / 2 - SCALE * x0], [0, SCALE, HEIGHT / 2], [0, 0, 1]]
+    image = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+    image[..., 3] = 255
+    return image, {'projection': MERCATOR.to_wkt(), 'transform': transform, 'clip': [list(clip[0]), list(clip[1])],
+                   'scale': 1.0}
+
+
+def drawn_box(path) -> tuple[float, float, float, float]:
+    """Pixel box of the red pixels, from the lower left like the chart geometry."""
+    red = imread(path)[..., 0] > 0.5
+    rows, cols = np.nonzero(red[::-1])
+    return cols.min(), cols.max() + 1, rows.min(), rows.max() + 1
+
+
+def test_composite_places_footprints(tmp_path):
+    image, geometry = background()
+    # A footprint from RA 14 to 16 and Dec -1 to 1
+    footprint = np.array([[[14.0, -1.0], [16.0, -1.0], [16.0, 1.0], [14.0, 1.0]]])
+    graphplot._composite(image, geometry, footprint, np.array([[1.0, 0, 0, 1]]), tmp_path / 'chart.png')
+
+    left, right, bottom, top = drawn_box(tmp_path / 'chart.png')
+    (x_east, x_west), (y_south, y_north) = mercator(np.array([16.0, 14.0]), np.array([-1.0, 1.0]))
+    transform = np.array(geometry['transform'])
+    expected = [transform[0, 0] * x + transform[0, 2] for x in (x_east, x_west)]
+    expected += [transform[1, 1] * y + transform[1, 2] for y in (y_south, y_north)]
+    # East on the left, and within the line width of the exact edges
+    assert expected[0] < expected[1]
+    np.testing.assert_allclose([left, right, bottom, top], expected, atol=2)
+    assert imread(tmp_path / 'chart.png').shape[:2] == (HEIGHT, WIDTH)
+
+
+def test_composite_is_clipped_to_the_map(tmp_path):
+    image, geometry = background(clip=((0, 0), (WIDTH / 2, HEIGHT)))
+    footprint = np.array([[[14.0, -1.0], [16.0, -1.0], [16.0, 1.0], [14.0, 1.0]]])
+    graphplot._composite(image, geometry, footprint, np.array([[1.0, 0, 0, 1]]), tmp_path / 'chart.png')
+    left, right, _, _ = drawn_box(tmp_path / 'chart.png')
+    assert right <= WIDTH / 2 < left + 40
+
+
+def test_chart_key():
+    params = dict(version=2, starplot='0.15', projection='mercator', bounds=(10.0, 20.0, -5.0, 5.0),
+                  style=[['MAP'], {}], resolution=3600)
+    assert chart_key(**params) == chart_key(**dict(reversed(list(params.items()))))
+    for name, value in [('version', 3), ('starplot', '0.16'), ('bounds', (10.0, 20.5, -5.0, 5.0))]:
+        assert chart_key(**{**params, name: value}) != chart_key(**params)
+
+
+def test_background_is_rendered_once(tmp_path, monkeypatch):
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path / 'cache'))
+    rendered = []
+
+    def render(map_bounds):
+        rendered.append(map_bounds)
+        ra_min, ra_max, _, _ = map_bounds
+        return background((ra_min + ra_max) / 2)
+
+    monkeypatch.setattr(graphplot, '_render_background', render)
+
+    def rectangles(ra, exposure):
+        return [ImageRectangle(x=ra, y=0.0, width=2.0, height=1.0, rotation=0.0, total_exposure_time=exposure)]
+
+    graphplot.plot_graph(rectangles(15.1, 600.0), tmp_path / 'first.png')
+    # Another session on the same target reuses the cached background
+    graphplot.plot_graph(rectangles(15.2, 1200.0), tmp_path / 'second.png')
+    assert len(rendered) == 1
+    assert (tmp_path / 'first.png').exists() and (tmp_path / 'second.png').exists()
+    cache = ChartCache(tmp_path / 'cache' / 'charts', 10 ** 9)
+    assert len(list(cache.directory.glob('*.npy'))) == 1
+
+    # Elsewhere in the sky, or after the background layers change, it is rendered again
+    graphplot.plot_graph(rectangles(120.0, 600.0), tmp_path / 'third.png')
+    monkeypatch.setattr(graphplot, 'BACKGROUND_VERSION', graphplot.BACKGROUND_VERSION + 1)
+    graphplot.plot_graph(rectangles(15.1, 600.0), tmp_path / 'fourth.png')
+    assert len(rendered) == 3 and rendered[0] == rendered[2]
+
+
+def test_cache_evicts_the_least_recently_used(tmp_path, monkeypatch):
+    # A clock that ticks on every use, as file times may be too coarse to tell uses apart
+    clock = iter(range(1_000_000, 2_000_000, 10))
+    utime = os.utime
+    monkeypatch.setattr(os, 'utime', lambda path, times=None: utime(path, times or (next(clock),) * 2))
+
+    cache = ChartCache(tmp_path, max_bytes=2 * 64 * 64 * 4 + 1000)
+    image = np.zeros((64, 64, 4), dtype=np.uint8)
+    for n, key in enumerate('abc'):
+        cache.put(key, image + n, {'n': n})
+        os.utime(tmp_path / f'{key}.npy')
+        if key == 'b':
+            # `a` used more recently than `b`
+            assert cache.get('a')[1] == {'n': 0}
+    assert cache.get('b') is None
+    stored, geometry = cache.get('c')
+    assert geometry == {'n': 2} and stored[0, 0, 0] == 2
@@ -0,0 +1,142 @@
+import io
+import json
+import random
+
+import pytest
+
+from alog import journal
+from alog.journal import ManifestStore, _iter_json_items
+from alog.models import FileDescription, Manifest
+
+
+def make_manifest(count: int) -> Manifest:
+    return Manifest(files=[FileDescription(pathname=f'sub/frame{i:02d}.fit', hash=f'{i:064x}',
+                                           instrument='Seestar S50', total_exposure_time=10.0 * i)
+                           for i in range(count)])
+
+
+def pathnames(entries) -> list[tuple[str, str]]:
+    return [(entry.pathname, entry.hash) for entry in entries]
+
+
+@pytest.mark.parametrize('indent', [2, None])
+def test_items_at_every_read_size(monkeypatch, indent):
+    data = {'files': [{'pathname': f'f{i}.fit', 'nested': {'x': [i, '}']}} for i in range(3)]}
+    text = json.dumps(data, indent=indent)
+    expected = data['files']
+    for read_size in range(1, len(text) + 1):
+        monkeypatch.setattr(journal, 'READ_SIZE', read_size)
+        items = [json.loads(item) for item in _iter_json_items(io.StringIO(text), 'files')]
+        assert items == expected, read_size
+
+
+def test_truncated_snapshot_is_an_error(monkeypatch):
+    text = make_manifest(2).model_dump_json(indent=2)
+    monkeypatch.setattr(journal, 'READ_SIZE', 16)
+    with pytest.raises(ValueError):
+        list(_iter_json_items(io.StringIO(text[:-40]), 'files'))
+
+
+def test_iter_files_at_every_read_size(tmp_path, monkeypatch):
+    store = ManifestStore(tmp_path)
+    store.compact(make_manifest(3))
+    snapshot_size = store.snapshot.stat().st_size
+
+    manifest = store.load()
+    moved = manifest.find('sub/frame01.fit').model_copy(update={'pathname': 'moved/frame01.fit'})
+    manifest.add(moved, replaces='sub/frame01.fit')
+    manifest.remove('sub/frame02.fit')
+    manifest.add(FileDescription(pathname='sub/new.fit', hash='f' * 64))
+    store.checkpoint(manifest)
+    assert store.journal.exists()
+
+    expected = pathnames(store.load().files)
+    assert expected == [('sub/frame00.fit', f'{0:064x}'), ('moved/frame01.fit', f'{1:064x}'),
+                        ('sub/new.fit', 'f' * 64)]
+    for read_size in range(1, snapshot_size + 1):
+        monkeypatch.setattr(journal, 'READ_SIZE', read_size)
+        assert pathnames(store.iter_files()) == expected, read_size
+
+
+def test_incomplete_journal_line_is_skipped(tmp_path):
+    store = ManifestStore(tmp_path)
+    store.compact(make_manifest(1))
+    manifest = store.load()
+    manifest.add(FileDescription(pathname='a.fit', hash='a' * 64))
+    store.checkpoint(manifest)
+
+    # A crash part way through writing a record
+    with open(store.journal, 'ab') as f:
+        f.write(b'{"put": {"pathname": "b.fit"')
+    manifest = store.load()
+    assert [desc.pathname for desc in manifest.files] == ['sub/frame00.fit', 'a.fit']
+
+    # The next checkpoint replaces the incomplete line
+    manifest.add(FileDescription(pathname='c.fit', hash='c' * 64))
+    store.checkpoint(manifest)
+    assert [desc.pathname for desc in store.load().files] == ['sub/frame00.fit', 'a.fit', 'c.fit']
+    assert store.journal.read_bytes().endswith(b'\n')
+
+
+def entries(store: ManifestStore) -> tuple[list, list]:
+    key = lambda desc: (desc.pathname, desc.hash, desc.id)
+    return [key(desc) for desc in store.load().files], [key(desc) for desc in store.iter_files()]
+
+
+def test_move_then_reuse_the_old_pathname(tmp_path):
+    store = ManifestStore(tmp_path)
+    store.compact(Manifest(files=[FileDescription(pathname='a.fit', hash='a' * 64, id='A')]))
+
+    # a.fit renamed to b.fit, then a new a.fit
+    manifest = store.load()
+    manifest.add(FileDescription(pathname='b.fit', hash='a' * 64), replaces='a.fit')
+    store.checkpoint(manifest)
+    manifest = store.load()
+    manifest.add(FileDescription(pathname='a.fit', hash='c' * 64))
+    store.checkpoint(manifest)
+
+    loaded, streamed = entries(store)
+    assert loaded == [('b.fit', 'a' * 64, 'A'), ('a.fit', 'c' * 64, None)]
+    assert streamed == loaded
+
+
+def test_replace_onto_an_existing_pathname(tmp_path):
+    store = ManifestStore(tmp_path)
+    store.compact(make_manifest(3))
+
+    manifest = store.load()
+    manifest.add(FileDescription(pathname='sub/frame02.fit', hash='f' * 64), replaces='sub/frame00.fit')
+    store.checkpoint(manifest)
+
+    loaded, streamed = entries(store)
+    assert loaded == [('sub/frame01.fit', f'{1:064x}', None), ('sub/frame02.fit', 'f' * 64, None)]
+    assert streamed == loaded
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_iter_files_matches_load(tmp_path, seed):
+    rng = random.Random(seed)
+    names = [f'{name}.fit' for name in 'abcdef']
+    store = ManifestStore(tmp_path)
+    store.compact(Manifest(files=[FileDescription(pathname=name, hash=f'{n:064x}', id=f'id{n}')
+                                  for n, name in enumerate(rng.sample(names, rng.randint(0, 4)))]))
+
+    manifest = store.load()
+    for step in range(rng.randint(1, 12)):
+        existing = [desc.pathname for desc in manifest.files]
+        action = rng.choice(['put', 'move', 'remove', 'checkpoint'])
+        if action == 'remove' and existing:
+            manifest.remove(rng.choice(existing))
+        elif action == 'checkpoint':
+            store.checkpoint(manifest)
+            if rng.random() < 0.5:
+                manifest = store.load()
+        else:
+            desc = FileDescription(pathname=rng.choice(names), hash=f'{seed * 100 + step:064x}')
+            # Moves from existing entries, onto new or existing pathnames, and from missing ones
+            manifest.add(desc, replaces=rng.choice(names) if action == 'move' else None)
+    store.checkpoint(manifest)
+
+    loaded, streamed = entries(store)
+    assert streamed == loaded
+    assert loaded == [(desc.pathname, desc.hash, desc.id) for desc in manifest.files]
@@ -0,0 +1,51 @@
+import pytest
+
+from alog.names import extract_catalog_references, extract_common_name, parse_names
+
+
+def designations(names) -> list[str]:
+    return [reference['designation'] for reference in parse_names(names)[0]]
+
+
+def test_simbad_identifiers():
+    references, common_name = parse_names(['M  31', 'NGC   224', 'NAME Andromeda Galaxy', 'UGC 454', 'PGC 2557'])
+    assert [(reference['catalog'], reference['id']) for reference in references] == [
+        ('Messier', '31'), ('NGC', '224'), ('UGC', '454'), ('PGC', '2557')]
+    assert common_name == 'Andromeda Galaxy'
+
+
+@pytest.mark.parametrize('names, expected', [
+    (['Sh 2-155', 'B 33', 'IC 434'], ['Sh2 155', 'Barnard 33', 'IC 434']),
+    (['ESO 123-16', '2MASS J05351234+0512345'], ['ESO 123-16', '2MASS 05351234']),
+    (['HD 48915', 'HIP 32349', 'HR 2491', 'SAO 151881'], ['HD 48915', 'HIP 32349', 'HR 2491', 'SAO 151881']),
+    # Case, padding and repeats
+    (['NGC 224', 'ngc 224', None, '  NGC 224  '], ['NGC 224']),
+    # Caldwell is not a catalog here
+    (['C 14'], []),
+    ([], []),
+])
+def test_catalog_references(names, expected):
+    assert designations(names) == expected
+
+
+@pytest.mark.parametrize('names, expected', [
+    # The object-type pattern has the highest priority, whatever the order
+    (['NAME Crab', 'Crab Nebula'], 'Crab Nebula'),
+    (['M  42', 'NAME Orion Nebula'], 'Orion Nebula'),
+    (['NAME Sirius', 'NAME Dog Star'], 'Dog Star'),
+    # Earlier names win ties
+    (['NAME Sirius', 'NAME Canicula'], 'Sirius'),
+    (['HD 48915', 'Sirius'], 'Sirius'),
+    # Catalog designations, abbreviations and numbers are not common names
+    (['NGC 224', 'M 31'], None),
+    (['NAME Ab'], None),
+    (['NAME 12345'], None),
+])
+def test_common_name(names, expected):
+    assert parse_names(names)[1] == expected
+
+
+def test_wrappers():
+    names = ['M  1', 'NAME Crab Nebula']
+    assert extract_common_name(names) == 'Crab Nebula'
+    assert extract_catalog_references(names) == parse_names(names)[0]
@@ -0,0 +1,53 @@
+import pytest
+
+from alog.resolver_cache import ResolverCache, normalize_designation
+
+M31 = {'name': 'M  31', 'type': 'G', 'alternative_names': ['M  31', 'NGC   224', 'NAME Andromeda Galaxy']}
+
+
+@pytest.mark.parametrize('name, key', [
+    ('M31', 'M31'),
+    ('m 31', 'M31'),
+    ('M  31', 'M31'),
+    ('Messier 31', 'M31'),
+    ('MESSIER031', 'M31'),
+    ('NGC 224', 'NGC224'),
+    ('NGC0224', 'NGC224'),
+    ('NAME Andromeda Galaxy', 'ANDROMEDAGALAXY'),
+    ('andromeda  galaxy', 'ANDROMEDAGALAXY'),
+    ('Sh2-155', 'SH2-155'),
+    ('Sharpless 155', 'SH2-155'),
+    ('SHARPLESS2-155', 'SH2-155'),
+    # Not a catalog prefix, and nothing to strip
+    ('Messier', 'MESSIER'),
+    ('Name', 'NAME'),
+    ('M0', 'M0'),
+])
+def test_normalize_designation(name, key):
+    assert normalize_designation(name) == key
+
+
+def test_objects_are_found_by_every_name(tmp_path):
+    cache = ResolverCache(tmp_path / 'objects.db', ttl=3600)
+    cache.put(M31, ['Great Andromeda Nebula'])
+    for name in ['M31', 'Messier 31', 'NGC 224', 'Andromeda Galaxy', 'great andromeda nebula']:
+        data, stale = cache.get(name)
+        assert data == M31 and not stale
+    assert cache.get('M 32') is None
+    assert cache.stats() == {'objects': 1, 'names': 4, 'stale': 0}
+
+
+def test_entries_go_stale_and_are_replaced(tmp_path):
+    cache = ResolverCache(tmp_path / 'objects.db', ttl=0)
+    cache.put(M31)
+    assert cache.get('M31')[1]
+    assert cache.stats()['stale'] == 1
+
+    cache.put({**M31, 'type': 'AGN'}, ['Andromeda'])
+    assert cache.get('NGC 224')[0]['type'] == 'AGN'
+    assert cache.stats()['objects'] == 1
+    cache.close()
+
+    # Shared through the file, and fresh under a longer TTL
+    data, stale = ResolverCache(tmp_path / 'objects.db', ttl=3600).get('Andromeda')
+    assert data['type'] == 'AGN' and not stale
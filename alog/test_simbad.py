@@ -0,0 +1,130 @@
+import io
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from astropy.io.votable.tree import Info
+from astropy.table import MaskedColumn, Table
+
+from alog import simbad
+from alog.resolver_cache import normalize_designation
+
+# Simbad objects by oid: main id, RA, Dec, type and identifiers
+OBJECTS = {
+    1: ('M  31', 10.68, 41.27, 'G', ['M  31', 'NGC   224', 'NAME Andromeda Galaxy', 'UGC 454']),
+    2: ('M  42', 83.8, -5.39, 'HII', ['M  42', 'NGC  1976', 'NAME Orion Nebula']),
+    3: ("NAME Barnard's Star", 269.45, 4.69, 'PM*', ["NAME Barnard's Star", 'GJ   699']),
+}
+
+
+def _literals(query: str) -> list[str]:
+    """The string literals of an ADQL query, unescaped."""
+    return [literal.replace("''", "'") for literal in re.findall(r"'((?:[^']|'')*)'", query)]
+
+
+def object_rows(names: list[str]) -> Table:
+    """Rows of `OBJECT_COLUMNS` for the objects with the given identifiers, one per identifier matched."""
+    rows = [(OBJECTS[oid][0], OBJECTS[oid][1], OBJECTS[oid][2], OBJECTS[oid][3], oid, 0.0, 3.0, name)
+            for name in names for oid in OBJECTS
+            if normalize_designation(name) in map(normalize_designation, OBJECTS[oid][4])]
+    table = Table(rows=rows or None, names=['main_id', 'ra', 'dec', 'otype', 'oid', 'plx_value', 'V', 'matched_id'],
+                  dtype=[str, float, float, str, int, float, float, str])
+    for column in ['pmra', 'pmdec', 'galdim_majaxis', 'galdim_minaxis', 'galdim_angle']:
+        table[column] = MaskedColumn([0.0] * len(table), mask=[True] * len(table))
+    table['sp_type'] = MaskedColumn([''] * len(table), mask=[True] * len(table), dtype=str)
+    return table
+
+
+def votable(table: Table) -> bytes:
+    from astropy.io.votable import from_table
+
+    result = from_table(table)
+    result.resources[0].infos.append(Info(name='QUERY_STATUS', value='OK'))
+    buffer = io.BytesIO()
+    result.to_xml(buffer)
+    return buffer.getvalue()
+
+
+class TAPHandler(BaseHTTPRequestHandler):
+    """A synchronous TAP endpoint answering the two queries of `query_objects` from `OBJECTS`."""
+    queries = []
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        if self.path != '/tap/sync' or form.get('LANG') != ['ADQL']:
+            self.send_error(400)
+            return
+        query = form['QUERY'][0]
+        self.queries.append(query)
+        if 'FROM ident' in query:
+            oids = [int(oid) for oid in re.search(r'IN \(([^)]*)\)', query).group(1).split(',')]
+            table = Table(rows=[(oid, name) for oid in oids for name in OBJECTS[oid][4]] or None,
+                          names=['oidref', 'id'], dtype=[int, str])
+        else:
+            table = object_rows(_literals(query))
+
+        body = votable(table)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-votable+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def tap():
+    TAPHandler.queries = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TAPHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/tap', TAPHandler.queries
+    server.shutdown()
+    server.server_close()
+
+
+def test_query_objects_in_batches(tap):
+    url, queries = tap
+    names = ['M31', 'Messier 42', 'Andromeda Galaxy', 'NGC 1976', 'Unknown 1', "Barnard's Star", 'gj 699']
+    results = list(simbad.query_objects(names, url, batch_size=3))
+
+    assert [name for name, _ in results] == names
+    found = {name: data['name'] if data else None for name, data in results}
+    assert found == {'M31': 'M  31', 'Messier 42': 'M  42', 'Andromeda Galaxy': 'M  31', 'NGC 1976': 'M  42',
+                     'Unknown 1': None, "Barnard's Star": "NAME Barnard's Star", 'gj 699': "NAME Barnard's Star"}
+    assert dict(results)['M31']['alternative_names'] == OBJECTS[1][4]
+
+    # Two queries per batch of three names, the quote escaped
+    assert len(queries) == 6
+    assert "'Barnard''s Star'" in queries[2]
+
+
+def test_query_objects_without_matches(tap):
+    url, queries = tap
+    results = list(simbad.query_objects(['Nothing', 'Nowhere'], url))
+    assert results == [('Nothing', None), ('Nowhere', None)]
+    # No identifiers query without objects
+    assert len(queries) == 1
+
+
+def test_query_object_escapes_the_name(monkeypatch):
+    import astroquery.simbad
+
+    queries = []
+
+    class FakeSimbad:
+        def query_tap(self, query):
+            queries.append(query)
+            return object_rows(_literals(query))
+
+        def query_objectids(self, name):
+            return Table(rows=[(identifier,) for identifier in OBJECTS[3][4]], names=['id'], dtype=[str])
+
+    monkeypatch.setattr(astroquery.simbad, 'Simbad', FakeSimbad)
+    data = simbad.query_object("Barnard's Star")
+    assert data['name'] == "NAME Barnard's Star"
+    assert "id = 'Barnard''s Star'" in queries[0]
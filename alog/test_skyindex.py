@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from alog.skyindex import SkyIndex, angular_distance, ra_ranges
+
+
+@pytest.fixture(scope='module')
+def positions():
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0, 360, 20000)
+    # Uniform on the sphere, with some exactly at the poles and on RA 0
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 20000)))
+    dec[:4] = [90.0, -90.0, 89.99, -89.99]
+    ra[4:8] = 0.0
+    return ra, dec
+
+
+def test_ra_ranges():
+    assert ra_ranges(10, 20) == [(10, 20)]
+    assert ra_ranges(350, 10) == [(350, 360.0), (0.0, 10)]
+    assert ra_ranges(-5, 10) == [(355, 360.0), (0.0, 10)]
+    assert ra_ranges(355, 365) == [(355, 360.0), (0.0, 5)]
+    assert ra_ranges(0, 360) == [(0.0, 360.0)]
+
+
+@pytest.mark.parametrize('ra, dec, radius', [
+    (180.0, 0.0, 5.0),
+    (0.5, 10.0, 3.0),      # Across RA 0
+    (359.0, -30.0, 4.0),
+    (45.0, 88.0, 3.0),     # Around the north pole
+    (200.0, -89.5, 1.0),   # Around the south pole
+    (120.0, 75.0, 14.0),   # Wide in RA at high declination
+    (10.0, 20.0, 0.0),
+])
+def test_cone_matches_brute_force(positions, ra, dec, radius):
+    index = SkyIndex(*positions)
+    expected = np.flatnonzero(angular_distance(ra, dec, *positions) <= radius)
+    assert sorted(index.query_cone(ra, dec, radius)) == expected.tolist()
+
+
+@pytest.mark.parametrize('ra_min, ra_max, dec_min, dec_max', [
+    (10.0, 30.0, -10.0, 10.0),
+    (350.0, 10.0, 20.0, 40.0),
+    (-20.0, 5.0, 80.0, 95.0),
+    (0.0, 360.0, -95.0, -85.0),
+])
+def test_box_matches_brute_force(positions, ra_min, ra_max, dec_min, dec_max):
+    ra, dec = positions
+    index = SkyIndex(ra, dec, band_height=2.5)
+    in_ra = np.zeros(len(ra), dtype=bool)
+    for lo, hi in ra_ranges(ra_min, ra_max):
+        in_ra |= (ra >= lo) & (ra <= hi)
+    expected = np.flatnonzero(in_ra & (dec >= dec_min) & (dec <= dec_max))
+    assert sorted(index.query_box(ra_min, ra_max, dec_min, dec_max)) == expected.tolist()
+
+
+def test_empty_index():
+    index = SkyIndex(np.empty(0), np.empty(0))
+    assert len(index) == 0
+    assert len(index.query_cone(0.0, 0.0, 10.0)) == 0
@@ -0,0 +1,55 @@
+from erewhon_astro import Calibration, Solution
+
+from alog.solve_cache import SolveCache
+
+
+def solution(ra: float) -> Solution:
+    return Solution(calibration=Calibration(ra=ra, dec=41.0, width_arcsec=4600, height_arcsec=2600,
+                                            orientation=30, parity=1, pixscale=2.4), annotations=[])
+
+
+SIZE = len(solution(0.0).model_dump_json())
+
+
+def test_solutions_and_statistics_are_shared(tmp_path):
+    path = tmp_path / 'solutions.db'
+    writer = SolveCache(path, 1_000_000)
+    writer.put('a' * 64, solution(10.0))
+
+    reader = SolveCache(path, 1_000_000)
+    assert reader.get('a' * 64).calibration.ra == 10.0
+    assert reader.get('b' * 64) is None
+    writer.close()
+    reader.close()
+
+    stats = SolveCache(path, 1_000_000).stats()
+    assert stats['entries'] == 1
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = SolveCache(tmp_path / 'solutions.db', SIZE * 2)
+    for i, hash in enumerate(['a' * 64, 'b' * 64, 'c' * 64]):
+        cache.put(hash, solution(float(i)))
+    # Using `a` makes `b` the least recently used
+    assert cache.get('a' * 64) is not None
+    cache.close()
+
+    cache = SolveCache(tmp_path / 'solutions.db', SIZE * 2)
+    assert cache.get('b' * 64) is None
+    assert cache.get('a' * 64) is not None
+    assert cache.get('c' * 64) is not None
+
+
+def test_reading_statistics_does_not_evict(tmp_path):
+    path = tmp_path / 'solutions.db'
+    cache = SolveCache(path, 1_000_000)
+    for i in range(3):
+        cache.put(f'{i:064x}', solution(float(i)))
+    cache.close()
+
+    # A smaller limit, as after changing the setting
+    cache = SolveCache(path, SIZE)
+    assert cache.stats()['entries'] == 3
+    cache.close()
+    assert SolveCache(path, 1_000_000).stats()['entries'] == 3
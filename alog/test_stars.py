@@ -0,0 +1,218 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.colors import to_rgba
+from skyfield.data import hipparcos
+from skyfield.named_stars import named_star_dict
+
+from alog import stars
+from alog.graph import display_rectangles_and_stars
+from alog.models import ImageRectangle
+
+matplotlib.use('Agg')
+
+SPECTRA = ['O5', 'B2V', 'A0', 'F5IV', 'G2V', 'K3III', 'M1', 'C', 'WC', '']
+
+
+def hip_main(rng, count=3000) -> tuple[str, pd.DataFrame]:
+    """Synthetic hip_main.dat, with 78 fixed-width fields like the real file, and its values.
+
+    A few stars have no magnitude or no position, and the named stars are bright."""
+    named = sorted(set(named_star_dict.values()))[:30]
+    others = np.setdiff1d(np.arange(1, 120000), named)
+    hip = np.union1d(named, rng.choice(others, count - len(named), replace=False))
+    values = pd.DataFrame({
+        'hip': hip,
+        'magnitude': np.round(rng.uniform(-1.5, 12.0, count), 2),
+        'ra': rng.uniform(0, 360, count),
+        # Crowded around the charts, so they hold plenty of stars
+        'dec': rng.uniform(-20, 40, count),
+        'parallax_mas': np.round(rng.uniform(0, 100, count), 2),
+        'ra_mas_per_year': np.round(rng.normal(0, 50, count), 2),
+        'dec_mas_per_year': np.round(rng.normal(0, 50, count), 2),
+        'spectrum': rng.choice(SPECTRA, count),
+    })
+    values.loc[np.isin(hip, named), 'magnitude'] = np.round(rng.uniform(-1.5, 2.9, len(named)), 2)
+    values.loc[rng.choice(count, 20, replace=False), 'magnitude'] = np.nan
+    values.loc[rng.choice(count, 10, replace=False), ['ra', 'dec']] = np.nan
+
+    def number(value, width, spec):
+        return ' ' * width if np.isnan(value) else format(value, spec).rjust(width)
+
+    lines = []
+    for row in values.itertuples():
+        fields = [''] * 78
+        fields[0] = 'H'
+        fields[1] = f'{row.hip:12d}'
+        fields[5] = number(row.magnitude, 5, '.2f')
+        fields[8] = number(row.ra, 12, '.8f')
+        fields[9] = number(row.dec, 12, '+.8f')
+        fields[11] = number(row.parallax_mas, 7, '.2f')
+        fields[12] = number(row.ra_mas_per_year, 8, '.2f')
+        fields[13] = number(row.dec_mas_per_year, 8, '.2f')
+        fields[76] = f'{row.spectrum:12s}'
+        lines.append('|'.join(fields))
+    return '\n'.join(lines) + '\n', values
+
+
+class FakeLoader:
+    """Serves hip_main.dat from a local file, counting downloads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = 0
+
+    def open(self, url):
+        assert url == hipparcos.URL
+        self.opened += 1
+        return open(self.path, 'rb')
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    text, values = hip_main(np.random.default_rng(0))
+    path = tmp_path / 'hip_main.dat'
+    path.write_text(text)
+    fake = FakeLoader(path)
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(stars, 'loader', lambda: fake)
+    stars.load_stars.cache_clear()
+    stars.star_index.cache_clear()
+    yield fake, values
+    stars.load_stars.cache_clear()
+    stars.star_index.cache_clear()
+
+
+def reference_dataframe(fake: FakeLoader) -> pd.DataFrame:
+    """The catalog as skyfield parses it, which is how graph.py used to read it."""
+    with open(fake.path, 'rb') as f:
+        return hipparcos.load_dataframe(f)
+
+
+def test_cache_is_built_once_and_memory_mapped(catalog, tmp_path):
+    fake, values = catalog
+    cached = stars.load_stars()
+    assert isinstance(cached, np.memmap)
+    assert (tmp_path / 'cache' / 'hipparcos.npy').exists()
+    assert fake.opened == 1
+
+    # A new process reads the file without downloading again
+    stars.load_stars.cache_clear()
+    reloaded = stars.load_stars()
+    assert isinstance(reloaded, np.memmap)
+    assert fake.opened == 1
+    for name in stars.STAR_DTYPE.names:
+        np.testing.assert_array_equal(reloaded[name], cached[name])
+
+
+def test_cache_matches_the_catalog(catalog):
+    fake, values = catalog
+    cached = stars.load_stars()
+
+    # Stars with a position, sorted by magnitude, those with none last
+    expected = values.dropna(subset=['ra', 'dec']).sort_values('magnitude', kind='stable', na_position='last')
+    np.testing.assert_array_equal(cached['hip'], expected['hip'])
+    np.testing.assert_array_equal(cached['ra'], expected['ra'].round(8))
+    np.testing.assert_array_equal(cached['dec'], expected['dec'].round(8))
+    np.testing.assert_array_equal(cached['magnitude'], expected['magnitude'].astype(np.float32))
+    np.testing.assert_array_equal(cached['spectrum'], [s[:1].encode() for s in expected['spectrum']])
+    for name in ('parallax_mas', 'ra_mas_per_year', 'dec_mas_per_year'):
+        np.testing.assert_array_equal(cached[name], expected[name].astype(np.float32))
+
+
+@pytest.mark.parametrize('limit', [-2.0, 0.0, 5.5, 6.0, 12.0, np.inf])
+def test_bright_stars_is_a_magnitude_slice(catalog, limit):
+    cached = stars.load_stars()
+    bright = stars.bright_stars(limit)
+    assert np.shares_memory(bright, cached) or len(bright) == 0
+    np.testing.assert_array_equal(bright, cached[cached['magnitude'] <= limit])
+
+
+def test_stars_dataframe_matches_skyfield(catalog):
+    fake, _ = catalog
+    expected = reference_dataframe(fake).dropna(subset=['ra_degrees', 'dec_degrees'])
+    expected = expected[expected['magnitude'] <= 6.0].sort_values('magnitude', kind='stable')
+    pd.testing.assert_frame_equal(stars.stars_dataframe(6.0), expected[list(stars.stars_dataframe(6.0))],
+                                  check_dtype=False, check_index_type=False, rtol=1e-6)
+
+
+def test_spectral_colors():
+    spectrum = np.array([b'O', b'B', b'A', b'F', b'G', b'K', b'M', b'C', b'W', b''], dtype='S1')
+    expected = ['lightskyblue', 'lightskyblue', 'white', 'ivory', 'yellow', 'orange', 'red', 'white', 'white',
+                'white']
+    np.testing.assert_array_equal(stars.spectral_colors(spectrum), [to_rgba(color) for color in expected])
+
+
+def old_color(spectrum: str) -> str:
+    """The spectral colour chain of the per-star loop."""
+    spec_type = spectrum.strip()[:1]
+    color = 'white'
+    if spec_type == 'O' or spec_type == 'B':
+        color = 'lightskyblue'
+    elif spec_type == 'A':
+        color = 'white'
+    elif spec_type == 'F':
+        color = 'ivory'
+    elif spec_type == 'G':
+        color = 'yellow'
+    elif spec_type == 'K':
+        color = 'orange'
+    elif spec_type == 'M':
+        color = 'red'
+    return color
+
+
+def old_star_layer(df, values, magnitude_limit, plot_min_ra, plot_max_ra, plot_min_dec, plot_max_dec):
+    """The per-star loop graph.py had, returning the markers and labels it would draw.
+
+    skyfield leaves out SpType, so the spectral class comes from the catalog values.  RA is taken into the
+    plot window first, since the old loop did not draw charts across RA 0."""
+    spectra = values.set_index('hip')['spectrum']
+    star_names = {v: k for k, v in named_star_dict.items()}
+    markers, labels = [], []
+    bright_stars = df[df['magnitude'] <= magnitude_limit]
+    for idx, star in bright_stars.iterrows():
+        dec_degrees = star['dec_degrees']
+        magnitude = star['magnitude']
+        ra_degrees = plot_min_ra + (star['ra_hours'] * 15 - plot_min_ra) % 360
+
+        if (plot_min_ra <= ra_degrees <= plot_max_ra and
+                plot_min_dec <= dec_degrees <= plot_max_dec):
+            marker_size = min(7.5, 50 * 10 ** ((-1.44 - magnitude) / 4))
+            markers.append((ra_degrees, dec_degrees, marker_size, to_rgba(old_color(spectra[idx]))))
+            if magnitude < 3.0 and idx in star_names:
+                labels.append((ra_degrees, dec_degrees, f" {star_names[idx]}"))
+    return sorted(markers), sorted(labels)
+
+
+@pytest.mark.parametrize('center_ra, center_dec', [(150.0, 10.0), (1.0, 20.0), (358.0, -5.0)])
+def test_star_layer_matches_the_per_star_loop(catalog, tmp_path, center_ra, center_dec):
+    fake, values = catalog
+    rectangles = [
+        ImageRectangle(x=center_ra, y=center_dec, width=8, height=6, rotation=20, total_exposure_time=600),
+        ImageRectangle(x=center_ra + 5, y=center_dec + 4, width=4, height=4, rotation=0, total_exposure_time=30),
+    ]
+    fig, ax = display_rectangles_and_stars(rectangles, magnitude_limit=6.0, output=tmp_path / 'chart.png')
+
+    plot_max_ra, plot_min_ra = ax.get_xlim()
+    plot_min_dec, plot_max_dec = ax.get_ylim()
+    expected, expected_labels = old_star_layer(reference_dataframe(fake), values, 6.0,
+                                               plot_min_ra, plot_max_ra, plot_min_dec, plot_max_dec)
+    assert len(expected) > 10
+
+    # The single scatter after the footprints
+    scatter = ax.collections[1]
+    offsets = scatter.get_offsets()
+    markers = sorted(zip(offsets[:, 0], offsets[:, 1], np.sqrt(scatter.get_sizes()),
+                         map(tuple, scatter.get_facecolors())))
+    assert len(markers) == len(expected)
+    for (ra, dec, size, color), (old_ra, old_dec, old_size, old_color) in zip(markers, expected):
+        assert ra == pytest.approx(old_ra, abs=1e-9)
+        assert dec == pytest.approx(old_dec, abs=1e-9)
+        assert size == pytest.approx(old_size, rel=1e-6)
+        assert color == old_color
+
+    labels = sorted((text.get_position()[0], text.get_position()[1], text.get_text()) for text in ax.texts)
+    assert [label[2] for label in labels] == [label[2] for label in expected_labels]
+    np.testing.assert_allclose([label[:2] for label in labels], [label[:2] for label in expected_labels], atol=1e-9)
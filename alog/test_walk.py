@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from alog.walk import CONFIG_FILE, ScanConfig, walk_files
+
+FILES = [
+    'a.fit', 'B.FITS', 'c.fts', 'notes.txt', '.hidden.fit',
+    'sub/d.fit', 'sub/lights/e.fit', 'sub/Lights/f.fit', 'sub/.cache/g.fit',
+    'other/h.fit', 'other/deep/i.fit', 'other/deep/j.fits',
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in FILES:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'')
+    return tmp_path
+
+
+def found(dir, config=None) -> list[str]:
+    return [path.relative_to(dir).as_posix() for path in walk_files(dir, config or ScanConfig.load(dir))]
+
+
+def test_defaults(tree):
+    # Sorted by path, without hidden entries or lights directories in any case
+    assert found(tree) == ['B.FITS', 'a.fit', 'c.fts', 'other/deep/i.fit', 'other/deep/j.fits', 'other/h.fit',
+                           'sub/d.fit']
+
+
+def test_config_file(tree):
+    (tree / CONFIG_FILE).write_text('# Only FIT files, not the deep ones\n'
+                                    'include = *.fit\n'
+                                    'exclude = other/deep, c.*\n'
+                                    'typo\n')
+    assert found(tree) == ['a.fit', 'other/h.fit', 'sub/d.fit']
+
+
+def test_path_patterns(tree):
+    # Given directly, the exclusions replace the defaults, so lights are found
+    config = ScanConfig(include=['*.fit', '*.fits'], exclude=['other/*/*.fits', '*/d.fit'])
+    assert found(tree, config) == ['B.FITS', 'a.fit', 'other/deep/i.fit', 'other/h.fit', 'sub/Lights/f.fit',
+                                   'sub/lights/e.fit']
+
+
+def test_excluded_directories_are_not_read(tree, monkeypatch):
+    read = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        read.append(os.path.relpath(path, tree))
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', recording_scandir)
+    found(tree)
+    assert sorted(read) == ['.', 'other', 'other/deep', 'sub']
+
+
+def test_symlinked_directories_are_not_followed(tree):
+    (tree / 'link').symlink_to(tree / 'other', target_is_directory=True)
+    (tree / 'link.fit').symlink_to(tree / 'a.fit')
+    assert 'link/h.fit' not in found(tree)
+    assert 'link.fit' in found(tree)
+
+
+def test_missing_directory(tmp_path):
+    assert found(tmp_path / 'missing', ScanConfig()) == []
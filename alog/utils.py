@@ -1,5 +1,20 @@
 import os
+import sys
 
 
 def is_hidden(path):
     return os.path.basename(os.fspath(path)).startswith(b'.' if isinstance(os.fspath(path), bytes) else '.')
+
+
+def is_headless() -> bool:
+    """Whether there is no display to show charts on."""
+    if sys.platform in ('win32', 'darwin'):
+        return False
+    return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def use_headless_backend():
+    """Render charts with Agg, which needs no display.  Call before creating any figures."""
+    import matplotlib
+
+    matplotlib.use('Agg')
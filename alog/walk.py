@@ -0,0 +1,107 @@
+"""Finding the files to index."""
+import fnmatch
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+from alog.utils import is_hidden
+
+# Configuration file in the manifest directory, see the README
+CONFIG_FILE = 'alog.conf'
+
+DEFAULT_INCLUDE = ('*.fit', '*.fits', '*.fts')
+# Skip lights frames for now!
+DEFAULT_EXCLUDE = ('lights',)
+
+
+def _compile(patterns) -> re.Pattern | None:
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+
+
+class ScanConfig:
+    """Which files to index, as include and exclude glob patterns.
+
+    A file is indexed if its name matches an include pattern and neither it
+    nor any directory above it matches an exclude pattern.  Patterns with a
+    `/` match the path relative to the manifest directory instead of the
+    name, and all matching ignores case.  Hidden files and directories are
+    always skipped."""
+
+    def __init__(self, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self._include_name = _compile([pattern for pattern in self.include if '/' not in pattern])
+        self._include_path = _compile([pattern for pattern in self.include if '/' in pattern])
+        self._exclude_name = _compile([pattern for pattern in self.exclude if '/' not in pattern])
+        self._exclude_path = _compile([pattern for pattern in self.exclude if '/' in pattern])
+
+    @classmethod
+    def load(cls, dir: Path) -> 'ScanConfig':
+        """Read `alog.conf` from a directory, or use the defaults if there is none.
+
+        Each line is `include = PATTERNS` or `exclude = PATTERNS`, with patterns
+        separated by commas or spaces.  Include patterns replace the default
+        FITS extensions, exclude patterns add to the default exclusions."""
+        path = dir / CONFIG_FILE
+        if not path.exists():
+            return cls()
+
+        patterns = {'include': [], 'exclude': []}
+        for number, line in enumerate(path.read_text().splitlines(), 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            key, sep, value = line.partition('=')
+            key = key.strip().lower()
+            if not sep or key not in patterns:
+                print(f"{path}:{number}: ignoring '{line}', expected 'include = ...' or 'exclude = ...'")
+                continue
+            patterns[key] += value.replace(',', ' ').split()
+
+        return cls(patterns['include'] or DEFAULT_INCLUDE, [*DEFAULT_EXCLUDE, *patterns['exclude']])
+
+    @staticmethod
+    def _matches(name_pattern: re.Pattern | None, path_pattern: re.Pattern | None, name: str, relative: str) -> bool:
+        return bool((name_pattern is not None and name_pattern.match(name))
+                    or (path_pattern is not None and path_pattern.match(relative)))
+
+    def excluded(self, name: str, relative: str) -> bool:
+        return is_hidden(name) or self._matches(self._exclude_name, self._exclude_path, name, relative)
+
+    def included(self, name: str, relative: str) -> bool:
+        return (self._matches(self._include_name, self._include_path, name, relative)
+                and not self.excluded(name, relative))
+
+
+def _walk(path: Path, relative: str, config: ScanConfig) -> Iterator[Path]:
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        print(f"Unable to read directory {path}: {e}")
+        return
+
+    for entry in entries:
+        entry_relative = f'{relative}/{entry.name}' if relative else entry.name
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+        if is_dir:
+            if not config.excluded(entry.name, entry_relative):
+                yield from _walk(Path(entry.path), entry_relative, config)
+        elif config.included(entry.name, entry_relative):
+            yield Path(entry.path)
+
+
+def walk_files(dir: Path, config: ScanConfig) -> Iterator[Path]:
+    """Yield the files to index under `dir`, as they are found.
+
+    Excluded directories are pruned without being read.  Entries are visited
+    in name order, depth first, so files come out in sorted path order.
+    Symbolic links to directories are not followed, and directories that
+    cannot be read are reported and skipped."""
+    return _walk(dir, '', config)
@@ -0,0 +1,118 @@
+"""Cost of reading the header keywords of FITS files.
+
+Compares `alog.fitsfile.hash_and_read_header`, which decodes only the cards
+it needs, with the astropy header parsing it replaced, per file and in
+import time, and checks both read the same values.  Without `--directory`
+a directory of synthetic files with Seestar-like headers is generated.
+
+Usage:
+    python benchmarks/fitsheader.py [--directory DIR] [--files N] [--repeat N]"""
+import hashlib
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from alog.fitsfile import CHUNK_SIZE, HEADER_KEYWORDS, _find_end, hash_and_read_header  # noqa: E402
+
+app = typer.Typer()
+
+
+def legacy_hash_and_read_header(pathname: Path) -> tuple[str, dict, int]:
+    """The header reading `hash_and_read_header` replaced: every card parsed by astropy."""
+    from astropy.io import fits
+
+    sha256 = hashlib.sha256()
+    header = bytearray()
+    header_size = None
+    size = 0
+    with open(pathname, 'rb', buffering=0) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            sha256.update(chunk)
+            size += len(chunk)
+            if header_size is None:
+                start = len(header)
+                header += chunk
+                header_size = _find_end(header, start)
+    parsed = fits.Header.fromstring(bytes(header[:header_size]).decode('ascii'))
+    return sha256.hexdigest(), {keyword: parsed[keyword] for keyword in HEADER_KEYWORDS if keyword in parsed}, size
+
+
+def make_files(directory: Path, count: int):
+    """Write small FITS files with about a hundred header cards, like a Seestar's."""
+    import numpy as np
+    from astropy.io import fits
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 65535, (64, 64), dtype=np.uint16)
+    for i in range(count):
+        header = fits.Header()
+        header['EXPTIME'] = 10.0
+        header['INSTRUME'] = 'Seestar S50'
+        header['STACKCNT'] = int(rng.integers(1, 500))
+        header['TOTALEXP'] = header['STACKCNT'] * 10.0
+        header['RA'] = float(rng.uniform(0, 360))
+        header['DEC'] = float(rng.uniform(-30, 90))
+        header['OBJECT'] = f"NGC {i}"
+        header['DATE-OBS'] = '2025-03-01T21:30:00.000'
+        for n in range(90):
+            header[f'KEY{n}'] = (float(rng.normal()), 'filler keyword')
+        fits.PrimaryHDU(data, header=header).writeto(directory / f'frame{i:05d}.fit', overwrite=True)
+
+
+def import_time(module: str) -> float:
+    """Time to import a module in a fresh interpreter, in seconds."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+def best_time(function, files: list[Path], repeat: int) -> float:
+    """Fastest time of a function over all files, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in files:
+            function(path)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@app.command()
+def main(directory: Annotated[str | None, typer.Option(help="Directory of FITS files to read.")] = None,
+         files: Annotated[int, typer.Option(help="Synthetic files to generate without --directory.")] = 2000,
+         repeat: Annotated[int, typer.Option(help="Runs over the files, the fastest counts.")] = 3):
+    """Time reading FITS header keywords against full astropy header parsing."""
+    with tempfile.TemporaryDirectory() as temp:
+        if directory is None:
+            make_files(Path(temp), files)
+            directory = temp
+        paths = sorted(path for path in Path(directory).rglob('*') if path.suffix.lower() in ('.fit', '.fits', '.fts'))
+        if not paths:
+            print(f"No FITS files in {directory}.")
+            raise typer.Exit(1)
+
+        for path in paths:
+            if hash_and_read_header(path) != legacy_hash_and_read_header(path):
+                print(f"Results differ for {path}")
+                raise typer.Exit(1)
+
+        legacy = best_time(legacy_hash_and_read_header, paths, repeat)
+        current = best_time(hash_and_read_header, paths, repeat)
+
+    print(f"{len(paths)} files, same values.")
+    print(f"astropy header  {legacy:8.3f}s  {legacy / len(paths) * 1e6:8.1f}µs per file")
+    print(f"card parser     {current:8.3f}s  {current / len(paths) * 1e6:8.1f}µs per file  ({legacy / current:.1f}x)")
+    print(f"import astropy.io.fits  {import_time('astropy.io.fits'):6.3f}s")
+    print(f"import alog.fitsfile    {import_time('alog.fitsfile'):6.3f}s")
+
+
+if __name__ == '__main__':
+    app()
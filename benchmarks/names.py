@@ -0,0 +1,200 @@
+"""Speed of parsing object identifiers into catalog references and a common name.
+
+Compares `alog.names.parse_names` with the functions it replaced, which ran
+every pattern separately over every name, on Simbad-like identifier lists,
+and checks both give the same results.
+
+Usage:
+    python benchmarks/names.py [--objects N] [--identifiers N] [--repeat N]"""
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from alog.names import extract_catalog_references, extract_common_name, parse_names  # noqa: E402
+
+app = typer.Typer()
+
+# Identifier formats, roughly as Simbad returns them for a galaxy or nebula
+IDENTIFIERS = [
+    'M  {n}', 'NGC  {n}', 'IC {n}', 'UGC {n}', 'PGC {n}', 'LEDA {n}', 'MCG+07-02-{n:03d}', 'Z {n}-17',
+    '2MASX J{n:08d}+4116074', 'IRAS {n:05d}+4059', '[M98c] {n:06d}.1+405943', 'HD {n}', 'HIP {n}', 'SAO {n}',
+    'HR {n}', 'TYC {n}-1-1', 'Gaia DR3 {n}', 'LBN {n}', 'Sh  2-{n}', 'ESO {n}-16', '2MASS J{n:08d}+4116074',
+    'NAME Andromeda Galaxy', 'NAME Orion Nebula', 'Cl Melotte {n}', 'B {n}', '* alf Ori', 'V* V{n} Ori',
+]
+
+
+# The functions parse_names replaced, for comparison
+
+def legacy_extract_common_name(name_list):
+    """Extract the common name of an astronomical object from its identifiers."""
+    # Dictionary of common name patterns with priority (lower number = higher priority)
+    name_patterns = [
+        # Direct named objects like "Orion Nebula", "Andromeda Galaxy", etc.
+        (r'((?:[A-Z][a-z]+\s?)+(?:Nebula|Galaxy|Cluster|Cloud|Star|Pulsar|Quasar|Supernova|Remnant|Void|Group))', 1),
+
+        # "NAME [Object Name]" pattern used in SIMBAD
+        (r'NAME\s+(.*)', 2),
+
+        # Popular asterisms and unofficial names
+        (r'ASTERISM\s+(.*)', 3),
+
+        # Common names like "Sirius", "Betelgeuse", "Polaris", etc.
+        (r'((?:[A-Z][a-z]+){1,2})\s*$', 4),
+
+        # Colloquial names like "Horsehead Nebula", etc.
+        (r'((?:[A-Z][a-z]+\s?)+)', 5)
+    ]
+
+    # List to store potential common names with their priority
+    potential_names = []
+
+    for name in name_list:
+        if name is None:
+            continue
+
+        name = name.strip()
+
+        # Check against each pattern
+        for pattern, priority in name_patterns:
+            match = re.search(pattern, name)
+            if match:
+                common_name = match.group(1).strip()
+
+                # Filter out catalog IDs that might match our patterns
+                # Skip if the name is just a catalog designation
+                if re.match(r'^(M|NGC|IC|HD|HIP|Sh2|B|C|HCG|UGC|Abell|PGC|ESO|LBN|SAO|HR|2MASS)\s*\d+', common_name,
+                            re.IGNORECASE):
+                    continue
+
+                # Skip very short names (likely abbreviations, not common names)
+                if len(common_name) < 3:
+                    continue
+
+                # Skip names that are just numbers
+                if re.match(r'^\d+$', common_name):
+                    continue
+
+                potential_names.append((common_name, priority))
+
+    # Sort by priority and return the best match
+    potential_names.sort(key=lambda x: x[1])
+
+    if potential_names:
+        return potential_names[0][0]
+
+    return None
+
+
+def legacy_extract_catalog_references(name_list):
+    """Extract catalog references from a list of object names."""
+    # Dictionary to store catalog information
+    catalogs = {}
+
+    # Regular expressions for common catalogs
+    catalog_patterns = {
+        'Messier': r'^M\s*(\d+)',  # Matches: M1, M 1, M31, etc.
+        'NGC': r'^NGC\s*(\d+)',  # Matches: NGC1976, NGC 1976, etc.
+        'IC': r'^IC\s*(\d+)',  # Matches: IC434, IC 434, etc.
+        'HD': r'^HD\s*(\d+)',  # Matches: HD1234, HD 1234, etc.
+        'HIP': r'^HIP\s*(\d+)',  # Matches: HIP1234, HIP 1234, etc.
+        'Sh2': r'^Sh\s*2-(\d+)',  # Matches: Sh2-155, Sh 2-155, etc.
+        'Barnard': r'^B\s*(\d+)',  # Matches: B33, B 33, etc. TODO: tighten this up!
+        # 'Caldwell': r'^C\s*(\d+)', # Matches: C14, C 14, etc.
+        'HCG': r'^HCG\s*(\d+)',  # Matches: HCG92, HCG 92, etc.
+        'UGC': r'^UGC\s*(\d+)',  # Matches: UGC12158, UGC 12158, etc.
+        'Abell': r'^Abell\s*(\d+)',  # Matches: Abell2151, Abell 2151, etc.
+        'PGC': r'^PGC\s*(\d+)',  # Matches: PGC3589, PGC 3589, etc.
+        'ESO': r'^ESO\s*(\d+)-(\d+)',  # Matches: ESO123-16, ESO 123-16, etc.
+        'LBN': r'^LBN\s*(\d+)',  # Matches: LBN123, LBN 123, etc.
+        'SAO': r'^SAO\s*(\d+)',  # Matches: SAO123456, SAO 123456, etc.
+        'HR': r'^HR\s*(\d+)',  # Matches: HR1234, HR 1234, etc.
+        '2MASS': r'^2MASS\s*J(\d+)'  # Matches: 2MASS J12345678+1234567
+    }
+
+    # Process each name
+    for name in name_list:
+        # Skip if None
+        if name is None:
+            continue
+
+        name = name.strip()
+
+        # Check against each catalog pattern
+        for catalog, pattern in catalog_patterns.items():
+            matches = re.search(pattern, name, re.IGNORECASE)
+            if matches:
+                if catalog not in catalogs:
+                    catalogs[catalog] = []
+
+                # Determine the catalog ID based on the regex match
+                if catalog == 'ESO':  # Special case for ESO which has two capture groups
+                    catalog_id = f"{matches.group(1)}-{matches.group(2)}"
+                else:
+                    catalog_id = matches.group(1)
+
+                if catalog_id not in catalogs[catalog]:
+                    catalogs[catalog].append(catalog_id)
+
+    # Convert to expected JSON structure
+    result = []
+    for catalog, ids in catalogs.items():
+        for id_value in ids:
+            result.append({
+                "catalog": catalog,
+                "id": id_value,
+                "designation": f"{catalog} {id_value}"
+            })
+
+    return result
+
+
+def identifier_lists(objects: int, identifiers: int) -> list[list[str]]:
+    rng = random.Random(0)
+    return [[rng.choice(IDENTIFIERS).format(n=rng.randrange(1, 100000)) for _ in range(identifiers)]
+            for _ in range(objects)]
+
+
+def best_time(function, lists: list[list[str]], repeat: int) -> float:
+    """Fastest time of a function over all lists, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for names in lists:
+            function(names)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@app.command()
+def main(objects: Annotated[int, typer.Option(help="Identifier lists to parse.")] = 200,
+         identifiers: Annotated[int, typer.Option(help="Identifiers per list.")] = 100,
+         repeat: Annotated[int, typer.Option(help="Runs, the fastest counts.")] = 5):
+    """Time parse_names against the per-pattern functions it replaced."""
+    lists = identifier_lists(objects, identifiers)
+
+    for names in lists:
+        if (parse_names(names) != (legacy_extract_catalog_references(names), legacy_extract_common_name(names))
+                or extract_catalog_references(names) != legacy_extract_catalog_references(names)
+                or extract_common_name(names) != legacy_extract_common_name(names)):
+            print(f"Results differ for {names}")
+            raise typer.Exit(1)
+
+    legacy = best_time(lambda names: (legacy_extract_catalog_references(names), legacy_extract_common_name(names)),
+                       lists, repeat)
+    current = best_time(parse_names, lists, repeat)
+    count = objects * identifiers
+    print(f"{objects} objects of {identifiers} identifiers, same results.")
+    print(f"per pattern  {legacy:8.4f}s  {legacy / count * 1e6:6.2f}µs per identifier")
+    print(f"parse_names  {current:8.4f}s  {current / count * 1e6:6.2f}µs per identifier  ({legacy / current:.1f}x)")
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,91 @@
+"""Startup time of each alog subcommand.
+
+Every subcommand is started cold in a fresh interpreter with `-X importtime`
+and `--help`, so it imports everything its command module imports but does
+no work.  The total import time is checked against a budget, so a heavy
+dependency imported at module level instead of inside the command that uses
+it shows up here.
+
+Usage:
+    python benchmarks/startup.py [--budget SECONDS] [--repeat N]"""
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import typer
+from typing_extensions import Annotated
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Default budget for the imports of one subcommand, in seconds
+BUDGET = 1.0
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+app = typer.Typer()
+
+
+def subcommands() -> list[list[str]]:
+    """Arguments of every subcommand, e.g. ['manifest', 'show']."""
+    import importlib.util
+
+    # alog.py, not the alog package
+    spec = importlib.util.spec_from_file_location('alog_cli', ROOT / 'alog.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    group = typer.main.get_command(module.app)
+    found = []
+    for name, command in sorted(group.commands.items()):
+        if hasattr(command, 'commands'):
+            found += [[name, subname] for subname in sorted(command.commands)]
+        else:
+            found.append([name])
+    return found
+
+
+def measure(args: list[str]) -> tuple[float, list[tuple[float, str]]]:
+    """Import time of a cold start of a subcommand in seconds, and its slowest top level imports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', str(ROOT / 'alog.py'), *args, '--help'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+
+    total = 0
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        total += int(match.group(1))
+        if len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)) / 1e6, match.group(4)))
+    return total / 1e6, sorted(top_level, reverse=True)[:5]
+
+
+@app.command()
+def main(budget: Annotated[float, typer.Option(help="Import time budget per subcommand, in seconds.")] = BUDGET,
+         repeat: Annotated[int, typer.Option(help="Runs per subcommand, the fastest counts.")] = 3):
+    """Check the cold start import time of every subcommand against a budget."""
+    over = []
+    for args in subcommands():
+        runs = [measure(args) for _ in range(repeat)]
+        seconds, slowest = min(runs)
+        name = ' '.join(args)
+        status = 'ok' if seconds <= budget else 'OVER BUDGET'
+        print(f"{name:24} {seconds:6.3f}s  {status}")
+        if seconds > budget:
+            over.append(name)
+            for cumulative, module in slowest:
+                print(f"    {cumulative:6.3f}s  {module}")
+
+    if over:
+        print(f"{len(over)} subcommands over the {budget:.2f}s budget: {', '.join(over)}")
+        raise typer.Exit(1)
+    print(f"All subcommands within the {budget:.2f}s budget.")
+
+
+if __name__ == '__main__':
+    app()
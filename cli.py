@@ -1,217 +1,198 @@
 """CLI commands."""
+import sys
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
-from astroquery.simbad import Simbad
 from typing_extensions import Annotated
 
-from manifest import _extract_catalog_references, _extract_common_name, _display_object_info
+from alog.names import display_object_info
+
+if TYPE_CHECKING:
+    from alog.catalogs import CatalogIndex
+    from alog.resolver_cache import ResolverCache
 
 app = typer.Typer(no_args_is_help=True)
 
+# Seconds `lookup` waits on exit for a stale cache entry to be refreshed
+REFRESH_WAIT = 2.0
+
+
+def open_resolver_cache() -> 'ResolverCache':
+    from alog.resolver_cache import ResolverCache
+    from alog.settings import Settings
+
+    settings = Settings()
+    return ResolverCache(settings.cache_path / 'objects.db', settings.resolver_cache_ttl_days * 86400)
+
+
+def open_catalog_index() -> 'CatalogIndex':
+    from alog.catalogs import CatalogIndex
+    from alog.settings import Settings
+
+    return CatalogIndex.load(Settings().cache_path / 'catalogs.npz')
+
+
+def _refresh(object_name: str):
+    """Look up an object again and replace its stale cache entry.  On failure the stale entry is kept."""
+    from alog.simbad import query_object
+
+    try:
+        object_data = query_object(object_name)
+    except Exception:
+        return
+    if object_data is not None:
+        # A connection of its own, as SQLite connections belong to one thread
+        resolver = open_resolver_cache()
+        resolver.put(object_data, [object_name])
+        resolver.close()
+
 
 @app.command()
-def lookup(object_name: str, 
+def lookup(object_name: str,
            output_json: Annotated[bool, typer.Option(help="Output as JSON instead of formatted text")] = False, # alias of --json?
-           cache: Annotated[bool, typer.Option(help="Cache lookup results in a local SQLite database")] = False):
-    """Look up an astronomical object in Simbad database."""
+           cache: Annotated[bool, typer.Option(help="Use and update the local cache of looked up objects")] = True,
+           catalog: Annotated[bool, typer.Option(help="Answer from the bundled catalogs when they list the object")] = True):
+    """Look up an astronomical object in the bundled catalogs or the Simbad database."""
     import json
     import sqlite3
-    from datetime import datetime
 
-    print(f"Looking up {object_name} in Simbad database...")
+    from alog.simbad import query_object
 
-    # Initialize cache if requested
-    if cache:
-        conn = None
+    resolver = None
+    cached = None
+    refresh = None
+    if catalog:
+        object_data = open_catalog_index().lookup(object_name)
+        if object_data is not None:
+            cached = object_data, False
+    if cache and cached is None:
         try:
-            conn = sqlite3.connect('alog_cache.db')
-            cursor = conn.cursor()
-            # Create cache table if it doesn't exist
-            cursor.execute('''
-                           CREATE TABLE IF NOT EXISTS object_cache
-                           (
-                               object_name
-                               TEXT
-                               PRIMARY
-                               KEY,
-                               data
-                               TEXT,
-                               timestamp
-                               TEXT
-                           )
-                           ''')
-
-            # Check if object is in cache
-            cursor.execute("SELECT data FROM object_cache WHERE object_name = ?", (object_name,))
-            cached_data = cursor.fetchone()
-
-            if cached_data:
-                print("Using cached data...")
-                if output_json:
-                    print(cached_data[0])
-                    return
-                else:
-                    cached_obj = json.loads(cached_data[0])
-                    _display_object_info(cached_obj)
-                    return
-
+            resolver = open_resolver_cache()
+            cached = resolver.get(object_name)
         except sqlite3.Error as e:
             print(f"SQLite error: {e}")
             # Continue with regular lookup if cache fails
-            pass
-
-    # Customize Simbad query to include more fields
-    simbad = Simbad()
-
-    try:
-        # Change the normal query_object to an ADQL query to work around
-        #   "allfluxes" not existing for certain objects.
-        result_table = simbad.query_tap(
-            f"""SELECT basic."main_id", basic."ra", basic."dec", basic."coo_err_maj", 
-                       basic."coo_err_min", basic."coo_err_angle", basic."coo_wavelength", 
-                       basic."coo_bibcode", 
-                       allfluxes."V", 
-                       basic."galdim_minaxis", basic."otype", basic."oid", basic."pmdec", 
-                       basic."galdim_angle", basic."pmra", basic."galdim_majaxis", basic."sp_type", 
-                       basic."plx_value", basic."galdim_minaxis_prec", basic."galdim_wavelength", 
-                       basic."galdim_bibcode", basic."galdim_majaxis_prec", basic."galdim_qual", 
-                       ident."id" AS "matched_id" 
-                  FROM basic 
-                  LEFT JOIN allfluxes ON basic."oid" = allfluxes."oidref" 
-                  JOIN ident ON basic."oid" = ident."oidref" 
-                 WHERE id = '{object_name}'
-              """)
-
-        if result_table is None or len(result_table) == 0:
+            resolver = None
+
+    if cached is not None:
+        object_data, stale = cached
+        if stale:
+            # Answer from the cache now, and update it in the background.  A
+            # daemon thread, so a slow or unreachable Simbad cannot hold up exit.
+            refresh = threading.Thread(target=_refresh, args=(object_name,), daemon=True)
+            refresh.start()
+    else:
+        print(f"Looking up {object_name} in Simbad database...")
+        try:
+            object_data = query_object(object_name)
+        except Exception as e:
+            print(f"Error querying Simbad: {e}")
+            return
+        if object_data is None:
             print(f"No results found for '{object_name}'")
             return
 
-        # Get the main object information
-        obj = result_table[0]
-
-        # Create a structured object with all the data
-        object_data = {"name": obj['main_id'].decode() if isinstance(obj['main_id'], bytes) else obj['main_id'],
-                       "type": obj['otype'].decode() if isinstance(obj['otype'], bytes) else obj['otype'],
-                       "coordinates": {
-                           "ra": float(obj['ra']),
-                           "dec": float(obj['dec']),
-                           "ra_str": str(obj['ra']),
-                           "dec_str": str(obj['dec'])
-                       }, "size": {}}
-
-        # Size information
-        has_size = False
-
-        # Check for dimensions string first
-        if 'dimensions' in obj.colnames and obj['dimensions'] is not None:
-            dim_str = obj['dimensions'].decode() if isinstance(obj['dimensions'], bytes) else obj['dimensions']
-            if dim_str and dim_str.strip():
-                object_data["size"]["dimensions"] = dim_str
-                has_size = True
-
-        # If no dimensions string, check for major/minor axis values
-        if not has_size and 'galdim_majaxis' in obj.colnames and obj['galdim_majaxis'] is not None:
-            major_axis = obj['galdim_majaxis']
-            if major_axis > 0:
-                minor_axis = obj['galdim_minaxis'] if 'galdim_minaxis' in obj.colnames and obj[
-                    'galdim_minaxis'] is not None else major_axis
-                pa = obj['galdim_angle'] if 'galdim_angle' in obj.colnames and obj['galdim_angle'] is not None else 0
-
-                object_data["size"]["major_axis"] = float(major_axis)
-                object_data["size"]["minor_axis"] = float(minor_axis)
-                object_data["size"]["position_angle"] = float(pa)
-
-                # Also add formatted display values
-                if major_axis >= 60:
-                    major_arcmin = major_axis / 60
-                    minor_arcmin = minor_axis / 60
-                    object_data["size"]["formatted"] = f"{major_arcmin:.1f}′ × {minor_arcmin:.1f}′ (PA: {pa}°)"
-                else:
-                    object_data["size"]["formatted"] = f"{major_axis:.1f}″ × {minor_axis:.1f}″ (PA: {pa}°)"
-                has_size = True
-
-        # If no size information was found
-        if not has_size:
-            # For stars and point sources, we typically don't have size
-            if 'otype' in obj.colnames and obj['otype'] is not None:
-                otype = obj['otype'].decode() if isinstance(obj['otype'], bytes) else obj['otype']
-                if 'Star' in otype or '*' in otype:
-                    object_data["size"]["type"] = "point_source"
-                else:
-                    object_data["size"]["type"] = "unknown"
-            else:
-                object_data["size"]["type"] = "unknown"
-
-        # Optional information
-        if obj['plx_value'] is not None and obj['plx_value'] != 0:
-            dist_pc = 1000.0 / obj['plx_value']
-            dist_ly = dist_pc * 3.26156
-            object_data["distance"] = {
-                "parsecs": float(dist_pc),
-                "light_years": float(dist_ly)
-            }
-
-        if obj['sp_type'] is not None:
-            object_data["spectral_type"] = obj['sp_type'].decode() if isinstance(obj['sp_type'], bytes) else obj[
-                'sp_type']
-
-        if obj['V'] is not None:
-            object_data["visual_magnitude"] = float(obj['V'])
-
-        # Proper motion if available
-        if obj['pmra'] is not None and obj['pmdec'] is not None and obj['pmra'] != '--' and obj['pmdec'] != '--':
-            object_data["proper_motion"] = {
-                "ra": float(obj['pmra']),
-                "dec": float(obj['pmdec'])
-            }
-
-        if 'RV_VALUE' in obj.colnames and obj['RV_VALUE'] is not None:
-            object_data["radial_velocity"] = float(obj['RV_VALUE'])
-
-        # Get alternative identifiers
-        other_names = simbad.query_objectids(object_name)
-        alt_names = []
-        if other_names is not None and len(other_names) > 0:
-            alt_names = [
-                name['id'].decode() if isinstance(name['id'], bytes) else name['id']
-                for name in other_names
-            ]
-            object_data["alternative_names"] = alt_names
-
-        # Extract catalog information from main ID and alternative names
-        catalogs = _extract_catalog_references([object_data["name"]] + alt_names)
-        if catalogs:
-            object_data["catalogs"] = catalogs
-
-        # Extract common name from the list of names
-        common_name = _extract_common_name([object_data["name"]] + alt_names)
-        if common_name:
-            object_data["common_name"] = common_name
-
-        # Cache the data if requested
-        if cache and conn:
+        if resolver is not None:
             try:
-                json_data = json.dumps(object_data)
-                timestamp = datetime.now().isoformat()
-                cursor.execute(
-                    "INSERT OR REPLACE INTO object_cache (object_name, data, timestamp) VALUES (?, ?, ?)",
-                    (object_name, json_data, timestamp)
-                )
-                conn.commit()
+                resolver.put(object_data, [object_name])
             except sqlite3.Error as e:
                 print(f"Error caching data: {e}")
 
-        # Output results based on format choice
-        if output_json:
-            print(json.dumps(object_data, indent=2))
-        else:
-            _display_object_info(object_data)
-
-    except Exception as e:
-        print(f"Error querying Simbad: {e}")
-    finally:
-        if cache and conn:
-            conn.close()
+    if resolver is not None:
+        resolver.close()
+
+    # Output results based on format choice
+    if output_json:
+        print(json.dumps(object_data, indent=2))
+    else:
+        display_object_info(object_data)
+
+    if refresh is not None:
+        # Give the refresh a moment to finish; the entry stays stale if it does not
+        refresh.join(REFRESH_WAIT)
+
+
+def _read_names(names_file: str) -> list[str]:
+    """Object names from a file, one per line, skipping blank lines, comments and repeats."""
+    lines = sys.stdin if names_file == '-' else Path(names_file).read_text().splitlines()
+    names = (line.strip() for line in lines)
+    return list(dict.fromkeys(name for name in names if name and not name.startswith('#')))
+
+
+@app.command()
+def lookup_many(names_file: Annotated[str, typer.Argument(help="File with one object name per line, or - for stdin")],
+                output: Annotated[Path | None, typer.Option(help="NDJSON file to write instead of stdout")] = None,
+                tap_url: Annotated[str | None, typer.Option(help="Simbad TAP service, instead of the configured one")] = None,
+                batch_size: Annotated[int, typer.Option(help="Names per Simbad query")] = 100,
+                cache: Annotated[bool, typer.Option(help="Use and update the local cache of looked up objects")] = True,
+                catalog: Annotated[bool, typer.Option(help="Answer from the bundled catalogs when they list the object")] = True):
+    """Look up many astronomical objects in the bundled catalogs or Simbad, in batches.
+
+    Writes a JSON line per name, with the object's data or null if it was not found."""
+    import json
+    import sqlite3
+
+    from rich.console import Console
+
+    from alog.settings import Settings
+    from alog.simbad import query_objects
+
+    console = Console(stderr=True)
+    names = _read_names(names_file)
+
+    resolver = None
+    results = {}
+    stale = set()
+    if catalog:
+        index = open_catalog_index()
+        for name in names:
+            object_data = index.lookup(name)
+            if object_data is not None:
+                results[name] = object_data
+    if cache:
+        try:
+            resolver = open_resolver_cache()
+        except sqlite3.Error as e:
+            console.print(f"SQLite error: {e}")
+    if resolver is not None:
+        for name in names:
+            if name in results:
+                continue
+            cached = resolver.get(name)
+            if cached is not None:
+                results[name] = cached[0]
+                if cached[1]:
+                    stale.add(name)
+
+    missing = [name for name in names if name not in results or name in stale]
+    failed = False
+    if missing:
+        console.print(f"Looking up {len(missing)} of {len(names)} objects in Simbad database...")
+        try:
+            for name, object_data in query_objects(missing, tap_url or Settings().simbad_tap_url, batch_size):
+                if object_data is None:
+                    continue
+                results[name] = object_data
+                if resolver is not None:
+                    resolver.put(object_data, [name])
+        except Exception as e:
+            console.print(f"Error querying Simbad: {e}")
+            failed = True
+
+    if resolver is not None:
+        resolver.close()
+
+    with (open(output, 'w') if output else nullcontext(sys.stdout)) as f:
+        for name in names:
+            f.write(json.dumps({'query': name, 'object': results.get(name)}) + '\n')
+
+    found = sum(name in results for name in names)
+    console.print(f"Found {found} of {len(names)} objects.")
+    if failed:
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
@@ -1,64 +1,68 @@
 """Manifest-related commands."""
-import hashlib
-import itertools
-import re
+import functools
+import os
 import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from random import random
+from typing import TYPE_CHECKING
 
 import humanize
+import numpy as np
 import typer
-from astropy.io import fits
-from erewhon_astro import PlateSolve
 from rich import print
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from typing_extensions import Annotated
 
-from alog.graph import display_rectangles_and_stars
-from alog.graphplot import plot_graph
-from alog.models import Manifest, ImageRectangle, FileDescription
-from alog.settings import Settings
-from alog.utils import is_hidden
+from alog.columns import load_columns
+from alog.journal import ManifestStore
+from alog.utils import is_headless, use_headless_backend
+
+# Plate solving, FITS and plotting are slow to import, so commands import
+# them when they need them rather than every command paying for them.
+if TYPE_CHECKING:
+    from erewhon_astro import PlateSolve
+
+    from alog.catalogs import CatalogIndex
+    from alog.models import Manifest, ImageRectangle, FileDescription
+    from alog.settings import Settings
+    from alog.solve_cache import SolveCache
 
 app = typer.Typer(no_args_is_help=True)
 
+# Chart written into a manifest directory when there is no display
+GRAPH = 'graph.png'
 
-def get_file_description(dir: Path, pathname: Path) -> FileDescription:
-    msg = ''
-    start = time.perf_counter()
-    with open(pathname, 'rb') as f:
-        # Calculate the SHA256 hash of the file
-        sha256_hash = hashlib.sha256(f.read()).hexdigest()
-    elapsed = time.perf_counter() - start
-    msg += f' Hash elapsed: {elapsed:.2f}s. '
-    start = time.perf_counter()
-    with fits.open(pathname) as hdul:
-        exposure_time = hdul[0].header.get('EXPTIME', 0)
-        instrument = hdul[0].header.get('INSTRUME', '')
-        stackcnt = hdul[0].header.get('STACKCNT', 0)
-        ra = hdul[0].header.get('RA', 0)
-        dec = hdul[0].header.get('DEC', 0)
-        # gain = hdul[0].header.get('GAIN', 0)
-        # target = hdul[0].header.get('OBJECT', '')
-        total_exposure_time = hdul[0].header.get('TOTALEXP', 0)
-        axis1 = hdul[0].header.get('NAXIS1', 0)
-        axis2 = hdul[0].header.get('NAXIS2', 0)
-
-        if total_exposure_time == 0:
-            total_exposure_time = exposure_time * stackcnt
-
-        # print(hdul[0].header)
-    elapsed = time.perf_counter() - start
-    msg += f'FITS header read: {elapsed:.2f}s. '
 
+def scan_file(dir: Path, pathname: Path) -> 'FileDescription':
+    """Describe a file from its stat and FITS header, without plate solving it."""
+    from alog.fitsfile import hash_and_read_header
+    from alog.models import FileDescription
+
+    msg = ''
+    # Stat before reading, so a file modified while being read looks changed next time
+    st = pathname.stat()
     start = time.perf_counter()
-    settings = Settings()
-    solver = PlateSolve()
-    solution = solver.solve(pathname, local_solve=settings.local_solve, index_dir=settings.astrometry_index_dir)
+    # Hash the file and read the header from the same pass over the file
+    sha256_hash, header, size = hash_and_read_header(pathname)
     elapsed = time.perf_counter() - start
-    msg += f'Plate solver: {elapsed:.2f}s. '
+    msg += f' Hash and FITS header read: {elapsed:.2f}s ({size / 1_000_000 / max(elapsed, 1e-9):.1f} MB/s). '
     print(msg)
 
+    exposure_time = header.get('EXPTIME', 0)
+    instrument = header.get('INSTRUME', '')
+    stackcnt = header.get('STACKCNT', 0)
+    ra = header.get('RA', 0)
+    dec = header.get('DEC', 0)
+    # gain = header.get('GAIN', 0)
+    # target = header.get('OBJECT', '')
+    total_exposure_time = header.get('TOTALEXP', 0)
+    axis1 = header.get('NAXIS1', 0)
+    axis2 = header.get('NAXIS2', 0)
+
+    if total_exposure_time == 0:
+        total_exposure_time = exposure_time * stackcnt
+
     # We only store the relative pathname (for now)
     return FileDescription(pathname=str(pathname.relative_to(dir)),
                            hash=sha256_hash,
@@ -70,324 +74,393 @@ def get_file_description(dir: Path, pathname: Path) -> FileDescription:
                            exposure_time=exposure_time,
                            axis1=axis1,
                            axis2=axis2,
-                           solution=solution)
+                           size=st.st_size,
+                           mtime=st.st_mtime,
+                           inode=st.st_ino)
 
 
-def read_manifest(directory: str) -> Manifest | None:
-    with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True,
-            refresh_per_second=20
-    ) as progress:
-        progress.add_task(description="Reading manifest..", total=None)
-        dir = Path(directory)
-        manifest_file = dir / "manifest.json"
-        if not manifest_file.exists():
-            print("[bold red]Manifest not found.[/bold red]")
-            return None
+def open_solve_cache() -> 'SolveCache':
+    from alog.settings import Settings
+    from alog.solve_cache import SolveCache
 
-        manifest_content = manifest_file.read_text()
-        progress.add_task(description="Parsing manifest..", total=None)
-        response = Manifest.model_validate_json(manifest_content)
+    settings = Settings()
+    return SolveCache(settings.cache_path / 'solutions.db', settings.solve_cache_max_mb * 1_000_000)
 
-        print("Done!")
 
-        return response
+def open_catalog_index() -> 'CatalogIndex':
+    from alog.catalogs import CatalogIndex
+    from alog.settings import Settings
 
+    return CatalogIndex.load(Settings().cache_path / 'catalogs.npz')
 
 
-def _extract_common_name(name_list):
-    """Extract the common name of an astronomical object from its identifiers."""
-    # Dictionary of common name patterns with priority (lower number = higher priority)
-    name_patterns = [
-        # Direct named objects like "Orion Nebula", "Andromeda Galaxy", etc.
-        (r'((?:[A-Z][a-z]+\s?)+(?:Nebula|Galaxy|Cluster|Cloud|Star|Pulsar|Quasar|Supernova|Remnant|Void|Group))', 1),
+@functools.cache
+def _solve_cache() -> 'SolveCache':
+    # One connection per process; worker processes open their own.
+    return open_solve_cache()
 
-        # "NAME [Object Name]" pattern used in SIMBAD
-        (r'NAME\s+(.*)', 2),
 
-        # Popular asterisms and unofficial names
-        (r'ASTERISM\s+(.*)', 3),
+@functools.cache
+def _solver() -> 'tuple[Settings, PlateSolve]':
+    # Made once per process, so .env is not re-read for every file; worker
+    # processes make their own.
+    from erewhon_astro import PlateSolve
 
-        # Common names like "Sirius", "Betelgeuse", "Polaris", etc.
-        (r'((?:[A-Z][a-z]+){1,2})\s*$', 4),
+    from alog.settings import Settings
 
-        # Colloquial names like "Horsehead Nebula", etc.
-        (r'((?:[A-Z][a-z]+\s?)+)', 5)
-    ]
+    return Settings(), PlateSolve()
 
-    # List to store potential common names with their priority
-    potential_names = []
 
-    for name in name_list:
-        if name is None:
-            continue
+def _solver_worker():
+    """Set up a worker process for plate solving before its first job."""
+    _solver()
+    _solve_cache()
 
-        name = name.strip()
-
-        # Check against each pattern
-        for pattern, priority in name_patterns:
-            match = re.search(pattern, name)
-            if match:
-                common_name = match.group(1).strip()
-
-                # Filter out catalog IDs that might match our patterns
-                # Skip if the name is just a catalog designation
-                if re.match(r'^(M|NGC|IC|HD|HIP|Sh2|B|C|HCG|UGC|Abell|PGC|ESO|LBN|SAO|HR|2MASS)\s*\d+', common_name,
-                            re.IGNORECASE):
-                    continue
-
-                # Skip very short names (likely abbreviations, not common names)
-                if len(common_name) < 3:
-                    continue
-
-                # Skip names that are just numbers
-                if re.match(r'^\d+$', common_name):
-                    continue
-
-                potential_names.append((common_name, priority))
-
-    # Sort by priority and return the best match
-    potential_names.sort(key=lambda x: x[1])
-
-    if potential_names:
-        return potential_names[0][0]
-
-    return None
-
-
-def _extract_catalog_references(name_list):
-    """Extract catalog references from a list of object names."""
-    # Dictionary to store catalog information
-    catalogs = {}
-
-    # Regular expressions for common catalogs
-    catalog_patterns = {
-        'Messier': r'^M\s*(\d+)',  # Matches: M1, M 1, M31, etc.
-        'NGC': r'^NGC\s*(\d+)',  # Matches: NGC1976, NGC 1976, etc.
-        'IC': r'^IC\s*(\d+)',  # Matches: IC434, IC 434, etc.
-        'HD': r'^HD\s*(\d+)',  # Matches: HD1234, HD 1234, etc.
-        'HIP': r'^HIP\s*(\d+)',  # Matches: HIP1234, HIP 1234, etc.
-        'Sh2': r'^Sh\s*2-(\d+)',  # Matches: Sh2-155, Sh 2-155, etc.
-        'Barnard': r'^B\s*(\d+)',  # Matches: B33, B 33, etc. TODO: tighten this up!
-        # 'Caldwell': r'^C\s*(\d+)', # Matches: C14, C 14, etc.
-        'HCG': r'^HCG\s*(\d+)',  # Matches: HCG92, HCG 92, etc.
-        'UGC': r'^UGC\s*(\d+)',  # Matches: UGC12158, UGC 12158, etc.
-        'Abell': r'^Abell\s*(\d+)',  # Matches: Abell2151, Abell 2151, etc.
-        'PGC': r'^PGC\s*(\d+)',  # Matches: PGC3589, PGC 3589, etc.
-        'ESO': r'^ESO\s*(\d+)-(\d+)',  # Matches: ESO123-16, ESO 123-16, etc.
-        'LBN': r'^LBN\s*(\d+)',  # Matches: LBN123, LBN 123, etc.
-        'SAO': r'^SAO\s*(\d+)',  # Matches: SAO123456, SAO 123456, etc.
-        'HR': r'^HR\s*(\d+)',  # Matches: HR1234, HR 1234, etc.
-        '2MASS': r'^2MASS\s*J(\d+)'  # Matches: 2MASS J12345678+1234567
-    }
-
-    # Process each name
-    for name in name_list:
-        # Skip if None
-        if name is None:
-            continue
 
-        name = name.strip()
-
-        # Check against each catalog pattern
-        for catalog, pattern in catalog_patterns.items():
-            matches = re.search(pattern, name, re.IGNORECASE)
-            if matches:
-                if catalog not in catalogs:
-                    catalogs[catalog] = []
-
-                # Determine the catalog ID based on the regex match
-                if catalog == 'ESO':  # Special case for ESO which has two capture groups
-                    catalog_id = f"{matches.group(1)}-{matches.group(2)}"
-                else:
-                    catalog_id = matches.group(1)
-
-                if catalog_id not in catalogs[catalog]:
-                    catalogs[catalog].append(catalog_id)
-
-    # Convert to expected JSON structure
-    result = []
-    for catalog, ids in catalogs.items():
-        for id_value in ids:
-            result.append({
-                "catalog": catalog,
-                "id": id_value,
-                "designation": f"{catalog} {id_value}"
-            })
-
-    return result
-
-
-def _display_object_info(obj):
-    """Helper function to display object information in a formatted way."""
-    # For debugging
-    # pprint(obj)
-
-    print(f"\nObject: {obj['name']}")
-
-    # Display common name if available
-    if "common_name" in obj:
-        print(f"Common Name: {obj['common_name']}")
-
-    print(f"Type: {obj['type']}")
-
-    # Coordinates
-    ra_deg = obj['coordinates']['ra']
-    dec_deg = obj['coordinates']['dec']
-    print(f"RA: {ra_deg:.6f}° ({obj['coordinates']['ra_str']})")
-    print(f"DEC: {dec_deg:.6f}° ({obj['coordinates']['dec_str']})")
-
-    # Size information
-    if "size" in obj:
-        size = obj["size"]
-        if "dimensions" in size:
-            print(f"Size: {size['dimensions']}")
-        elif "formatted" in size:
-            print(f"Size: {size['formatted']}")
-        elif "type" in size:
-            if size["type"] == "point_source":
-                print("Size: Point source")
-            else:
-                print("Size: No size information available")
-
-    # Catalog information
-    if "catalogs" in obj and obj["catalogs"]:
-        print("\nCatalog Designations:")
-        catalogs_by_name = {}
-
-        # Group by catalog name
-        for cat_entry in obj["catalogs"]:
-            catalog = cat_entry["catalog"]
-            if catalog not in catalogs_by_name:
-                catalogs_by_name[catalog] = []
-            catalogs_by_name[catalog].append(cat_entry["id"])
-
-        # Display in a nice format
-        for catalog, ids in sorted(catalogs_by_name.items()):
-            id_str = ", ".join(ids)
-            print(f"  • {catalog}: {id_str}")
-
-    # Distance
-    if "distance" in obj:
-        print(
-            f"Distance: {obj['distance']['parsecs']:.2f} parsecs ({obj['distance']['light_years']:.2f} light years)")
+def _warm_index_files():
+    """Start reading the local plate solver's index files into the page cache."""
+    from alog.settings import Settings
+
+    settings = Settings()
+    if not (settings.local_solve and settings.astrometry_index_dir and settings.astrometry_warm_index):
+        return
+
+    from alog.astrometry import warm_index_files
 
-    # Spectral type
-    if "spectral_type" in obj:
-        print(f"Spectral Type: {obj['spectral_type']}")
+    size = warm_index_files(Path(settings.astrometry_index_dir))
+    if size:
+        print(f"Reading {humanize.naturalsize(size)} of index files into the page cache.")
 
-    # Visual magnitude
-    if "visual_magnitude" in obj:
-        print(f"Visual Magnitude: {obj['visual_magnitude']:.2f}")
 
-    # Proper motion
-    if "proper_motion" in obj:
+def solve_file(dir: Path, desc: 'FileDescription') -> 'FileDescription':
+    """Plate solve a described file, unless it already has a solution.
+
+    Solutions are looked up in and added to the shared solve cache."""
+    if desc.solution is not None:
+        return desc
+
+    cache = _solve_cache()
+    desc.solution = cache.get(desc.hash)
+    if desc.solution is not None:
+        print(' Plate solver: cached solution. ')
+        return desc
+
+    start = time.perf_counter()
+    settings, solver = _solver()
+    desc.solution = solver.solve(dir / desc.pathname, local_solve=settings.local_solve,
+                                 index_dir=settings.astrometry_index_dir)
+    elapsed = time.perf_counter() - start
+    print(f' Plate solver: {elapsed:.2f}s. ')
+    if desc.solution is not None:
+        cache.put(desc.hash, desc.solution)
+    return desc
+
+
+def _attempt(func, dir: Path, item):
+    """Run `func(dir, item)`, capturing any failure instead of raising.
+
+    Runs in a worker process when updating with more than one job, so the
+    exception is returned as text rather than propagated through the pool.
+    Returns the item, the result, the error and the elapsed time."""
+    start = time.perf_counter()
+    try:
+        result = func(dir, item)
+    except Exception as e:
+        return item, None, str(e), time.perf_counter() - start
+    return item, result, None, time.perf_counter() - start
+
+
+def _map_ordered(executor: ProcessPoolExecutor | None, func, dir: Path, items, window: int):
+    """Apply `func(dir, item)` to each item, yielding `_attempt` results in the order of `items`.
+
+    Without an executor the work is done in this process.  Otherwise only a
+    bounded window of items is in flight at once, so `items` may be a lazy
+    iterable and results are consumed as soon as they are ready."""
+    if executor is None:
+        for item in items:
+            yield _attempt(func, dir, item)
+        return
+
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(_attempt, func, dir, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def read_columns(directory: str) -> dict[str, np.ndarray] | None:
+    """Load the columnar cache of the manifest, see `alog.columns`."""
+    store = ManifestStore(Path(directory))
+    if not store.exists():
+        print("[bold red]Manifest not found.[/bold red]")
+        return None
+    return load_columns(store)
+
+
+def solved_rectangles(columns: dict[str, np.ndarray]) -> 'list[ImageRectangle]':
+    """Footprints of the solved files, from the manifest columns."""
+    from alog.models import ImageRectangle
+
+    # Files that have not been plate solved yet are left out
+    solved = ~np.isnan(columns['ra'])
+    return [
+        ImageRectangle(x=x, y=y, width=width, height=height, rotation=rotation, total_exposure_time=total_exposure_time)
+        for x, y, width, height, rotation, total_exposure_time in zip(
+            *(columns[name][solved].tolist() for name in
+              ('ra', 'dec', 'width', 'height', 'orientation', 'total_exposure_time')))]
+
+
+def read_rectangles(directory: str) -> 'list[ImageRectangle] | None':
+    """Read the footprints of the solved files in the manifest, or None if there are none."""
+    columns = read_columns(directory)
+    if columns is None:
+        return None
+
+    rectangles = solved_rectangles(columns)
+    if not rectangles:
+        print("[bold red]No plate solved files in the manifest.[/bold red]")
+        return None
+
+    print(f"Showing a graph of the manifest.  {len(columns['ra'])} files in total.")
+    return rectangles
+
+
+def _checkpoint(store: ManifestStore, manifest: 'Manifest', count: int):
+    # Save manifest every 10 files...
+    if count % 10 == 0:
+        start = time.perf_counter()
+        store.checkpoint(manifest)
+        elapsed = time.perf_counter() - start
         print(
-            f"Proper Motion: RA {obj['proper_motion']['ra']:.2f} mas/yr, DEC {obj['proper_motion']['dec']:.2f} mas/yr")
+            f"Processed {count} files.  Checkpointing manifest. {len(manifest.files)} files in total. ({elapsed:.2f}s)")
 
-    # Radial velocity
-    if "radial_velocity" in obj:
-        print(f"Radial Velocity: {obj['radial_velocity']:.2f} km/s")
 
-    # Alternative names
-    if "alternative_names" in obj and len(obj["alternative_names"]) > 1:
-        print("\nAlternative designations:")
-        # Show up to 5 alternative names
-        for i, name in enumerate(obj["alternative_names"][:5]):
-            print(f"  • {name}")
-        if len(obj["alternative_names"]) > 5:
-            print(f"  ... and {len(obj['alternative_names']) - 5} more identifiers")
+def _index_files(dir: Path, store: ManifestStore, manifest: 'Manifest', executor: ProcessPoolExecutor | None, window: int) -> int:
+    """Add new and changed files to the manifest from their FITS headers, without plate solving.
 
+    Files with the same content as an entry that is already solved take its
+    solution (or its failure to solve); the rest are left with no solution
+    for `_solve_queue`.  An entry whose file is gone is re-pointed to a file
+    with the same content.  Returns the number of files added or updated."""
+    from alog.walk import ScanConfig, walk_files
 
-@app.command()
-def update(directory: Annotated[str, typer.Option(default=".", help="The directory to operate in.")]):
-    """Create or update the manifest."""
-    print(f"Updating the manifest in directory {directory}")
-    dir = Path(directory)
     count = 0
-    manifest_file = dir / "manifest.json"
-    # todo : exclude hidden files, add "fits" extension
-    if manifest_file.exists():
-        manifest_content = manifest_file.read_text()
-        manifest = Manifest.model_validate_json(manifest_content)
-    else:
-        manifest = Manifest(files=[])
-
-    def save_manifest():
-        manifest_file.write_text(manifest.model_dump_json(indent=2))
-
-    files = list(dir.rglob("*.fit"))
-    random.shuffle(files)
-    for file in files:
-        if is_hidden(file):
-            continue
+    config = ScanConfig.load(dir)
+
+    def pending_files():
+        # Found lazily, so work starts before the walk is done.  The walk is
+        # in sorted order, so results are added to the manifest in a fixed order.
+        for file in walk_files(dir, config):
+            relative_path = file.relative_to(dir)
+            existing = manifest.find(str(relative_path))
+
+            if existing is None:
+                print(f"Adding '{relative_path}' to manifest.")
+            elif existing.matches_stat(file.stat()):
+                # print(f"Skipping '{relative_path}' - already in manifest.")
+                continue
+            else:
+                print(f"Checking '{relative_path}' - changed since it was added.")
+            yield file
 
-        if "/lights/" in str(file):
-            # Skip lights frames for now!
+    for file, desc, error, elapsed in _map_ordered(executor, scan_file, dir, pending_files(), window):
+        if error is not None:
+            print(f' Exception while processing {file.relative_to(dir)}: {error}')
             continue
 
-        relative_path = file.relative_to(dir)
+        same_content = manifest.find_by_hash(desc.hash)
+        # Files with the same content as an existing entry are not solved again
+        solved = next((other for other in same_content if other.solution is not None), None)
+        if solved is not None:
+            desc.solution = solved.solution
+        else:
+            desc.solve_failed = any(other.solve_failed for other in same_content)
+
+        # An entry whose file is gone was moved here, solved or not
+        replaces = None
+        moved = next((other for other in same_content
+                      if other.pathname != desc.pathname and not (dir / other.pathname).exists()), None)
+        if moved is not None:
+            print(f" '{moved.pathname}' was moved to '{desc.pathname}'.")
+            replaces = moved.pathname
+
+        manifest.add(desc, replaces=replaces)
+        count += 1
+        _checkpoint(store, manifest, count)
+
+    return count
 
-        if any([desc for desc in manifest.files if desc.pathname == str(relative_path)]):
-            # print(f"Skipping '{relative_path}' - already in manifest.")
-            continue
 
-        print(f"Adding '{relative_path}' to manifest.")
-        try:
-            start = time.perf_counter()
-            desc = get_file_description(dir, file)
-            elapsed = time.perf_counter() - start
-            print(f' Elapsed time: {elapsed:.2f}s plate solving {relative_path}')
-        except Exception as e:
-            print(f' Exception while processing {relative_path}: {e}')
+def _solve_priority(desc: 'FileDescription'):
+    # Stacked frames first, then the longest exposures
+    return desc.stackcnt <= 0, -desc.total_exposure_time, desc.pathname
+
+
+def _solve_queue(dir: Path, store: ManifestStore, manifest: 'Manifest', executor: ProcessPoolExecutor | None,
+                 window: int, retry_failed: bool = False) -> int:
+    """Plate solve every manifest entry that has no solution yet.
+
+    The queue is rebuilt from the manifest each time, so an interrupted run
+    picks up where the last checkpoint left off.  Entries the solver found
+    no solution for are marked and skipped by later runs, unless
+    `retry_failed`.  Returns the number of files solved."""
+    unsolved = [desc for desc in manifest.files if desc.solution is None]
+    queue = sorted((desc for desc in unsolved if retry_failed or not desc.solve_failed), key=_solve_priority)
+    if len(queue) < len(unsolved):
+        print(f"Skipping {humanize.intcomma(len(unsolved) - len(queue))} files that could not be plate solved before"
+              f" (use --retry-failed to try them again).")
+    if not queue:
+        return 0
+    print(f"Plate solving {humanize.intcomma(len(queue))} files.")
+    _warm_index_files()
+
+    cache = open_solve_cache()
+    cache_before = cache.stats()
+    count = 0
+    processed = 0
+
+    for desc, result, error, elapsed in _map_ordered(executor, solve_file, dir, queue, window):
+        if error is not None:
+            # Left unmarked, as the error may be temporary (e.g. no network)
+            print(f' Exception while plate solving {desc.pathname}: {error}')
             continue
+        print(f' Elapsed time: {elapsed:.2f}s plate solving {desc.pathname}')
 
-        manifest.files.append(desc)
-        count += 1
+        result.solve_failed = result.solution is None
+        if result.solve_failed:
+            print(f' No solution found for {desc.pathname}.')
+        else:
+            count += 1
+        manifest.add(result)
+        processed += 1
+        _checkpoint(store, manifest, processed)
+
+    cache_after = cache.stats()
+    hits = cache_after['hits'] - cache_before['hits']
+    misses = cache_after['misses'] - cache_before['misses']
+    if hits + misses:
+        print(f"Plate solve cache: {hits} hits, {misses} misses ({hits / (hits + misses):.0%} hit rate).")
+    cache.close()
+
+    return count
+
+
+def _executor(jobs: int, initializer=None, initargs=()) -> ProcessPoolExecutor | nullcontext:
+    # A single job runs in this process
+    if jobs <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return nullcontext()
+    return ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=initargs)
+
+
+@app.command()
+def update(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+           jobs: Annotated[int, typer.Option("--jobs", "-j", help="Number of worker processes (0 for one per CPU).")] = 1,
+           solve: Annotated[bool, typer.Option(help="Plate solve files after indexing them.")] = True,
+           retry_failed: Annotated[bool, typer.Option(help="Plate solve files that could not be solved before.")] = False):
+    """Create or update the manifest.
+
+    Files are first indexed from their FITS headers, so the manifest is
+    usable straight away, then plate solved."""
+    print(f"Updating the manifest in directory {directory}")
+    dir = Path(directory)
+    store = ManifestStore(dir)
+    manifest = store.load()
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    with _executor(jobs, initializer=_solver_worker if solve else None) as executor:
+        window = jobs * 2
+        count = _index_files(dir, store, manifest, executor, window)
+        print(f"Found {count} FITS files.")
+        store.checkpoint(manifest)
 
-        # Save manifest every 20 files...
-        if count % 10 == 0:
-            start = time.perf_counter()
-            save_manifest()
-            elapsed = time.perf_counter() - start
-            print(
-                f"Processed {count} files.  Checkpointing manifest. {len(manifest.files)} files in total. ({elapsed:.2f}s)")
+        if solve:
+            count = _solve_queue(dir, store, manifest, executor, window, retry_failed)
+            print(f"Plate solved {count} files.")
+            store.checkpoint(manifest)
 
-    print(f"Found {count} FITS files.")
 
-    save_manifest()
+@app.command()
+def solve(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+          jobs: Annotated[int, typer.Option("--jobs", "-j", help="Number of worker processes (0 for one per CPU).")] = 1,
+          retry_failed: Annotated[bool, typer.Option(help="Plate solve files that could not be solved before.")] = False):
+    """Plate solve manifest entries that do not have a solution yet."""
+    dir = Path(directory)
+    store = ManifestStore(dir)
+    if not store.exists():
+        print("[bold red]Manifest not found.[/bold red]")
+        return
+    manifest = store.load()
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    with _executor(jobs, initializer=_solver_worker) as executor:
+        window = jobs * 2
+        count = _solve_queue(dir, store, manifest, executor, window, retry_failed)
+        print(f"Plate solved {count} files.")
+        store.checkpoint(manifest)
 
 
 @app.command()
 def show(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = "."):
     """Show the manifest."""
     # print("Reading the manifest.")
-    manifest = read_manifest(directory)
-    if not manifest:
+    columns = read_columns(directory)
+    if columns is None:
         return
 
-    total_exposure_time = sum([desc.total_exposure_time for desc in manifest.files])
+    exposure = columns['total_exposure_time']
+    total_exposure_time = exposure.sum()
 
-    print(f"  Contains {humanize.intcomma(len(manifest.files))} files.")
+    print(f"  Contains {humanize.intcomma(len(exposure))} files.")
     print(
         f"  Total exposure time: {humanize.precisedelta(total_exposure_time, minimum_unit='seconds')} ({total_exposure_time:.2f} seconds)")
 
-    keyfunc = lambda desc: desc.instrument
-    files = sorted(manifest.files, key=keyfunc)
-    for instrument, group in itertools.groupby(files, keyfunc):
-        group = list(group)
-        total_exposure_time = sum([desc.total_exposure_time for desc in group])
-        total_pixel_time = sum([desc.total_exposure_time * desc.axis1 * desc.axis2 for desc in group])
-        mpel_hours = total_pixel_time / 3600 / 1_000_000
-        print(f"  Instrument: [bold]{instrument}[/bold]")
-        print(f"    Contains {humanize.intcomma(len(group))} files.")
+    instruments = columns['instruments']
+    counts = np.bincount(columns['instrument'], minlength=len(instruments))
+    exposures = np.bincount(columns['instrument'], weights=exposure, minlength=len(instruments))
+    pixel_times = np.bincount(columns['instrument'], weights=exposure * columns['axis1'] * columns['axis2'],
+                              minlength=len(instruments))
+    for code in np.argsort(instruments):
+        total_exposure_time = exposures[code]
+        mpel_hours = pixel_times[code] / 3600 / 1_000_000
+        print(f"  Instrument: [bold]{instruments[code]}[/bold]")
+        print(f"    Contains {humanize.intcomma(counts[code])} files.")
         print(
             f"    Total exposure time: {humanize.precisedelta(total_exposure_time, minimum_unit='seconds')} ({total_exposure_time:.2f} seconds)")
         print(f"    Megapixel hours: {mpel_hours:.2f}")
 
 
+@app.command()
+def compact(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = "."):
+    """Fold the manifest journal into a new manifest.json."""
+    store = ManifestStore(Path(directory))
+    if not store.exists():
+        print("[bold red]Manifest not found.[/bold red]")
+        return
+    manifest = store.load()
+    records = store.journal_records
+    store.compact(manifest)
+    print(f"Compacted {records} journal records.  {humanize.intcomma(len(manifest.files))} files in total.")
+
+
+@app.command()
+def solve_cache():
+    """Show statistics for the shared plate solve cache."""
+    cache = open_solve_cache()
+    stats = cache.stats()
+    cache.close()
+
+    print(f"Plate solve cache: {cache.path}")
+    print(f"  Contains {humanize.intcomma(stats['entries'])} solutions ({humanize.naturalsize(stats['size'])}).")
+    print(f"  Lookups: {humanize.intcomma(stats['hits'])} hits, {humanize.intcomma(stats['misses'])} misses "
+          f"({stats['hit_rate']:.0%} hit rate).")
+
+
 @app.command()
 def summary():
     """Show a summary of the manifest."""
@@ -401,59 +474,186 @@ def validate():
 
 
 @app.command()
-def graph(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = "."):
+def graph(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+          output: Annotated[str | None, typer.Option(help="Save the chart to this file instead of showing it.")] = None):
     """Show a graph of the manifest."""
-    manifest = read_manifest(directory)
-    if not manifest:
+    rectangles = read_rectangles(directory)
+    if rectangles is None:
         return
 
-    print(f"Showing a graph of the manifest.  {len(manifest.files)} files in total.")
-    rectangles = [
-        ImageRectangle(x=file.solution.calibration.ra, y=file.solution.calibration.dec,
-                       width=file.solution.calibration.width_arcsec / 3600.0,
-                       height=file.solution.calibration.height_arcsec / 3600.0,
-                       rotation=file.solution.calibration.orientation, total_exposure_time=file.total_exposure_time) for
-        file in manifest.files]
+    from alog.graph import display_rectangles_and_stars
+
+    if output is None and is_headless():
+        output = str(Path(directory) / GRAPH)
+        print(f"No display, saving the chart to {output}")
+    if output is not None:
+        use_headless_backend()
+
+    display_rectangles_and_stars(rectangles, output=Path(output) if output is not None else None)
+
+
+def _render_worker(magnitude_limit: float):
+    """Set up a process to render charts, loading the star data once for all of them."""
+    from alog.graph import preload
+
+    use_headless_backend()
+    preload(magnitude_limit)
 
-    display_rectangles_and_stars(rectangles)
 
-    # plt.show()
+def _render_chart(name: Path, directory: str) -> Path | None:
+    """Render the chart of the manifest in `directory` to `name` within it."""
+    from alog.graph import display_rectangles_and_stars
 
-    # rectangles = [{
-    #     "x": file.solution.calibration.ra,
-    #     "y": file.solution.calibration.dec,
-    #     "width": file.solution.calibration.width_arcsec / 3600.0,
-    #     "height": file.solution.calibration.height_arcsec / 3600.0,
-    #     "rotation": file.solution.calibration.orientation,
-    #     "total_exposure_time": file.total_exposure_time,
-    # } for file in manifest.files]
-    #
-    # display_rectangles(rectangles)
-    # plt.show()
+    store = ManifestStore(Path(directory))
+    if not store.exists():
+        raise FileNotFoundError("Manifest not found")
+    rectangles = solved_rectangles(load_columns(store))
+    if not rectangles:
+        return None
 
-    # location = 'Houston, Texas'
-    # when = '2025-04-04 21:00'
-    # fig, ax = build_star_chart(location, when)
+    output = Path(directory) / name
+    display_rectangles_and_stars(rectangles, output=output)
+    return output
 
 
 @app.command()
-def graph2(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = "."):
+def render(directories: Annotated[list[str], typer.Argument(help="Directories with a manifest.")],
+           output: Annotated[str, typer.Option(help="File name of the chart within each directory.")] = GRAPH,
+           jobs: Annotated[int, typer.Option("--jobs", "-j", help="Number of worker processes (0 for one per CPU).")] = 0):
+    """Render the charts of many manifests without a display."""
+    from alog.graph import MAGNITUDE_LIMIT, preload
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(directories))
+
+    start = time.perf_counter()
+    # Star data is loaded here first, so forked workers start with it
+    use_headless_backend()
+    preload(MAGNITUDE_LIMIT)
+
+    rendered = 0
+    with _executor(jobs, _render_worker, (MAGNITUDE_LIMIT,)) as executor:
+        for directory, result, error, elapsed in _map_ordered(executor, _render_chart, Path(output), directories, jobs * 2):
+            if error is not None:
+                print(f" [bold red]Unable to render {directory}:[/bold red] {error}")
+            elif result is None:
+                print(f" Nothing solved in {directory}")
+            else:
+                print(f" Rendered {result} in {elapsed:.2f}s")
+                rendered += 1
+
+    print(f"Rendered {rendered} of {len(directories)} charts in {time.perf_counter() - start:.2f} seconds.")
+
+
+@app.command()
+def coverage(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+             output: Annotated[str, typer.Option(help="Map to write, FITS or .npy.  An image is written next to it.")] = "coverage.fits",
+             cell: Annotated[float | None, typer.Option(help="Cell size in arcminutes (default: fit the map to 2048 cells).")] = None):
+    """Map the exposure depth of the solved files in the manifest."""
+    from alog.coverage import coverage_map, render_map, save_map
+
+    columns = read_columns(directory)
+    if columns is None:
+        return
+
+    # Files that have not been plate solved yet are left out
+    solved = ~np.isnan(columns['ra'])
+    if not solved.any():
+        print("[bold red]No plate solved files in the manifest.[/bold red]")
+        return
+
+    start = time.perf_counter()
+    depth = coverage_map(*(columns[name][solved] for name in
+                           ('ra', 'dec', 'width', 'height', 'orientation', 'total_exposure_time')),
+                         cell=cell / 60 if cell is not None else None)
+    elapsed = time.perf_counter() - start
+
+    path = Path(output)
+    save_map(depth, path)
+    render_map(depth, path.with_suffix('.png'))
+
+    rows, cols = depth.exposure.shape
+    print(f"Mapped {humanize.intcomma(depth.frames)} frames onto {cols} x {rows} cells of "
+          f"{depth.cell * 60:.2f}' in {elapsed:.2f} seconds.")
+    print(f"  Deepest cell: {humanize.precisedelta(depth.exposure.max(), minimum_unit='seconds')}.")
+    print(f"  Wrote {path} and {path.with_suffix('.png')}.")
+
+
+@app.command()
+def targets(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+            top: Annotated[int, typer.Option(help="Number of targets to list, by exposure time.")] = 20):
+    """Identify the catalog objects in each plate solved file, and record them in the manifest."""
+    from alog.crossmatch import footprint_matches
+
+    dir = Path(directory)
+    store = ManifestStore(dir)
+    if not store.exists():
+        print("[bold red]Manifest not found.[/bold red]")
+        return
+    manifest = store.load()
+
+    solved = [desc for desc in manifest.files
+              if desc.solution is not None and desc.solution.calibration is not None]
+    if not solved:
+        print("[bold red]No plate solved files in the manifest.[/bold red]")
+        return
+
+    index = open_catalog_index()
+    calibrations = [desc.solution.calibration for desc in solved]
+    start = time.perf_counter()
+    frames, objects = footprint_matches(
+        np.array([c.ra for c in calibrations]), np.array([c.dec for c in calibrations]),
+        np.array([c.width_arcsec for c in calibrations]) / 3600.0,
+        np.array([c.height_arcsec for c in calibrations]) / 3600.0,
+        np.array([c.orientation for c in calibrations]),
+        index.ra, index.dec, index.size / 120)
+    elapsed = time.perf_counter() - start
+
+    # Matches are sorted by file, so each file's targets are a slice, in catalog order
+    bounds = np.searchsorted(frames, np.arange(len(solved) + 1))
+    changed = 0
+    for i, desc in enumerate(solved):
+        found = index.designations[objects[bounds[i]:bounds[i + 1]]].tolist()
+        if found != desc.targets:
+            manifest.add(desc.model_copy(update={'targets': found}))
+            changed += 1
+    store.checkpoint(manifest)
+
+    print(f"Matched {humanize.intcomma(len(solved))} plate solved files against "
+          f"{humanize.intcomma(len(index))} catalog objects in {elapsed:.2f} seconds.")
+    print(f"  {humanize.intcomma(len(np.unique(frames)))} files contain a catalog object, "
+          f"{humanize.intcomma(changed)} files updated.")
+
+    exposure = np.array([desc.total_exposure_time for desc in solved])
+    counts = np.bincount(objects, minlength=len(index))
+    exposures = np.bincount(objects, weights=exposure[frames], minlength=len(index))
+    for obj in np.argsort(-exposures, kind='stable')[:top]:
+        if counts[obj] == 0:
+            break
+        common_name = index.object_data(obj).get('common_name')
+        name = f"{index.designations[obj]} ({common_name})" if common_name else index.designations[obj]
+        print(f"  Target: [bold]{name}[/bold]")
+        print(f"    Contains {humanize.intcomma(counts[obj])} files.")
+        print(f"    Total exposure time: {humanize.precisedelta(exposures[obj], minimum_unit='seconds')}")
+
+
+@app.command()
+def graph2(directory: Annotated[str, typer.Option(help="The directory to operate in.")] = ".",
+           output: Annotated[str | None, typer.Option(help=f"File to save the chart to (default: {GRAPH} in the directory).")] = None):
     """Show a graph of the manifest."""
-    manifest = read_manifest(directory)
-    if not manifest:
+    rectangles = read_rectangles(directory)
+    if rectangles is None:
         return
 
-    print(f"Showing a graph of the manifest.  {len(manifest.files)} files in total.")
-    rectangles = [
-        ImageRectangle(x=file.solution.calibration.ra,
-                       y=file.solution.calibration.dec,
-                       # centerx=file.solution.calibration.centerx,
-                       width=file.solution.calibration.width_arcsec / 3600.0,
-                       height=file.solution.calibration.height_arcsec / 3600.0,
-                       rotation=file.solution.calibration.orientation, total_exposure_time=file.total_exposure_time) for
-        file in manifest.files]
-
-    plot_graph(rectangles)
+    from alog.graphplot import plot_graph
+
+    if output is None:
+        output = str(Path(directory) / GRAPH)
+    if is_headless():
+        use_headless_backend()
+    plot_graph(rectangles, output=Path(output))
+    print(f"Saved the chart to {output}")
 
 
 if __name__ == "__main__":
@@ -10,18 +10,18 @@ from pytz import timezone, utc
 # matplotlib to help display our star map
 import matplotlib.pyplot as plt
 # skyfield for star data
-from skyfield.api import Star, load, wgs84
-from skyfield.data import hipparcos
+from skyfield.api import Star, wgs84
 from skyfield.projections import build_stereographic_projection
 
+from alog.stars import ephemeris, loader, stars_dataframe
+
 
 
 def build_star_chart(location, when):
     # de421 shows position of earth and sun in space
-    eph = load('de421.bsp')
+    eph = ephemeris('de421.bsp')
     # hipparcos dataset contains star location data
-    with load.open(hipparcos.URL) as f:
-        stars = hipparcos.load_dataframe(f)
+    stars = stars_dataframe()
 
     locator = Nominatim(user_agent='myGeocoder')
     location = locator.geocode(location)
@@ -40,7 +40,7 @@ def build_star_chart(location, when):
     # sun = eph['sun']
     earth = eph['earth']
     # define observation time from our UTC datetime
-    ts = load.timescale()
+    ts = loader().timescale()
     t = ts.from_datetime(utc_dt)
     # define an observer using the world geodetic system data
     observer = wgs84.latlon(latitude_degrees=lat, longitude_degrees=long).at(t)
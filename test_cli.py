@@ -0,0 +1,82 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+import alog.simbad
+import cli
+
+runner = CliRunner()
+
+STORED = {'name': 'NAME Barnard\'s Star', 'type': 'PM*', 'coordinates': {'ra': 269.45, 'dec': 4.69}}
+REFRESHED = {**STORED, 'type': 'BY*'}
+
+
+@pytest.fixture(autouse=True)
+def stale_cache(tmp_path, monkeypatch):
+    # Every cached entry is stale at once
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('RESOLVER_CACHE_TTL_DAYS', '0')
+    resolver = cli.open_resolver_cache()
+    resolver.put(STORED, ["Barnard's Star"])
+    resolver.close()
+
+
+def lookup() -> dict:
+    result = runner.invoke(cli.app, ['lookup', "Barnard's Star", '--output-json', '--no-catalog'])
+    assert result.exit_code == 0, result.output
+    return json.loads(result.output)
+
+
+def test_stale_entry_is_refreshed(monkeypatch):
+    monkeypatch.setattr(alog.simbad, 'query_object', lambda name: REFRESHED)
+    assert lookup()['type'] == 'PM*'
+
+    resolver = cli.open_resolver_cache()
+    assert resolver.get("Barnard's Star")[0]['type'] == 'BY*'
+    resolver.close()
+
+
+def test_unreachable_simbad_does_not_hold_up_exit():
+    # A Simbad that never answers, in a process of its own so its exit is timed
+    script = """
+import sys, threading
+import alog.simbad, cli
+alog.simbad.query_object = lambda name: threading.Event().wait()
+cli.REFRESH_WAIT = 0.1
+sys.argv = ['cli', 'lookup', "Barnard's Star", '--output-json', '--no-catalog']
+cli.app()
+"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=60,
+                            cwd=Path(cli.__file__).parent)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['type'] == 'PM*'
+    assert time.perf_counter() - start < 20
+
+
+def test_catalog_objects_are_answered_without_simbad(monkeypatch):
+    def query_object(name):
+        raise AssertionError(f'{name} went to Simbad')
+
+    monkeypatch.setattr(alog.simbad, 'query_object', query_object)
+    for name in ['M31', 'Messier 31', 'NGC0224', 'Andromeda Galaxy']:
+        result = runner.invoke(cli.app, ['lookup', name, '--output-json', '--no-cache'])
+        assert result.exit_code == 0, result.output
+        data = json.loads(result.output)
+        assert data['name'] == 'M 31'
+        assert data['coordinates']['ra'] == pytest.approx(0.71231 * 15)
+
+
+def test_unknown_names_fall_back_to_simbad(monkeypatch):
+    queried = []
+    found = {'name': 'HD 1', 'type': '*', 'coordinates': {'ra': 1.29, 'dec': 67.84}}
+    monkeypatch.setattr(alog.simbad, 'query_object', lambda name: queried.append(name) or found)
+    result = runner.invoke(cli.app, ['lookup', 'HD 1', '--output-json', '--no-cache'])
+    assert result.exit_code == 0, result.output
+    assert queried == ['HD 1']
+    assert json.loads(result.output.split('\n', 1)[1]) == found
@@ -0,0 +1,256 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from astropy.io import fits
+from erewhon_astro import Calibration, Solution
+from typer.testing import CliRunner
+
+import manifest
+from alog.journal import ManifestStore
+from alog.settings import Settings
+
+runner = CliRunner()
+
+
+class FakeSolver:
+    """Solves every file except those named `bad*`, counting the attempts."""
+
+    def __init__(self):
+        self.solved = []
+
+    def solve(self, path, **kwargs):
+        self.solved.append(path.name)
+        if path.name.startswith('bad'):
+            return None
+        return Solution(calibration=Calibration(ra=10.0, dec=41.0, width_arcsec=4600, height_arcsec=2600,
+                                                orientation=30, parity=1, pixscale=2.4), annotations=[])
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path / 'cache'))
+    # Per-process connections would outlive the test's cache directory
+    manifest._solve_cache.cache_clear()
+    yield
+    manifest._solve_cache.cache_clear()
+
+
+@pytest.fixture
+def solver(monkeypatch):
+    solver = FakeSolver()
+    monkeypatch.setattr(manifest, '_solver', lambda: (Settings(), solver))
+    return solver
+
+
+def write_frame(path, seed: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = fits.Header()
+    header['EXPTIME'] = 10.0
+    header['STACKCNT'] = seed + 1
+    header['INSTRUME'] = 'Seestar S50'
+    data = np.full((8, 8), seed, dtype=np.uint16)
+    fits.PrimaryHDU(data, header=header).writeto(path)
+
+
+def update(dir, *args):
+    result = runner.invoke(manifest.app, ['update', '--directory', str(dir), *args])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def entries(dir) -> dict[str, str]:
+    return {desc.pathname: desc.hash for desc in ManifestStore(dir).load().files}
+
+
+def test_moved_unsolved_file_is_repointed(tmp_path):
+    dir = tmp_path / 'session'
+    for i in range(4):
+        write_frame(dir / 'sub' / f'frame{i}.fit', i)
+    update(dir, '--no-solve')
+    before = entries(dir)
+    assert len(before) == 4
+
+    (dir / 'sub' / 'frame2.fit').rename(dir / 'sub' / 'renamed.fit')
+    update(dir, '--no-solve')
+
+    after = entries(dir)
+    assert len(after) == 4
+    assert 'sub/frame2.fit' not in after
+    assert after['sub/renamed.fit'] == before['sub/frame2.fit']
+
+
+def test_copied_file_keeps_both_entries(tmp_path):
+    dir = tmp_path / 'session'
+    write_frame(dir / 'a.fit', 1)
+    update(dir, '--no-solve')
+
+    (dir / 'b.fit').write_bytes((dir / 'a.fit').read_bytes())
+    update(dir, '--no-solve')
+    assert sorted(entries(dir)) == ['a.fit', 'b.fit']
+
+
+def test_unsolvable_files_are_not_retried(tmp_path, solver):
+    dir = tmp_path / 'session'
+    write_frame(dir / 'good.fit', 1)
+    write_frame(dir / 'bad.fit', 2)
+    update(dir)
+    assert sorted(solver.solved) == ['bad.fit', 'good.fit']
+    files = {desc.pathname: desc for desc in ManifestStore(dir).load().files}
+    assert files['bad.fit'].solve_failed and files['bad.fit'].solution is None
+    assert not files['good.fit'].solve_failed and files['good.fit'].solution is not None
+
+    solver.solved.clear()
+    result = update(dir)
+    assert solver.solved == []
+    assert 'Skipping 1 files' in result.output
+
+    # Moved, the file keeps its failure
+    (dir / 'bad.fit').rename(dir / 'bad2.fit')
+    update(dir)
+    assert solver.solved == []
+
+    result = runner.invoke(manifest.app, ['solve', '--directory', str(dir), '--retry-failed'])
+    assert result.exit_code == 0, result.output
+    assert solver.solved == ['bad2.fit']
+
+
+@pytest.mark.parametrize('command', ['graph', 'graph2'])
+def test_graph_without_solved_files(tmp_path, command):
+    write_frame(tmp_path / 'a.fit', 1)
+    update(tmp_path, '--no-solve')
+    result = runner.invoke(manifest.app, [command, '--directory', str(tmp_path), '--output', str(tmp_path / 'g.png')])
+    assert result.exit_code == 0, result.output
+    assert 'No plate solved files' in result.output
+    assert not (tmp_path / 'g.png').exists()
+
+
+def test_graph2_saves_into_the_manifest_directory(tmp_path, solver, monkeypatch):
+    import alog.graphplot
+
+    outputs = []
+    monkeypatch.setattr(alog.graphplot, 'plot_graph', lambda rectangles, output: outputs.append(output))
+    write_frame(tmp_path / 'a.fit', 1)
+    update(tmp_path)
+    result = runner.invoke(manifest.app, ['graph2', '--directory', str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    assert outputs == [tmp_path / manifest.GRAPH]
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='workers must inherit the fake solver')
+def test_jobs_give_the_same_manifest(tmp_path, solver):
+    manifests = []
+    for jobs in ['1', '3']:
+        dir = tmp_path / f'jobs{jobs}'
+        for i in range(12):
+            write_frame(dir / f'night{i % 3}' / f'frame{i:02d}.fit', i)
+        write_frame(dir / 'bad.fit', 99)
+        update(dir, '--jobs', jobs)
+        # Everything but the stat signature of each copy
+        manifests.append([desc.model_dump(exclude={'mtime', 'inode'}) for desc in ManifestStore(dir).load().files])
+
+    assert manifests[0] == manifests[1]
+    assert [desc['pathname'] for desc in manifests[0]] == (
+        ['bad.fit'] + [f'night{i % 3}/frame{i:02d}.fit' for i in sorted(range(12), key=lambda i: (i % 3, i))])
+    assert sum(desc['solution'] is not None for desc in manifests[0]) == 12
+
+
+def test_map_ordered_holds_a_bounded_window(tmp_path):
+    window = 4
+    pulled = []
+
+    def items():
+        for item in range(30):
+            pulled.append(item)
+            yield item
+
+    def work(dir, item):
+        # Later items finish first
+        time.sleep((30 - item) * 0.0005)
+        return item * 2
+
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    results = []
+    with CountingExecutor(max_workers=3) as executor:
+        for item, result, error, _ in manifest._map_ordered(executor, work, tmp_path, items(), window):
+            # In flight: submitted but not yet yielded, including this one
+            assert executor.submitted - len(results) <= window
+            assert len(pulled) - len(results) <= window
+            results.append((item, result, error))
+    assert results == [(item, item * 2, None) for item in range(30)]
+
+    # In this process, one at a time, with failures returned rather than raised
+    def fail_odd(dir, item):
+        if item % 2:
+            raise ValueError(f'odd {item}')
+        return item
+
+    results = [(item, result, error) for item, result, error, _ in
+               manifest._map_ordered(None, fail_odd, tmp_path, range(4), window)]
+    assert results == [(0, 0, None), (1, None, 'odd 1'), (2, 2, None), (3, None, 'odd 3')]
+
+
+def test_unchanged_files_are_not_hashed_again(tmp_path, solver, monkeypatch):
+    import alog.fitsfile
+
+    hashed = []
+    hash_and_read_header = alog.fitsfile.hash_and_read_header
+
+    def recording(path, *args, **kwargs):
+        hashed.append(path.name)
+        return hash_and_read_header(path, *args, **kwargs)
+
+    monkeypatch.setattr(alog.fitsfile, 'hash_and_read_header', recording)
+    dir = tmp_path / 'session'
+    for name in ['a', 'b', 'c', 'd']:
+        write_frame(dir / f'{name}.fit', ord(name))
+    update(dir)
+    assert sorted(hashed) == ['a.fit', 'b.fit', 'c.fit', 'd.fit']
+    assert len(solver.solved) == 4
+
+    # Same size, mtime and inode
+    hashed.clear()
+    update(dir)
+    assert hashed == [] and len(solver.solved) == 4
+
+    # Touched, replaced by another file of the same size, and grown
+    st = (dir / 'a.fit').stat()
+    os.utime(dir / 'a.fit', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    write_frame(tmp_path / 'new.fit', 1000)
+    (tmp_path / 'new.fit').replace(dir / 'b.fit')
+    with open(dir / 'c.fit', 'ab') as f:
+        f.write(b'\0' * 2880)
+    hashed.clear()
+    update(dir)
+    assert sorted(hashed) == ['a.fit', 'b.fit', 'c.fit']
+    # The touched file has the same content, so is not solved again
+    assert sorted(solver.solved[4:]) == ['b.fit', 'c.fit']
+
+
+def test_targets_reach_objects_by_their_radius(tmp_path, solver, monkeypatch):
+    from alog.catalogs import CatalogIndex
+    from alog.test_catalogs import write_catalogs
+
+    # Two objects 2 degrees north of the solved frame, which reaches at most
+    # 0.74 degrees north of its center.  Sizes are diameters in arcmin, so
+    # only the first reaches the frame.
+    catalog_dir = write_catalogs(tmp_path / 'catalogs', OpenNGC=[
+        ['NGC 1', 10.0 / 15, 43.0, 'Galaxy', '', 0, 0, '', '', 200.0],
+        ['NGC 2', 10.0 / 15, 43.0, 'Galaxy', '', 0, 0, '', '', 120.0],
+    ])
+    monkeypatch.setattr(manifest, 'open_catalog_index',
+                        lambda: CatalogIndex.load(tmp_path / 'catalogs.npz', catalog_dir))
+    write_frame(tmp_path / 'a.fit', 1)
+    update(tmp_path)
+    result = runner.invoke(manifest.app, ['targets', '--directory', str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    assert ManifestStore(tmp_path).load().files[0].targets == ['NGC 1']